@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Archive Cache
+Indexes the ROMs inside .zip/.7z archives from the archive's directory alone (nothing is
+extracted while scanning) and, at launch, stream-extracts the ROM into a size-bounded
+cache directory (tmpfs by default) with least-recently-used eviction.
+
+An archived ROM is addressed as if the archive were a folder:
+Games/Collection.zip/Super Mario Bros.nes
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import zipfile
+import tempfile
+import threading
+
+from launch_commands import format_argv
+from process_supervisor import running_sessions
+
+try:
+    import py7zr
+except ImportError:
+    py7zr = None  # .7z archives are not indexed without py7zr
+
+ARCHIVE_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "archive_cache.json")
+ARCHIVE_EXTENSIONS = ('.zip', '.7z')
+# Multi-file games: the whole folder around these members is extracted with them
+SHEET_EXTENSIONS = ('.cue', '.gdi', '.m3u', '.ccd')
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# directory: None picks /dev/shm (tmpfs) where available, else the system temp directory
+DEFAULT_ARCHIVE_CACHE_CONFIG = {
+    'directory': None,
+    'max_mb': 1024
+}
+ARCHIVE_PATH_PATTERN = re.compile(r'\.(zip|7z)(?=[\\/])', re.IGNORECASE)
+
+CONFIG_CACHE = {'mtime': None, 'config': None}
+ARCHIVE_INDEX = {}  # archive path -> (size, mtime, [{'name', 'size', 'crc'}])
+CACHE_ENTRIES = {}  # cache key -> bytes on disk
+CACHE_STATE = {'directory': None, 'hits': 0, 'extractions': 0, 'evictions': 0}
+ARCHIVE_LOCK = threading.RLock()
+
+def get_archive_cache_config():
+    """Return the archive cache settings, merged with Config/archive_cache.json if present"""
+    try:
+        mtime = os.path.getmtime(ARCHIVE_CONFIG_FILE)
+    except OSError:
+        mtime = None
+
+    if CONFIG_CACHE['config'] is not None and CONFIG_CACHE['mtime'] == mtime:
+        return CONFIG_CACHE['config']
+
+    config = dict(DEFAULT_ARCHIVE_CACHE_CONFIG)
+    if mtime is not None:
+        try:
+            with open(ARCHIVE_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            config.update({key: value for key, value in overrides.items() if key in DEFAULT_ARCHIVE_CACHE_CONFIG})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    CONFIG_CACHE['mtime'] = mtime
+    CONFIG_CACHE['config'] = config
+    return config
+
+def is_archive(path):
+    """Check whether a file is an archive this module can index"""
+    extension = os.path.splitext(str(path))[1].lower()
+    return extension == '.zip' or (extension == '.7z' and py7zr is not None)
+
+def _read_members(archive_path):
+    """Read an archive's directory: [{'name', 'size', 'crc'}] for every file member"""
+    members = []
+    if archive_path.lower().endswith('.7z'):
+        with py7zr.SevenZipFile(archive_path, 'r') as archive:
+            for info in archive.list():
+                if not info.is_directory:
+                    members.append({'name': info.filename, 'size': info.uncompressed, 'crc': info.crc32})
+        return members
+    # ZipFile only reads the central directory at the end of the file
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                members.append({'name': info.filename, 'size': info.file_size, 'crc': info.CRC})
+    return members
+
+def list_archive_members(archive_path):
+    """Return the file members of an archive, cached by (path, size, mtime); [] if unreadable"""
+    archive_path = str(archive_path)
+    try:
+        stat = os.stat(archive_path)
+    except OSError:
+        return []
+    with ARCHIVE_LOCK:
+        cached = ARCHIVE_INDEX.get(archive_path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            return cached[2]
+    try:
+        members = _read_members(archive_path)
+    except Exception:
+        members = []  # Corrupt, encrypted headers or an unsupported method
+    with ARCHIVE_LOCK:
+        ARCHIVE_INDEX[archive_path] = (stat.st_size, stat.st_mtime, members)
+    return members
+
+def _is_safe_member(member_name):
+    """Reject absolute member names and ones that climb out of the extraction folder"""
+    parts = member_name.replace('\\', '/').split('/')
+    return not member_name.startswith(('/', '\\')) and '..' not in parts and ':' not in parts[0]
+
+def member_path(archive_path, member_name):
+    """Build the path that addresses one archive member"""
+    return os.path.join(str(archive_path), *member_name.split('/'))
+
+def list_archived_roms(archive_path, is_supported_extension):
+    """Return the member paths of the ROMs inside an archive whose extension is supported"""
+    rom_paths = []
+    for member in list_archive_members(archive_path):
+        extension = os.path.splitext(member['name'])[1].lower()
+        if extension in ARCHIVE_EXTENSIONS or not is_supported_extension(extension) or not _is_safe_member(member['name']):
+            continue
+        rom_paths.append(member_path(archive_path, member['name']))
+    return rom_paths
+
+def split_archive_path(path):
+    """Split an archived ROM path into (archive path, member name), or (None, None) for a plain file"""
+    path = str(path)
+    for match in ARCHIVE_PATH_PATTERN.finditer(path):
+        archive_path = path[:match.end()]
+        if os.path.isfile(archive_path):
+            return archive_path, path[match.end() + 1:].replace('\\', '/')
+    return None, None
+
+def _find_member(archive_path, member_name):
+    return next((member for member in list_archive_members(archive_path) if member['name'] == member_name), None)
+
+def rom_file_size(path):
+    """Size of a ROM: the uncompressed member size for archived ROMs, else the file size"""
+    archive_path, member_name = split_archive_path(path)
+    if archive_path is None:
+        return os.path.getsize(path)
+    member = _find_member(archive_path, member_name)
+    if member is None:
+        raise FileNotFoundError(f"{member_name} is not in {archive_path}")
+    return member['size']
+
+def get_cache_directory():
+    """Return the extraction cache directory (created on first use)"""
+    configured = get_archive_cache_config()['directory']
+    if configured:
+        directory = configured
+    elif os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        directory = os.path.join('/dev/shm', 'retroflow-archives')
+    else:
+        directory = os.path.join(tempfile.gettempdir(), 'retroflow-archives')
+    with ARCHIVE_LOCK:
+        if CACHE_STATE['directory'] != directory:
+            os.makedirs(directory, exist_ok=True)
+            CACHE_STATE['directory'] = directory
+            CACHE_ENTRIES.clear()
+            _scan_cache_entries(directory)
+    return directory
+
+def _entry_size(entry_path):
+    total_size = 0
+    for root, _, files in os.walk(entry_path):
+        for filename in files:
+            try:
+                total_size += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return total_size
+
+def _scan_cache_entries(directory):
+    """Pick up entries extracted by earlier runs; unfinished extractions are removed (lock held)"""
+    for name in os.listdir(directory):
+        entry_path = os.path.join(directory, name)
+        if name.endswith('.partial'):
+            shutil.rmtree(entry_path, ignore_errors=True)
+        elif os.path.isdir(entry_path):
+            CACHE_ENTRIES[name] = _entry_size(entry_path)
+
+def _extraction_unit(archive_path, member_name):
+    """The members extracted for one ROM: the ROM alone, or its whole folder for cue/gdi/m3u sheets"""
+    if os.path.splitext(member_name)[1].lower() not in SHEET_EXTENSIONS:
+        return [member_name]
+    folder = member_name.rpartition('/')[0]
+    return [member['name'] for member in list_archive_members(archive_path)
+            if member['name'].rpartition('/')[0] == folder]
+
+def _cache_key(archive_path, member_name):
+    """Key of an extracted ROM; changes whenever the archive does"""
+    stat = os.stat(archive_path)
+    if os.path.splitext(member_name)[1].lower() in SHEET_EXTENSIONS:
+        member_name = member_name.rpartition('/')[0] + '/'
+    identity = f"{os.path.abspath(archive_path)}|{stat.st_size}|{stat.st_mtime}|{member_name}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:20]
+
+def _running_keys():
+    """Cache keys of archived ROMs that running emulators are using"""
+    keys = set()
+    for session in running_sessions():
+        archive_path, member_name = split_archive_path(session.get('game_path') or '')
+        if archive_path:
+            try:
+                keys.add(_cache_key(archive_path, member_name))
+            except OSError:
+                pass
+    return keys
+
+def _evict_until_fits(directory, needed_bytes, keep_key):
+    """Delete least recently used entries until needed_bytes fits the budget (lock held)"""
+    budget = get_archive_cache_config()['max_mb'] * 1024 * 1024
+    if sum(CACHE_ENTRIES.values()) + needed_bytes <= budget:
+        return
+    protected = _running_keys() | {keep_key}
+
+    def last_used(key):
+        try:
+            return os.path.getmtime(os.path.join(directory, key))
+        except OSError:
+            return 0
+
+    for key in sorted(CACHE_ENTRIES, key=last_used):
+        if sum(CACHE_ENTRIES.values()) + needed_bytes <= budget:
+            break
+        if key in protected:
+            continue
+        shutil.rmtree(os.path.join(directory, key), ignore_errors=True)
+        if not os.path.exists(os.path.join(directory, key)):
+            del CACHE_ENTRIES[key]
+            CACHE_STATE['evictions'] += 1
+
+def _extract(archive_path, member_names, target_directory):
+    """Stream members out of an archive into target_directory, keeping their folders"""
+    if archive_path.lower().endswith('.7z'):
+        with py7zr.SevenZipFile(archive_path, 'r') as archive:
+            archive.extract(path=target_directory, targets=member_names)
+        return
+    with zipfile.ZipFile(archive_path) as archive:
+        for member_name in member_names:
+            target_path = os.path.join(target_directory, *member_name.split('/'))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with archive.open(member_name) as source, open(target_path, 'wb') as target:
+                shutil.copyfileobj(source, target, COPY_CHUNK_BYTES)
+
+def extract_rom(path):
+    """
+    Return a path on disk for a ROM: plain files are returned as they are, archived ROMs are
+    extracted into the cache first (or reused from it). Raises OSError if extraction fails.
+    """
+    archive_path, member_name = split_archive_path(path)
+    if archive_path is None:
+        return str(path)
+    directory = get_cache_directory()
+    with ARCHIVE_LOCK:
+        key = _cache_key(archive_path, member_name)
+        entry_path = os.path.join(directory, key)
+        rom_path = os.path.join(entry_path, *member_name.split('/'))
+        if key in CACHE_ENTRIES and os.path.isfile(rom_path):
+            os.utime(entry_path)  # Mark as most recently used
+            CACHE_STATE['hits'] += 1
+            return rom_path
+
+        member_names = [name for name in _extraction_unit(archive_path, member_name) if _is_safe_member(name)]
+        members = [_find_member(archive_path, name) for name in member_names]
+        if None in members:
+            raise FileNotFoundError(f"{member_name} is not in {archive_path}")
+        needed_bytes = sum(member['size'] for member in members)
+        _evict_until_fits(directory, needed_bytes, key)
+        if shutil.disk_usage(directory).free < needed_bytes:
+            raise OSError(f"Not enough space in {directory} to extract {os.path.basename(rom_path)}")
+
+        partial_path = entry_path + '.partial'
+        shutil.rmtree(partial_path, ignore_errors=True)
+        try:
+            _extract(archive_path, member_names, partial_path)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            os.replace(partial_path, entry_path)
+        except Exception as e:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            raise OSError(f"Could not extract {member_name} from {os.path.basename(archive_path)}: {e}") from e
+        CACHE_ENTRIES[key] = needed_bytes
+        CACHE_STATE['extractions'] += 1
+        return rom_path
+
+def localize_launch_plan(launch_plan, rom_path):
+    """Return a copy of a launch plan that points at rom_path instead of the archived ROM"""
+    if not launch_plan or launch_plan['game_path'] == rom_path:
+        return launch_plan
+    archived_path = launch_plan['game_path']
+    argv = [arg.replace(archived_path, rom_path) for arg in launch_plan['argv']]
+    return dict(launch_plan, argv=argv, command=format_argv(argv), game_path=rom_path)
+
+def get_archive_cache_stats():
+    """Return the cache directory, its size and budget, and the hit/extraction/eviction counters"""
+    directory = get_cache_directory()
+    with ARCHIVE_LOCK:
+        stats = {key: value for key, value in CACHE_STATE.items() if key != 'directory'}
+        stats.update(directory=directory, entries=len(CACHE_ENTRIES), bytes=sum(CACHE_ENTRIES.values()),
+                     budget_bytes=get_archive_cache_config()['max_mb'] * 1024 * 1024)
+    return stats
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+RetroFlow DAT Index
+Identifies ROMs by content against No-Intro/Redump DAT files (Logiqx XML or ClrMamePro text)
+placed in Config/DATs. The DATs are parsed once into Cache/dat_index.bin, a compact binary
+index that is memory-mapped and answers CRC32/SHA-1 lookups from open-addressing hash
+tables without parsing anything at startup. The index is rebuilt when a DAT is added,
+changed or removed.
+
+Index layout (little-endian):
+    header      magic, entry count, CRC slot count, SHA-1 slot count, metadata length
+    metadata    JSON: {'sources': {dat filename: [size, mtime]}, 'systems': [...], 'regions': [...]}
+    entries     per ROM: size, CRC32, name offset/length in the string area, system, region
+    CRC slots   (CRC32, entry number + 1), 0 marking an empty slot
+    SHA-1 slots (SHA-1, entry number + 1)
+    strings     UTF-8 game names
+"""
+
+import os
+import re
+import json
+import mmap
+import time
+import shutil
+import struct
+import threading
+import xml.etree.ElementTree as ElementTree
+from functools import lru_cache
+
+from archive_cache import split_archive_path, list_archive_members
+from rom_hashing import get_cached_rom_hashes
+from rom_tags import parse_rom_name
+
+DAT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "DATs")
+DAT_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache", "dat_index.bin")
+DAT_EXTENSIONS = ('.dat', '.xml')
+DAT_CHECK_INTERVAL = 5  # Seconds between checks of Config/DATs for added or changed DATs
+
+INDEX_MAGIC = b'RFDATIX1'
+HEADER = struct.Struct('<8sIIII')
+ENTRY = struct.Struct('<QIIHHH2x')  # size, crc32, name offset, name length, system, region
+CRC_SLOT = struct.Struct('<II')
+SHA1_SLOT = struct.Struct('<20sI')
+
+# No-Intro/Redump system names, as the launchers name the same systems
+DAT_SYSTEM_NAMES = {
+    'Nintendo - Nintendo Entertainment System': 'Nintendo Entertainment System',
+    'Nintendo - Super Nintendo Entertainment System': 'Super Nintendo',
+    'Nintendo - Game Boy': 'Game Boy', 'Nintendo - Game Boy Color': 'Game Boy Color',
+    'Nintendo - Game Boy Advance': 'Game Boy Advance', 'Nintendo - Nintendo 64': 'Nintendo 64',
+    'Nintendo - Nintendo DS': 'Nintendo DS', 'Sega - Mega Drive - Genesis': 'Sega Genesis',
+    'Sega - Master System - Mark III': 'Sega Master System', 'Sega - Game Gear': 'Sega Game Gear',
+    'Sony - PlayStation': 'PlayStation 1'
+}
+
+TAG_PATTERN = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]')
+CLRMAMEPRO_FIELD = re.compile(r'(\w+)\s+("[^"]*"|[^\s()]+)')
+
+# index: {'map', 'file', 'entries', 'crc_slots', 'sha1_slots', 'offsets', 'meta'}
+INDEX_STATE = {'index': None, 'checked_at': 0.0, 'version': 0}
+DAT_INDEX_LOCK = threading.RLock()
+
+# --- DAT parsing ---
+
+def _clean_system(header_name):
+    """'Nintendo - Game Boy (Parent-Clone)' -> 'Nintendo - Game Boy'"""
+    return TAG_PATTERN.sub('', header_name or '').strip() or "Unknown"
+
+def _region_of(game_name):
+    """The regions of a DAT game name, e.g. 'USA, Europe' for 'Tetris (USA, Europe) (Rev 1)'"""
+    return ', '.join(parse_rom_name(game_name)['regions'])
+
+def dat_system_name(dat_system):
+    """'Nintendo - Game Boy Color' -> 'Game Boy Color'; unknown systems lose their maker prefix"""
+    if dat_system in DAT_SYSTEM_NAMES:
+        return DAT_SYSTEM_NAMES[dat_system]
+    return dat_system.split(' - ', 1)[-1]
+
+def _parse_int(text, base=10):
+    try:
+        return int(text, base)
+    except (TypeError, ValueError):
+        return None
+
+def _rom_record(game_name, system, size, crc, sha1):
+    """Normalize one ROM line of a DAT, or None if it has no usable hash"""
+    crc = _parse_int(crc, 16)
+    sha1 = sha1.lower() if sha1 and re.fullmatch(r'[0-9a-fA-F]{40}', sha1) else None
+    if crc is None and sha1 is None:
+        return None
+    return {'name': game_name, 'system': system, 'size': _parse_int(size) or 0, 'crc': crc, 'sha1': sha1}
+
+def _parse_xml_dat(path):
+    """Read a Logiqx XML DAT as a stream, keeping only one game element in memory at a time"""
+    system = "Unknown"
+    for _, element in ElementTree.iterparse(path, events=('end',)):
+        if element.tag == 'header':
+            system = _clean_system(element.findtext('name'))
+            element.clear()
+        elif element.tag in ('game', 'machine'):
+            game_name = element.get('name') or element.findtext('description') or ""
+            for rom in element.iter('rom'):
+                record = _rom_record(game_name, system, rom.get('size'), rom.get('crc'), rom.get('sha1'))
+                if record:
+                    yield record
+            element.clear()
+
+def _parse_clrmamepro_dat(path):
+    """Read a ClrMamePro text DAT: 'clrmamepro ( name "..." )' then 'game ( name "..." rom ( ... ) )' blocks"""
+    system = "Unknown"
+    block = None
+    game_name = ""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            stripped = line.strip()
+            if block is None:
+                if stripped.startswith('clrmamepro ('):
+                    block = 'header'
+                elif stripped.startswith(('game (', 'machine (')):
+                    block, game_name = 'game', ""
+                continue
+            if stripped == ')':
+                block = None
+            elif stripped.startswith('name ') and block == 'header':
+                system = _clean_system(stripped[5:].strip().strip('"'))
+            elif stripped.startswith('name ') and block == 'game':
+                game_name = stripped[5:].strip().strip('"')
+            elif stripped.startswith('rom (') and block == 'game':
+                fields = {key: value.strip('"') for key, value in CLRMAMEPRO_FIELD.findall(stripped[5:])}
+                record = _rom_record(game_name, system, fields.get('size'), fields.get('crc'), fields.get('sha1'))
+                if record:
+                    yield record
+
+def parse_dat_file(path):
+    """Yield {'name', 'system', 'size', 'crc', 'sha1'} for every ROM in a DAT file; raises ValueError if malformed"""
+    with open(path, 'rb') as f:
+        is_xml = f.read(512).lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'<')
+    try:
+        yield from (_parse_xml_dat(path) if is_xml else _parse_clrmamepro_dat(path))
+    except ElementTree.ParseError as e:
+        raise ValueError(f"{os.path.basename(path)} is not a valid DAT file: {e}") from e
+
+# --- Index building ---
+
+def _table_slots(count):
+    """Power-of-two slot count keeping the tables at most half full"""
+    slots = 8
+    while slots < count * 2:
+        slots *= 2
+    return slots
+
+def _dat_sources():
+    """{DAT filename: [size, mtime]} for the DATs in Config/DATs"""
+    sources = {}
+    try:
+        filenames = os.listdir(DAT_DIRECTORY)
+    except OSError:
+        return sources
+    for filename in filenames:
+        if os.path.splitext(filename)[1].lower() not in DAT_EXTENSIONS:
+            continue
+        try:
+            stat = os.stat(os.path.join(DAT_DIRECTORY, filename))
+        except OSError:
+            continue
+        sources[filename] = [stat.st_size, stat.st_mtime]
+    return sources
+
+def build_dat_index():
+    """
+    Parse every DAT in Config/DATs and write the binary index.
+    Returns (number of ROM entries, {DAT filename: error message} for DATs that could not be read).
+    """
+    sources = _dat_sources()
+    records, errors = [], {}
+    for filename in sorted(sources):
+        try:
+            records.extend(list(parse_dat_file(os.path.join(DAT_DIRECTORY, filename))))  # All or nothing per DAT
+        except (OSError, ValueError) as e:
+            errors[filename] = str(e)
+
+    systems, regions = {}, {}
+    strings = bytearray()
+    name_offsets = {}
+    entries = bytearray()
+    crc_slots = _table_slots(len(records))
+    sha1_slots = _table_slots(len(records))
+    crc_table = bytearray(crc_slots * CRC_SLOT.size)
+    sha1_table = bytearray(sha1_slots * SHA1_SLOT.size)
+
+    entry_count = 0
+    for record in records:
+        name = record['name'].encode('utf-8')[:0xFFFF]
+        if name not in name_offsets:
+            name_offsets[name] = len(strings)
+            strings.extend(name)
+        system = systems.setdefault(record['system'], len(systems))
+        region = regions.setdefault(_region_of(record['name']), len(regions))
+        entries.extend(ENTRY.pack(record['size'], record['crc'] or 0, name_offsets[name], len(name), system, region))
+        entry_count += 1
+
+        # Linear probing; the first DAT entry for a hash wins, later duplicates are not inserted
+        if record['crc'] is not None:
+            slot = record['crc'] & (crc_slots - 1)
+            while True:
+                crc, number = CRC_SLOT.unpack_from(crc_table, slot * CRC_SLOT.size)
+                if number == 0:
+                    CRC_SLOT.pack_into(crc_table, slot * CRC_SLOT.size, record['crc'], entry_count)
+                    break
+                if crc == record['crc'] and records[number - 1]['size'] == record['size']:
+                    break
+                slot = (slot + 1) & (crc_slots - 1)
+        if record['sha1']:
+            digest = bytes.fromhex(record['sha1'])
+            slot = int.from_bytes(digest[:4], 'little') & (sha1_slots - 1)
+            while True:
+                existing, number = SHA1_SLOT.unpack_from(sha1_table, slot * SHA1_SLOT.size)
+                if number == 0:
+                    SHA1_SLOT.pack_into(sha1_table, slot * SHA1_SLOT.size, digest, entry_count)
+                    break
+                if existing == digest:
+                    break
+                slot = (slot + 1) & (sha1_slots - 1)
+
+    meta = json.dumps({'sources': sources, 'systems': list(systems), 'regions': list(regions)},
+                      separators=(',', ':')).encode('utf-8')
+    with DAT_INDEX_LOCK:
+        _close_index()  # A mapped file cannot be replaced on Windows
+        os.makedirs(os.path.dirname(DAT_INDEX_FILE), exist_ok=True)
+        temp_file = DAT_INDEX_FILE + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, entry_count, crc_slots, sha1_slots, len(meta)))
+            for part in (meta, entries, crc_table, sha1_table, strings):
+                f.write(part)
+        os.replace(temp_file, DAT_INDEX_FILE)
+        INDEX_STATE['checked_at'] = 0.0
+        INDEX_STATE['version'] += 1
+    return entry_count, errors
+
+# --- Index loading and lookups ---
+
+def _close_index():
+    """Unmap the current index (lock held)"""
+    index = INDEX_STATE['index']
+    INDEX_STATE['index'] = None
+    if index is not None:
+        index['map'].close()
+        index['file'].close()
+
+def _open_index():
+    """Map Cache/dat_index.bin, or return None if it is missing or not an index (lock held)"""
+    try:
+        f = open(DAT_INDEX_FILE, 'rb')
+    except OSError:
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, entry_count, crc_slots, sha1_slots, meta_length = HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError("not a RetroFlow DAT index")
+        meta = json.loads(data[HEADER.size:HEADER.size + meta_length].decode('utf-8'))
+        entries_at = HEADER.size + meta_length
+        crc_at = entries_at + entry_count * ENTRY.size
+        sha1_at = crc_at + crc_slots * CRC_SLOT.size
+        strings_at = sha1_at + sha1_slots * SHA1_SLOT.size
+        if strings_at > len(data):
+            raise ValueError("truncated DAT index")
+    except (OSError, ValueError, struct.error):
+        f.close()
+        return None
+    return {'map': data, 'file': f, 'entries': entry_count, 'crc_slots': crc_slots, 'sha1_slots': sha1_slots,
+            'offsets': (entries_at, crc_at, sha1_at, strings_at), 'meta': meta}
+
+def _current_index():
+    """Return the mapped index, rebuilding it first if the DATs in Config/DATs changed"""
+    with DAT_INDEX_LOCK:
+        now = time.time()
+        if now - INDEX_STATE['checked_at'] < DAT_CHECK_INTERVAL:
+            return INDEX_STATE['index']
+        INDEX_STATE['checked_at'] = now
+        if INDEX_STATE['index'] is None:
+            INDEX_STATE['index'] = _open_index()
+
+        # One stat per DAT, so DATs overwritten in place are noticed as well as added or removed ones
+        index = INDEX_STATE['index']
+        sources = _dat_sources()
+        if index is None and not sources:
+            return None  # No DATs and no index: nothing to identify against
+        if index is None or index['meta'].get('sources') != sources:
+            build_dat_index()
+            INDEX_STATE['checked_at'] = now
+            INDEX_STATE['index'] = _open_index()
+        return INDEX_STATE['index']
+
+@lru_cache(maxsize=4096)
+def _canonical_title(name):
+    """'Legend of Zelda, The (USA) (Rev 1)' -> 'The Legend of Zelda'"""
+    title = parse_rom_name(name)['title']
+    match = re.fullmatch(r'(.*), (The|A|An)( - .*)?', title)
+    if match:
+        title = f"{match.group(2)} {match.group(1)}{match.group(3) or ''}"
+    return title
+
+def _entry(index, number):
+    """Decode entry number (1-based) into {'title', 'name', 'region', 'system', 'dat_system', 'size'}"""
+    entries_at, _, _, strings_at = index['offsets']
+    size, _, name_offset, name_length, system, region = ENTRY.unpack_from(index['map'], entries_at + (number - 1) * ENTRY.size)
+    name = index['map'][strings_at + name_offset:strings_at + name_offset + name_length].decode('utf-8', errors='replace')
+    dat_system = index['meta']['systems'][system]
+    return {'title': _canonical_title(name), 'name': name, 'region': index['meta']['regions'][region],
+            'system': dat_system_name(dat_system), 'dat_system': dat_system, 'size': size}
+
+def lookup_sha1(sha1):
+    """Return the DAT entry for a SHA-1 hex digest, or None"""
+    # The lock is held for the whole probe so a rebuild cannot unmap the index under it
+    with DAT_INDEX_LOCK:
+        index = _current_index()
+        if index is None or not sha1:
+            return None
+        digest = bytes.fromhex(sha1)
+        _, _, sha1_at, _ = index['offsets']
+        mask = index['sha1_slots'] - 1
+        slot = int.from_bytes(digest[:4], 'little') & mask
+        while True:
+            existing, number = SHA1_SLOT.unpack_from(index['map'], sha1_at + slot * SHA1_SLOT.size)
+            if number == 0:
+                return None
+            if existing == digest:
+                return _entry(index, number)
+            slot = (slot + 1) & mask
+
+def lookup_crc(crc32, size=None):
+    """Return the DAT entry for a CRC32 (int or hex string), checking the size if given, or None"""
+    with DAT_INDEX_LOCK:
+        index = _current_index()
+        if index is None or crc32 is None:
+            return None
+        crc32 = int(crc32, 16) if isinstance(crc32, str) else crc32
+        entries_at, crc_at, _, _ = index['offsets']
+        mask = index['crc_slots'] - 1
+        slot = crc32 & mask
+        while True:
+            crc, number = CRC_SLOT.unpack_from(index['map'], crc_at + slot * CRC_SLOT.size)
+            if number == 0:
+                return None
+            if crc == crc32:
+                entry_size = ENTRY.unpack_from(index['map'], entries_at + (number - 1) * ENTRY.size)[0]
+                if size is None or entry_size == size:
+                    return _entry(index, number)
+            slot = (slot + 1) & mask
+
+def identify_rom(path):
+    """
+    Identify a ROM against the DATs without reading it: by its cached content hashes, or for
+    archived ROMs by the CRC32 the archive directory stores. Returns the DAT entry or None.
+    """
+    hashes = get_cached_rom_hashes(path)
+    if hashes:
+        return lookup_sha1(hashes['sha1']) or lookup_crc(hashes['crc32'])
+    archive_path, member_name = split_archive_path(path)
+    if archive_path is None:
+        return None
+    member = next((member for member in list_archive_members(archive_path) if member['name'] == member_name), None)
+    if member is None or member.get('crc') is None:
+        return None
+    return lookup_crc(member['crc'], member['size'])
+
+def import_dat_file(path):
+    """Copy a DAT file into Config/DATs and rebuild the index; returns (entries, errors) like build_dat_index"""
+    entries = sum(1 for _ in parse_dat_file(path))  # Raises ValueError before anything is copied
+    if not entries:
+        raise ValueError(f"{os.path.basename(path)} lists no ROMs with CRC32 or SHA-1 hashes")
+    os.makedirs(DAT_DIRECTORY, exist_ok=True)
+    target = os.path.join(DAT_DIRECTORY, os.path.basename(path))
+    if os.path.splitext(target)[1].lower() not in DAT_EXTENSIONS:
+        target += '.dat'
+    if os.path.abspath(path) != os.path.abspath(target):
+        shutil.copyfile(path, target + '.tmp')
+        os.replace(target + '.tmp', target)
+    return build_dat_index()
+
+def get_dat_index_version():
+    """A number that changes whenever the index is rebuilt, for caches of identification results"""
+    _current_index()
+    return INDEX_STATE['version']
+
+def get_dat_index_stats():
+    """Return the number of indexed ROMs, the DAT files they came from and the systems they cover"""
+    index = _current_index()
+    if index is None:
+        return {'entries': 0, 'sources': [], 'systems': []}
+    return {'entries': index['entries'], 'sources': sorted(index['meta']['sources']), 'systems': index['meta']['systems']}
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Emulator Health
+Records the outcome (exit code, time to exit) of every launch per emulator and system,
+persists it in Config/emulator_health.json and picks the first healthy launch plan from
+an ordered fallback chain (standalone -> RetroArch core A -> core B ...)
+"""
+
+import os
+import json
+import time
+import threading
+
+HEALTH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "emulator_health.json")
+FAST_FAILURE_SECONDS = 10  # A non-zero exit sooner than this counts as failing fast
+UNHEALTHY_AFTER = 2  # Consecutive fast failures before an emulator is skipped
+RETRY_AFTER_SECONDS = 24 * 3600  # Give a skipped emulator another chance after this long
+
+# Alternative RetroArch cores tried, in order, after a system's primary 'retroarch_core'
+# (names without the library extension, which is taken from the primary core)
+RETROARCH_FALLBACK_CORES = {
+    'Nintendo Entertainment System': ['nestopia_libretro', 'mesen_libretro'],
+    'Super Nintendo': ['bsnes_libretro', 'snes9x2010_libretro'],
+    'Game Boy': ['sameboy_libretro', 'mgba_libretro'],
+    'Game Boy Color': ['sameboy_libretro', 'mgba_libretro'],
+    'Game Boy Advance': ['vbam_libretro', 'gpsp_libretro'],
+    'Sega Genesis': ['picodrive_libretro'],
+    'Nintendo 64': ['parallel_n64_libretro'],
+    'PlayStation 1': ['swanstation_libretro', 'mednafen_psx_libretro'],
+    'Nintendo DS': ['melonds_libretro']
+}
+
+# "emulator id@system" -> {'launches', 'failures', 'fast_failures', 'consecutive_fast_failures',
+#                          'last_returncode', 'last_runtime', 'last_launch'}
+HEALTH_RECORDS = {}
+HEALTH_STATE = {'loaded': False}
+HEALTH_LOCK = threading.Lock()
+
+def emulator_id(launch_plan):
+    """Identify the emulator of a launch plan: executable name, plus the core for RetroArch"""
+    name = os.path.basename(str(launch_plan['emulator_path']))
+    if launch_plan.get('core_path'):
+        name += f"|{os.path.basename(str(launch_plan['core_path']))}"
+    return name
+
+def _record_key(emulator, system):
+    return f"{emulator}@{system or 'Unknown System'}"
+
+def _load_health():
+    """Read the health file once (lock held)"""
+    if HEALTH_STATE['loaded']:
+        return
+    HEALTH_STATE['loaded'] = True
+    try:
+        with open(HEALTH_FILE, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            HEALTH_RECORDS.update({key: value for key, value in records.items() if isinstance(value, dict)})
+    except (OSError, ValueError):
+        pass
+
+def _save_health():
+    """Write the health records atomically (lock held)"""
+    try:
+        os.makedirs(os.path.dirname(HEALTH_FILE), exist_ok=True)
+        temp_file = HEALTH_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(HEALTH_RECORDS, f, indent=2, sort_keys=True)
+        os.replace(temp_file, HEALTH_FILE)
+    except OSError:
+        pass
+
+def record_outcome(emulator, system, returncode, runtime, launched_at=None):
+    """Record one launch outcome; returncode None means the emulator could not be started"""
+    with HEALTH_LOCK:
+        _load_health()
+        record = HEALTH_RECORDS.setdefault(_record_key(emulator, system), {
+            'launches': 0, 'failures': 0, 'fast_failures': 0, 'consecutive_fast_failures': 0,
+            'last_returncode': None, 'last_runtime': None, 'last_launch': None
+        })
+        record['launches'] += 1
+        record['last_returncode'] = returncode
+        record['last_runtime'] = round(runtime, 1)
+        record['last_launch'] = launched_at or time.time()
+        if returncode != 0:
+            record['failures'] += 1
+        if returncode != 0 and runtime < FAST_FAILURE_SECONDS:
+            record['fast_failures'] += 1
+            record['consecutive_fast_failures'] += 1
+        else:
+            record['consecutive_fast_failures'] = 0
+        _save_health()
+
+def is_emulator_healthy(emulator, system, now=None):
+    """An emulator is unhealthy after UNHEALTHY_AFTER fast failures in a row, until RETRY_AFTER_SECONDS pass"""
+    with HEALTH_LOCK:
+        _load_health()
+        record = HEALTH_RECORDS.get(_record_key(emulator, system))
+        if not record or record['consecutive_fast_failures'] < UNHEALTHY_AFTER:
+            return True
+        return (now or time.time()) - (record['last_launch'] or 0) >= RETRY_AFTER_SECONDS
+
+def select_launch_plans(launch_chain, system):
+    """
+    Order a fallback chain of launch plans for a launch: healthy plans first, in chain order,
+    then the unhealthy ones (so a game is still launchable when everything is failing).
+    Returns (ordered plans, skipped emulator ids).
+    """
+    healthy, unhealthy = [], []
+    for launch_plan in launch_chain:
+        if is_emulator_healthy(emulator_id(launch_plan), system):
+            healthy.append(launch_plan)
+        else:
+            unhealthy.append(launch_plan)
+    return healthy + unhealthy, [emulator_id(launch_plan) for launch_plan in unhealthy]
+
+def mark_session_health(session, launch_plan, system):
+    """Tag a new supervisor session so its exit is recorded against the plan's emulator"""
+    session['health'] = (emulator_id(launch_plan), system)
+
+def record_session_health(session):
+    """Supervisor exit callback: record the outcome of a tagged session"""
+    if not session.get('health') or session.get('stopped_by_user'):
+        return
+    emulator, system = session['health']
+    runtime = (session['ended_at'] or time.time()) - session['started_at']
+    record_outcome(emulator, system, session['returncode'], runtime, session['started_at'])
+
+def get_health_records():
+    """Return a copy of all health records keyed by 'emulator id@system'"""
+    with HEALTH_LOCK:
+        _load_health()
+        return {key: dict(record) for key, record in HEALTH_RECORDS.items()}
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Emulator Probe
+One-time capability check per emulator binary: executable format and architecture,
+a --version run with a timeout, and the usable cores next to RetroArch. Results are
+cached in Config/emulator_probes.json by (path, size, mtime), so the library can mark
+games whose emulator cannot run on this machine without probing on every render.
+"""
+
+import os
+import json
+import queue
+import struct
+import plistlib
+import platform
+import threading
+import subprocess
+from functools import lru_cache
+
+PROBE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "emulator_probes.json")
+VERSION_TIMEOUT = 3  # Seconds a --version run may take before it is killed
+CORE_SUFFIXES = ('.so', '.dll', '.dylib')
+
+ELF_MACHINES = {0x03: 'x86', 0x3E: 'x86_64', 0x28: 'arm', 0xB7: 'arm64', 0xF3: 'riscv'}
+PE_MACHINES = {0x014C: 'x86', 0x8664: 'x86_64', 0x01C4: 'arm', 0xAA64: 'arm64'}
+MACHO_CPUS = {0x7: 'x86', 0x01000007: 'x86_64', 0xC: 'arm', 0x0100000C: 'arm64'}
+HOST_FORMATS = {'Linux': 'ELF', 'Windows': 'PE', 'Darwin': 'Mach-O'}
+# Architectures each host architecture can execute (Rosetta lets arm64 Macs run x86_64)
+COMPATIBLE_ARCHES = {
+    'x86_64': {'x86_64', 'x86'},
+    'x86': {'x86'},
+    'arm64': {'arm64', 'arm'},
+    'arm': {'arm'}
+}
+
+PROBE_CACHE = {}  # path -> probe result including the 'size' and 'mtime' it was made for
+PROBE_STATE = {'loaded': False, 'pending': set()}
+PROBE_QUEUE = queue.Queue()
+PROBE_LOCK = threading.Lock()
+PROBE_THREAD = None
+
+def host_arch():
+    """Normalize platform.machine() to the architecture names used here"""
+    machine = platform.machine().lower()
+    return {'amd64': 'x86_64', 'aarch64': 'arm64', 'i386': 'x86', 'i686': 'x86', 'armv7l': 'arm'}.get(machine, machine)
+
+def read_binary_format(path):
+    """Identify an executable from its header; returns (format, [architectures])"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(64)
+            if header[:4] == b'\x7fELF' and len(header) >= 20:
+                endian = '<' if header[5] == 1 else '>'
+                machine = struct.unpack(endian + 'H', header[18:20])[0]
+                return 'ELF', [ELF_MACHINES.get(machine, f"machine {machine:#x}")]
+            if header[:2] == b'MZ' and len(header) >= 64:
+                f.seek(struct.unpack('<I', header[60:64])[0])
+                pe_header = f.read(6)
+                if pe_header[:4] == b'PE\0\0':
+                    machine = struct.unpack('<H', pe_header[4:6])[0]
+                    return 'PE', [PE_MACHINES.get(machine, f"machine {machine:#x}")]
+                return 'MZ', []
+            if header[:4] in (b'\xcf\xfa\xed\xfe', b'\xce\xfa\xed\xfe') and len(header) >= 8:
+                cpu = struct.unpack('<I', header[4:8])[0]
+                return 'Mach-O', [MACHO_CPUS.get(cpu, f"cpu {cpu:#x}")]
+            if header[:4] == b'\xca\xfe\xba\xbe' and len(header) >= 8:
+                # Universal binary: a big-endian table of (cputype, ...) per slice
+                count = struct.unpack('>I', header[4:8])[0]
+                if 0 < count < 16:
+                    f.seek(8)
+                    table = f.read(20 * count)
+                    cpus = [struct.unpack('>I', table[i * 20:i * 20 + 4])[0] for i in range(len(table) // 20)]
+                    return 'Mach-O', [MACHO_CPUS.get(cpu, f"cpu {cpu:#x}") for cpu in cpus]
+            if header[:2] == b'#!':
+                return 'script', []
+    except (OSError, struct.error):
+        pass
+    return 'unknown', []
+
+def resolve_bundle_executable(path):
+    """Return the binary inside a macOS .app bundle, or the path itself"""
+    if not path.endswith('.app') or not os.path.isdir(path):
+        return path
+    contents = os.path.join(path, 'Contents')
+    try:
+        with open(os.path.join(contents, 'Info.plist'), 'rb') as f:
+            executable = plistlib.load(f).get('CFBundleExecutable')
+        if executable:
+            return os.path.join(contents, 'MacOS', executable)
+    except (OSError, ValueError, plistlib.InvalidFileException):
+        pass
+    macos_dir = os.path.join(contents, 'MacOS')
+    try:
+        binaries = sorted(os.listdir(macos_dir))
+    except OSError:
+        return path
+    return os.path.join(macos_dir, binaries[0]) if binaries else path
+
+def check_compatibility(binary_format, arches):
+    """Return (runnable, reason) for a binary format/architecture on this host"""
+    if binary_format == 'script':
+        return True, None
+    expected = HOST_FORMATS.get(platform.system())
+    if binary_format == 'unknown' or binary_format == 'MZ':
+        return False, "not a recognized executable"
+    if expected and binary_format != expected:
+        return False, f"{binary_format} binary cannot run on {platform.system()}"
+    arch = host_arch()
+    runnable_arches = set(COMPATIBLE_ARCHES.get(arch, {arch}))
+    if platform.system() == 'Darwin' and arch == 'arm64':
+        runnable_arches.add('x86_64')
+    if arches and arch in COMPATIBLE_ARCHES and not runnable_arches.intersection(arches):
+        return False, f"built for {'/'.join(arches)}, this machine is {arch}"
+    return True, None
+
+def run_version(executable):
+    """Run 'executable --version'; returns (version line or None, runnable, reason)"""
+    try:
+        result = subprocess.run([executable, '--version'], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, timeout=VERSION_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        # GUI emulators often ignore --version and open a window; it started, so it runs
+        return None, True, None
+    except OSError as e:
+        return None, False, f"cannot be started: {e.strerror or e}"
+
+    if result.returncode in (126, 127):
+        # The shell/dynamic loader convention for "cannot execute" / missing libraries
+        message = (result.stderr or result.stdout).decode('utf-8', errors='replace').strip().splitlines()
+        return None, False, message[0][:120] if message else f"exits with {result.returncode}"
+    for output in (result.stdout, result.stderr):
+        for line in output.decode('utf-8', errors='replace').splitlines():
+            if line.strip():
+                return line.strip()[:80], True, None
+    return None, True, None
+
+def list_retroarch_cores(cores_directory):
+    """List the libretro cores in a directory with their format and whether they load on this host"""
+    cores = []
+    try:
+        filenames = sorted(os.listdir(cores_directory))
+    except OSError:
+        return cores
+    for filename in filenames:
+        if not filename.endswith(CORE_SUFFIXES) or '_libretro' not in filename:
+            continue
+        core_path = os.path.join(cores_directory, filename)
+        binary_format, arches = read_binary_format(core_path)
+        usable, _ = check_compatibility(binary_format, arches)
+        cores.append({'name': filename, 'format': binary_format, 'arch': arches, 'usable': usable})
+    return cores
+
+def _file_signature(path):
+    """(size, mtime) of a file, or of the binary inside an .app bundle"""
+    stat = os.stat(resolve_bundle_executable(path))
+    return stat.st_size, stat.st_mtime
+
+def _load_probes():
+    """Read the probe cache file once (lock held)"""
+    if PROBE_STATE['loaded']:
+        return
+    PROBE_STATE['loaded'] = True
+    try:
+        with open(PROBE_FILE, 'r', encoding='utf-8') as f:
+            probes = json.load(f)
+        if isinstance(probes, dict):
+            PROBE_CACHE.update({path: probe for path, probe in probes.items() if isinstance(probe, dict)})
+    except (OSError, ValueError):
+        pass
+
+def _save_probes():
+    """Write the probe cache atomically (lock held)"""
+    try:
+        os.makedirs(os.path.dirname(PROBE_FILE), exist_ok=True)
+        temp_file = PROBE_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(PROBE_CACHE, f, indent=2, sort_keys=True)
+        os.replace(temp_file, PROBE_FILE)
+    except OSError:
+        pass
+
+def _cores_signature(cores_directory):
+    try:
+        return os.stat(cores_directory).st_mtime if cores_directory else None
+    except OSError:
+        return None
+
+def get_probe(path, cores_directory=None):
+    """Return the cached probe for path if it is still valid, without probing"""
+    path = str(path)
+    try:
+        size, mtime = _file_signature(path)
+    except OSError:
+        return None
+    with PROBE_LOCK:
+        _load_probes()
+        probe = PROBE_CACHE.get(path)
+    if not probe or probe['size'] != size or probe['mtime'] != mtime:
+        return None
+    if probe.get('is_retroarch') and cores_directory and probe.get('cores_mtime') != _cores_signature(cores_directory):
+        return None
+    return probe
+
+def probe_emulator(path, cores_directory=None):
+    """Probe one emulator (or return its cached probe). Returns the probe dict, or None if it is missing."""
+    path = str(path)
+    probe = get_probe(path, cores_directory)
+    if probe:
+        return probe
+    try:
+        size, mtime = _file_signature(path)
+    except OSError:
+        return None
+
+    executable = resolve_bundle_executable(path)
+    binary_format, arches = read_binary_format(executable)
+    runnable, reason = check_compatibility(binary_format, arches)
+    if runnable and os.name != 'nt' and not os.access(executable, os.X_OK):
+        runnable, reason = False, "not marked executable"
+    version = None
+    if runnable:
+        version, runnable, reason = run_version(executable)
+
+    probe = {
+        'size': size,
+        'mtime': mtime,
+        'format': binary_format,
+        'arch': arches,
+        'runnable': runnable,
+        'reason': reason,
+        'version': version,
+        'is_retroarch': 'retroarch' in os.path.basename(path).lower()
+    }
+    if probe['is_retroarch'] and cores_directory:
+        probe['cores'] = list_retroarch_cores(cores_directory)
+        probe['cores_mtime'] = _cores_signature(cores_directory)
+
+    with PROBE_LOCK:
+        PROBE_CACHE[path] = probe
+        _save_probes()
+    return probe
+
+def is_emulator_runnable(path):
+    """False only if a cached probe found the emulator cannot run here (unknown means runnable)"""
+    probe = get_probe(path)
+    return probe is None or probe['runnable']
+
+@lru_cache(maxsize=256)
+def _core_usable(core_path, size, mtime):
+    binary_format, arches = read_binary_format(core_path)
+    return check_compatibility(binary_format, arches)[0]
+
+def is_core_usable(core_path):
+    """Check a libretro core's format/architecture against this host (header read only, cached)"""
+    try:
+        stat = os.stat(core_path)
+    except OSError:
+        return False
+    return _core_usable(str(core_path), stat.st_size, stat.st_mtime)
+
+def _probe_worker():
+    """Background thread: probe queued emulators, then call the batch's completion callback"""
+    while True:
+        paths, cores_directory, on_complete = PROBE_QUEUE.get()
+        probed_any = False
+        for path in paths:
+            try:
+                if get_probe(path, cores_directory) is None:
+                    probed_any = probe_emulator(path, cores_directory) is not None or probed_any
+            except Exception:
+                pass
+            finally:
+                with PROBE_LOCK:
+                    PROBE_STATE['pending'].discard(path)
+        if probed_any and on_complete:
+            try:
+                on_complete()
+            except Exception:
+                pass
+        PROBE_QUEUE.task_done()
+
+def probe_emulators_in_background(paths, cores_directory=None, on_complete=None):
+    """
+    Queue emulators that have no valid cached probe. on_complete is called once the batch
+    is done if anything new was probed (e.g. to recompile launch plans).
+    """
+    global PROBE_THREAD
+    paths = [str(path) for path in paths if path]
+    paths = [path for path in paths if get_probe(path, cores_directory) is None]
+    with PROBE_LOCK:
+        paths = [path for path in dict.fromkeys(paths) if path not in PROBE_STATE['pending']]
+        if not paths:
+            return
+        PROBE_STATE['pending'].update(paths)
+        if PROBE_THREAD is None or not PROBE_THREAD.is_alive():
+            PROBE_THREAD = threading.Thread(target=_probe_worker, daemon=True)
+            PROBE_THREAD.start()
+    PROBE_QUEUE.put((paths, str(cores_directory) if cores_directory else None, on_complete))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Emulator Profiles
+Lazily loads the Config/Emulators/*.json profiles written by emulator_setup.py
+and compiles them into an extension -> candidate emulator dispatch table
+"""
+
+import os
+import json
+import threading
+
+PROFILES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "Emulators")
+
+# Profile cache: path -> (mtime, size, profile dict). Files are only parsed on first use
+# and re-parsed when their mtime/size changes.
+PROFILE_CACHE = {}
+DISPATCH_TABLE = {}
+DISPATCH_SIGNATURE = None
+PROFILES_LOCK = threading.Lock()
+
+def _profile_signature(directory):
+    """Return a cheap (name, mtime, size) signature of the profile directory"""
+    signature = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith('.json'):
+                    stat = entry.stat()
+                    signature.append((entry.name, stat.st_mtime, stat.st_size))
+    except OSError:
+        return ()
+    return tuple(sorted(signature))
+
+def _normalize_profile(emulator_id, raw, profile_path):
+    """Normalize a raw profile into the shape used by the launchers"""
+    systems = raw.get('systems') or raw.get('supported_systems') or []
+    extensions = [ext.lower() if ext.startswith('.') else f".{ext.lower()}"
+                  for ext in raw.get('extensions', [])]
+    return {
+        'id': emulator_id,
+        'name': raw.get('name', emulator_id),
+        'executable': raw.get('executable'),
+        'systems': list(systems),
+        'extensions': extensions,
+        'cores_directory': raw.get('cores_directory'),
+        'cores': dict(raw.get('cores', {})),
+        'launch_template': raw.get('launch_template'),
+        'is_retroarch': 'retroarch' in emulator_id.lower(),
+        'profile_path': profile_path
+    }
+
+def load_profile(emulator_id, directory=None):
+    """Load a single profile by id, reusing the cached copy if the file is unchanged"""
+    directory = directory or PROFILES_DIRECTORY
+    profile_path = os.path.join(directory, f"{emulator_id}.json")
+    try:
+        stat = os.stat(profile_path)
+    except OSError:
+        PROFILE_CACHE.pop(profile_path, None)
+        return None
+
+    cached = PROFILE_CACHE.get(profile_path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    try:
+        with open(profile_path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    profile = _normalize_profile(emulator_id, raw, profile_path)
+    PROFILE_CACHE[profile_path] = (stat.st_mtime, stat.st_size, profile)
+    return profile
+
+def _compile_dispatch_table(profiles):
+    """Build extension -> [profile] with standalone emulators ahead of RetroArch"""
+    table = {}
+    system_extensions = {}
+
+    for profile in profiles:
+        if profile['is_retroarch']:
+            continue
+        for ext in profile['extensions']:
+            table.setdefault(ext, []).append(profile)
+            for system in profile['systems']:
+                system_extensions.setdefault(system, set()).add(ext)
+
+    # RetroArch profiles list systems rather than extensions, so map them through
+    # the extensions the standalone profiles declared for the same systems.
+    for profile in profiles:
+        if not profile['is_retroarch']:
+            continue
+        extensions = set(profile['extensions'])
+        for system in profile['systems']:
+            extensions.update(system_extensions.get(system, ()))
+        for ext in sorted(extensions):
+            table.setdefault(ext, []).append(profile)
+
+    return table
+
+def get_dispatch_table(directory=None):
+    """Return the extension dispatch table, rebuilding it only if a profile changed"""
+    global DISPATCH_TABLE, DISPATCH_SIGNATURE
+    directory = directory or PROFILES_DIRECTORY
+
+    with PROFILES_LOCK:
+        signature = (directory, _profile_signature(directory))
+        if signature == DISPATCH_SIGNATURE:
+            return DISPATCH_TABLE
+
+        profiles = []
+        for name, _, _ in signature[1]:
+            profile = load_profile(os.path.splitext(name)[0], directory)
+            if profile:
+                profiles.append(profile)
+
+        DISPATCH_TABLE = _compile_dispatch_table(profiles)
+        DISPATCH_SIGNATURE = signature
+        return DISPATCH_TABLE
+
+def get_emulator_candidates(extension, directory=None):
+    """Return the ordered candidate emulator profiles for a file extension"""
+    return list(get_dispatch_table(directory).get(extension.lower(), []))
+
+def get_extension_systems(extension, directory=None):
+    """Return every system the profiles for an extension emulate; more than one means the extension is ambiguous"""
+    return {system for profile in get_emulator_candidates(extension, directory) for system in profile['systems']}
+
+def get_profile_extensions(directory=None):
+    """Return every extension that at least one profile can handle"""
+    return set(get_dispatch_table(directory).keys())
+
+def locate_profile_executable(profile, emulators_directory):
+    """Find a profile's executable in the Emulators tree created by emulator_setup.py"""
+    executable = profile.get('executable')
+    if not executable:
+        return None
+
+    search_dirs = [
+        emulators_directory,
+        os.path.join(emulators_directory, "Standalone"),
+        os.path.join(emulators_directory, "RetroArch")
+    ]
+    for search_dir in search_dirs:
+        candidate = os.path.join(search_dir, executable)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def profile_to_config(profile, extension):
+    """Convert a profile into an EMULATOR_CONFIGS-style entry for the given extension"""
+    system = profile['systems'][0] if profile['systems'] else 'Unknown System'
+    return {
+        'emulator_exe': profile.get('executable') or 'auto-detect',
+        'emulator_name': profile['name'],
+        'system': system,
+        'launch_template': profile.get('launch_template') or '"{emulator_path}" "{game_path}"',
+        'retroarch_core': profile['cores'].get(extension.lower(), 'auto'),
+        'profile_id': profile['id']
+    }
+
+def invalidate_profiles():
+    """Drop all cached profiles and the compiled dispatch table"""
+    global DISPATCH_TABLE, DISPATCH_SIGNATURE
+    with PROFILES_LOCK:
+        PROFILE_CACHE.clear()
+        DISPATCH_TABLE = {}
+        DISPATCH_SIGNATURE = None
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Game Catalog
+Keeps the metadata of every organized game in one catalog file (retroflow_catalog.json at
+the top of the organized directory) instead of a *_metadata.json file next to each ROM.
+Writes are batched into transactions: a batch is applied to a copy of the catalog and
+written atomically when it completes, or dropped if it fails, so the catalog on disk is
+always whole. Reading the metadata of the whole library is a single file open. Sidecar
+files can still be exported for tools that expect them.
+"""
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+CATALOG_FILENAME = "retroflow_catalog.json"
+CATALOG_VERSION = 1
+SIDECAR_SUFFIX = "_metadata.json"
+
+# catalog path -> (size, mtime, games); games map paths relative to the catalog's directory to metadata
+CATALOG_CACHE = {}
+CATALOG_LOCK = threading.RLock()
+
+def catalog_path(directory):
+    """Path of the catalog file for an organized games directory"""
+    return os.path.join(os.path.abspath(str(directory)), CATALOG_FILENAME)
+
+def _catalog_key(directory, game_path):
+    """Games are keyed by their path relative to the catalog, so the directory can be moved"""
+    return os.path.relpath(os.path.abspath(str(game_path)), os.path.abspath(str(directory))).replace(os.sep, '/')
+
+def _read_catalog(path):
+    """The catalog's games, re-read only if the file changed (lock held); raises ValueError if corrupt"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    cached = CATALOG_CACHE.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+        return cached[2]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except OSError:
+        return {}
+    if not isinstance(catalog, dict) or not isinstance(catalog.get('games'), dict):
+        raise ValueError(f"{path} is not a RetroFlow catalog")
+    CATALOG_CACHE[path] = (stat.st_size, stat.st_mtime, catalog['games'])
+    return catalog['games']
+
+def _write_catalog(path, games):
+    """Replace the catalog file atomically (lock held)"""
+    temp_file = path + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': CATALOG_VERSION, 'games': games}, f, indent=1, sort_keys=True)
+    os.replace(temp_file, path)
+    stat = os.stat(path)
+    CATALOG_CACHE[path] = (stat.st_size, stat.st_mtime, games)
+
+def load_catalog(directory):
+    """Return {absolute game path: metadata} for every game in a directory's catalog, in one read"""
+    directory = os.path.abspath(str(directory))
+    with CATALOG_LOCK:
+        games = _read_catalog(catalog_path(directory))
+        return {os.path.join(directory, *key.split('/')): dict(metadata) for key, metadata in games.items()}
+
+@contextmanager
+def catalog_batch(directory):
+    """
+    Batch catalog writes into one transaction:
+
+        with catalog_batch("Games_Organized") as changes:
+            changes[game_path] = metadata   # add or replace
+            changes[other_path] = None      # remove
+
+    Keys are game paths (absolute, or relative to the directory). The changes are written in
+    one atomic replace when the block ends, and discarded if it raises.
+    """
+    directory = os.path.abspath(str(directory))
+    path = catalog_path(directory)
+    changes = {}
+    with CATALOG_LOCK:
+        yield changes
+        if not changes:
+            return
+        games = dict(_read_catalog(path))
+        for game_path, metadata in changes.items():
+            key = _catalog_key(directory, game_path)
+            if metadata is None:
+                games.pop(key, None)
+            elif isinstance(metadata, dict):
+                games[key] = dict(metadata)
+            else:
+                raise ValueError(f"catalog metadata for {game_path} must be a dict or None")
+        os.makedirs(directory, exist_ok=True)
+        _write_catalog(path, games)
+
+def prune_catalog(directory, changes=None):
+    """
+    Drop catalog entries whose ROM no longer exists; returns how many were removed.
+    Pass the changes of an open catalog_batch to prune as part of that transaction.
+    """
+    if changes is None:
+        with catalog_batch(directory) as batch:
+            return prune_catalog(directory, batch)
+    missing = [game_path for game_path in load_catalog(directory) if not os.path.exists(game_path)]
+    for game_path in missing:
+        changes[game_path] = None
+    return len(missing)
+
+def export_sidecars(directory, overwrite=True):
+    """
+    Write the old per-ROM <name>_metadata.json files from the catalog, for tools that expect them.
+    Returns (written, errors) where errors maps game path -> message.
+    """
+    written = 0
+    errors = {}
+    for game_path, metadata in load_catalog(directory).items():
+        sidecar_path = os.path.splitext(game_path)[0] + SIDECAR_SUFFIX
+        if not overwrite and os.path.exists(sidecar_path):
+            continue
+        try:
+            with open(sidecar_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2)
+            written += 1
+        except OSError as e:
+            errors[game_path] = str(e)
+    return written, errors
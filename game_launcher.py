@@ -1,4 +1,3 @@
-import subprocess
 import sys
 import os
 import json
@@ -18,6 +17,53 @@ import platform
 import glob
 import threading
 from pathlib import Path
+from collections import OrderedDict
+from emulator_profiles import (
+    get_emulator_candidates, get_extension_systems, get_profile_extensions, profile_to_config
+)
+from game_profiles import (
+    load_game_profiles, find_game_profile, compile_profile_launch_plan, make_launch_plan
+)
+from launch_commands import parse_launch_template, render_argv
+from process_supervisor import (
+    add_exit_callback, add_first_output_callback, launch_session, get_session, list_sessions,
+    collect_exited_sessions, session_runtime, terminate_session, session_output
+)
+from launch_policy import apply_session_policy, release_session_policy
+from prefetch import prefetch_launch_plan, set_source_resolver
+from launch_history import (
+    mark_launch, record_session_history, warm_predicted_games, predict_games, get_game_history, get_hit_rate
+)
+from emulator_health import (
+    RETROARCH_FALLBACK_CORES, emulator_id, is_emulator_healthy, select_launch_plans, mark_session_health,
+    record_session_health, record_outcome, get_health_records
+)
+from emulator_probe import is_emulator_runnable, is_core_usable, probe_emulators_in_background, get_probe
+from session_telemetry import start_telemetry, record_session_telemetry, load_session_stats, aggregate_by_emulator
+from warm_host import can_launch_warm, launch_warm, prestart_warm_host, stop_warm_host, get_warm_host_status
+from archive_cache import (
+    ARCHIVE_PATH_PATTERN, is_archive, list_archived_roms, split_archive_path, rom_file_size, extract_rom,
+    localize_launch_plan, get_archive_cache_stats
+)
+from rom_cache import set_cartridge_roots, local_rom_path, record_session_rom_cache, get_rom_cache_stats
+from soft_patch import (
+    find_patched_games, get_patched_game, patched_rom_size, build_patched_rom, mark_patched_session,
+    record_session_patch_saves, get_patch_cache_stats, game_source_files
+)
+from rom_hashing import get_cached_rom_hashes, hash_roms_in_background, get_hash_cache_stats, get_hash_cache_version
+from dat_index import identify_rom, import_dat_file, get_dat_index_stats, get_dat_index_version
+from rom_header import get_rom_header, describe_rom_header, save_header_cache
+from title_matcher import compile_title_matcher, find_longest_title
+from rom_tags import get_rom_tags, describe_rom_tags, rom_matches, rom_sort_key, split_tag_filters
+from title_search import sync_titles, search_titles, best_title_match
+from game_similarity import game_features, get_similarity_model, similar_games
+from library_index import (
+    LIBRARY_SORTS, LIST_PAGE_SIZE, sync_library, get_library_record, list_library, resolve_system, get_library_systems
+)
+from launch_timing import (
+    PHASES, start_launch_timer, mark_phase, finish_launch_timer, record_first_output, get_latency_histograms,
+    get_recent_launches, format_histogram, bucket_labels
+)
 
 # --- Enhanced Configuration with Dynamic Detection ---
 GAMES_DIRECTORY = os.path.join(os.path.dirname(__file__), "Games")
@@ -116,6 +162,8 @@ EMULATOR_CONFIGS = {
 GAME_DATABASE = {
     
 }
+# Compiled once: finding the longest database key in a name costs one pass over the name
+GAME_DATABASE_MATCHER = compile_title_matcher(GAME_DATABASE)
 
 MAX_STORAGE_MB = 256  # Maximum storage limit in MB
 MAX_STORAGE_BYTES = MAX_STORAGE_MB * 1024 * 1024
@@ -127,14 +175,27 @@ BOOT_TIME = datetime.now()
 AVAILABLE_EMULATORS = {}
 CURRENT_GAMES_LIST = []
 CURRENT_GAME_MAP = {}
+LIBRARY_VERSION = 0  # Bumped whenever games are added/removed or profiles change, for derived models
+LIBRARY_VIEWS_VERSION = None  # Library version the sorted/grouped views were last synced to
 LAST_GAMES_SCAN = 0
 LAST_EMULATORS_SCAN = 0
 SCAN_INTERVAL = 2  # seconds
 
-# File system monitoring
+# File system monitoring: path -> (size, mtime) as of the last scan
 GAMES_LAST_MODIFIED = {}
+CARTRIDGE_LAST_MODIFIED = {}  # Files cartridge games are read from, as of the last cartridge scan
 EMULATORS_LAST_MODIFIED = {}
 
+# Derived game info: game path -> (source files' (size, mtime), inputs version, info), least recently used first
+GAME_INFO_CACHE = OrderedDict()
+GAME_INFO_CACHE_SIZE = 20000
+GAME_INFO_LOCK = threading.Lock()
+
+# Per-game JSON profiles and launch plans, compiled whenever games or emulators change
+GAME_PROFILES = {}
+GAME_LAUNCH_PLANS = {}
+LAUNCH_PLANS_DIRTY = True
+
 # Determine paths
 if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
     SOUNDS_DIRECTORY = os.path.join(sys._MEIPASS, "Sounds")
@@ -188,7 +249,7 @@ except Exception as model_init_error:
 
 # --- Dynamic File System Monitoring ---
 def get_directory_modification_times(directory):
-    """Get modification times for all files in directory"""
+    """Get (size, modification time) for all files in directory"""
     mod_times = {}
     if not os.path.exists(directory):
         return mod_times
@@ -198,7 +259,8 @@ def get_directory_modification_times(directory):
             for file in files:
                 file_path = os.path.join(root, file)
                 try:
-                    mod_times[file_path] = os.path.getmtime(file_path)
+                    stat = os.stat(file_path)
+                    mod_times[file_path] = (stat.st_size, stat.st_mtime)
                 except OSError:
                     pass
     except Exception:
@@ -223,7 +285,7 @@ def has_directory_changed(directory, last_mod_times):
 
 def dynamic_scan_available_emulators():
     """Dynamically scan for emulators with change detection"""
-    global AVAILABLE_EMULATORS, EMULATORS_LAST_MODIFIED, LAST_EMULATORS_SCAN
+    global AVAILABLE_EMULATORS, EMULATORS_LAST_MODIFIED, LAST_EMULATORS_SCAN, LIBRARY_VERSION
     
     current_time = time.time()
     if current_time - LAST_EMULATORS_SCAN < SCAN_INTERVAL:
@@ -238,6 +300,10 @@ def dynamic_scan_available_emulators():
         return False  # No changes detected
     
     EMULATORS_LAST_MODIFIED = new_mod_times
+    mark_launch_plans_dirty()
+    with GAME_INFO_LOCK:
+        GAME_INFO_CACHE.clear()  # Emulator names and systems in the derived game info may change
+    LIBRARY_VERSION += 1
     old_emulators = set(AVAILABLE_EMULATORS.keys())
     AVAILABLE_EMULATORS = {}
     
@@ -266,6 +332,11 @@ def dynamic_scan_available_emulators():
         if os.path.exists(retroarch_path):
             AVAILABLE_EMULATORS['retroarch'] = retroarch_path
     
+    # Check once per binary (cached by path, size and mtime) that each emulator runs on this
+    # machine; the launch plans are recompiled when a probe finishes
+    probe_emulators_in_background(list(AVAILABLE_EMULATORS.values()), CORES_DIRECTORY,
+                                  on_complete=mark_launch_plans_dirty)
+    
     # Check for changes and notify
     new_emulators = set(AVAILABLE_EMULATORS.keys())
     added_emulators = new_emulators - old_emulators
@@ -283,9 +354,17 @@ def dynamic_scan_available_emulators():
     
     return True
 
+def library_game_paths():
+    """Paths of every local and cartridge game, local ones first"""
+    return CURRENT_GAMES_LIST + [game_path for games_on_cart in CARTRIDGE_GAMES_MAP.values() for game_path in games_on_cart]
+
+def sync_title_index():
+    """Re-index the titles of local and cartridge games for 'find' and 'play <name>' (only changes are touched)"""
+    sync_titles({game_path: get_rom_tags(game_path)['title'] for game_path in library_game_paths()})
+
 def dynamic_discover_games():
     """Dynamically discover games with change detection"""
-    global CURRENT_GAMES_LIST, GAMES_LAST_MODIFIED, LAST_GAMES_SCAN
+    global CURRENT_GAMES_LIST, GAMES_LAST_MODIFIED, LAST_GAMES_SCAN, LIBRARY_VERSION
     
     current_time = time.time()
     if current_time - LAST_GAMES_SCAN < SCAN_INTERVAL:
@@ -300,15 +379,16 @@ def dynamic_discover_games():
         return False  # No changes detected
     
     GAMES_LAST_MODIFIED = new_mod_times
-    old_games = set(os.path.basename(game) for game in CURRENT_GAMES_LIST)
-    
+    mark_launch_plans_dirty()
     games = []
     if not os.path.isdir(GAMES_DIRECTORY):
         os.makedirs(GAMES_DIRECTORY, exist_ok=True)
         CURRENT_GAMES_LIST = games
+        LIBRARY_VERSION += 1
         return True
     
-    for filename in os.listdir(GAMES_DIRECTORY):
+    filenames = os.listdir(GAMES_DIRECTORY)
+    for filename in filenames:
         full_path = os.path.join(GAMES_DIRECTORY, filename)
         if os.path.isdir(full_path):
             continue
@@ -316,17 +396,35 @@ def dynamic_discover_games():
         # Skip JSON metadata files
         if filename.endswith('.json'):
             continue
+        
+        # ROMs inside archives are indexed from the archive's directory, without extracting
+        archived_roms = list_archived_roms(full_path, is_supported_extension) if is_archive(full_path) else []
+        if archived_roms:
+            games.extend(archived_roms)
+            continue
             
         extension = os.path.splitext(filename)[1].lower()
-        if extension in EMULATOR_CONFIGS:
+        if is_supported_extension(extension):
             games.append(full_path)
     
-    CURRENT_GAMES_LIST = sorted(games)
+    # IPS/BPS/UPS patches next to a ROM are listed as games of their own
+    games.extend(find_patched_games(GAMES_DIRECTORY, filenames, is_supported_extension))
+    
+    # The games still present are already in order, so sorting them together with the
+    # sorted new ones is a single linear merge of two runs
+    old_paths = set(CURRENT_GAMES_LIST)
+    new_paths = set(games)
+    added_paths = new_paths - old_paths
+    removed_paths = old_paths - new_paths
+    games_list = sorted([game_path for game_path in CURRENT_GAMES_LIST if game_path not in removed_paths] + sorted(added_paths))
+    CURRENT_GAMES_LIST = games_list
+    LIBRARY_VERSION += 1
+    hash_roms_in_background(CURRENT_GAMES_LIST)  # Content hashes identify ROMs; each file is hashed once
+    sync_title_index()
     
     # Check for changes and notify
-    new_games = set(os.path.basename(game) for game in CURRENT_GAMES_LIST)
-    added_games = new_games - old_games
-    removed_games = old_games - new_games
+    added_games = set(os.path.basename(game) for game in added_paths)
+    removed_games = set(os.path.basename(game) for game in removed_paths)
     
     if added_games:
         for game in added_games:
@@ -340,41 +438,195 @@ def dynamic_discover_games():
     
     return True
 
-def find_emulator_for_game(game_path):
-    """Find the best available emulator for a given game"""
+def get_emulator_config(extension):
+    """Get the emulator config for an extension, falling back to Config/Emulators profiles"""
+    extension = extension.lower()
+    if extension in EMULATOR_CONFIGS:
+        return dict(EMULATOR_CONFIGS[extension])
+    
+    candidates = get_emulator_candidates(extension)
+    if candidates:
+        return profile_to_config(candidates[0], extension)
+    return None
+
+def is_supported_extension(extension):
+    """Check whether any built-in config or emulator profile handles an extension"""
+    extension = extension.lower()
+    return extension in EMULATOR_CONFIGS or extension in get_profile_extensions()
+
+def extension_is_ambiguous(extension):
+    """Check whether an extension leaves the system open (auto-detected, or emulated for several systems)"""
+    extension = extension.lower()
+    if extension in EMULATOR_CONFIGS:
+        return EMULATOR_CONFIGS[extension]['emulator_exe'] == 'auto-detect'
+    return len(get_extension_systems(extension)) != 1
+
+def find_emulator_chain(game_path):
+    """
+    Find every available emulator for a game as an ordered fallback chain of
+    (emulator_path, config, core_path): the configured emulator, profile emulators,
+    then RetroArch with the primary core and the system's fallback cores
+    """
     extension = os.path.splitext(game_path)[1].lower()
-    config = EMULATOR_CONFIGS.get(extension)
+    config = get_emulator_config(extension)
     
     if not config:
-        return None, "Unknown file type"
+        return []
+    
+    chain = []
     
     # First, try to find the specific emulator
     emulator_exe = config['emulator_exe'].lower()
     
-    if emulator_exe in AVAILABLE_EMULATORS:
-        return AVAILABLE_EMULATORS[emulator_exe], config
-    
-    # Try variations of the emulator name (especially for mGBA)
-    emulator_variations = [
-        emulator_exe.replace('.exe', ''),
-        emulator_exe.replace('.app', ''),
-        emulator_exe.replace('.exe', '-qt.exe'),
-        emulator_exe.replace('.exe', '-sdl.exe'),
-        emulator_exe.replace('mgba', 'mGBA'),
-        emulator_exe.replace('mgba', 'mgba-qt'),
-    ]
+    if emulator_exe in AVAILABLE_EMULATORS and is_emulator_runnable(AVAILABLE_EMULATORS[emulator_exe]):
+        chain.append((AVAILABLE_EMULATORS[emulator_exe], config, None))
+    elif emulator_exe not in AVAILABLE_EMULATORS:
+        # Try variations of the emulator name (especially for mGBA)
+        emulator_variations = [
+            emulator_exe.replace('.exe', ''),
+            emulator_exe.replace('.app', ''),
+            emulator_exe.replace('.exe', '-qt.exe'),
+            emulator_exe.replace('.exe', '-sdl.exe'),
+            emulator_exe.replace('mgba', 'mGBA'),
+            emulator_exe.replace('mgba', 'mgba-qt'),
+        ]
+        
+        for variation in emulator_variations:
+            match = next((available_emu for available_emu in AVAILABLE_EMULATORS
+                          if (variation in available_emu.lower() or available_emu.lower() in variation)
+                          and is_emulator_runnable(AVAILABLE_EMULATORS[available_emu])), None)
+            if match:
+                chain.append((AVAILABLE_EMULATORS[match], config, None))
+                break
     
-    for variation in emulator_variations:
-        for available_emu in AVAILABLE_EMULATORS:
-            if variation in available_emu.lower() or available_emu.lower() in variation:
-                return AVAILABLE_EMULATORS[available_emu], config
+    # Then the other emulators declared by Config/Emulators profiles for this extension
+    for profile in get_emulator_candidates(extension):
+        profile_exe = (profile.get('executable') or '').lower()
+        if profile_exe and profile_exe in AVAILABLE_EMULATORS:
+            emulator_path = AVAILABLE_EMULATORS[profile_exe]
+            if is_emulator_runnable(emulator_path) and all(emulator_path != path for path, _, _ in chain):
+                chain.append((emulator_path, profile_to_config(profile, extension), None))
+    
+    # Finally RetroArch, with each installed core in order
+    if 'retroarch' in AVAILABLE_EMULATORS and is_emulator_runnable(AVAILABLE_EMULATORS['retroarch']):
+        retroarch_path = AVAILABLE_EMULATORS['retroarch']
+        primary_core = config.get('retroarch_core') or 'auto'
+        core_suffix = os.path.splitext(primary_core)[1]
+        core_names = [primary_core] + [core_name + core_suffix for core_name in RETROARCH_FALLBACK_CORES.get(config['system'], [])]
+        core_paths = [os.path.join(CORES_DIRECTORY, core_name) for core_name in core_names]
+        installed_cores = [core_path for core_path in core_paths if os.path.exists(core_path) and is_core_usable(core_path)]
+        for core_path in installed_cores:
+            chain.append((retroarch_path, config, core_path))
+        if not installed_cores:
+            # Let RetroArch pick a core itself
+            chain.append((retroarch_path, config, None))
+    
+    return chain
+
+def find_emulator_for_game(game_path):
+    """Find the best available emulator for a given game"""
+    extension = os.path.splitext(game_path)[1].lower()
+    config = get_emulator_config(extension)
     
-    # Fallback to RetroArch if available
-    if 'retroarch' in AVAILABLE_EMULATORS:
-        return AVAILABLE_EMULATORS['retroarch'], config
+    if not config:
+        return None, "Unknown file type"
+    
+    chain = find_emulator_chain(game_path)
+    if chain:
+        emulator_path, emulator_config, _ = chain[0]
+        return emulator_path, emulator_config
     
     return None, config
 
+# --- Launch Plan Compilation ---
+def mark_launch_plans_dirty():
+    """Flag the launch plans for recompilation after a games or emulators change"""
+    global LAUNCH_PLANS_DIRTY
+    LAUNCH_PLANS_DIRTY = True
+
+def find_profile_emulator(emulator_name):
+    """Resolve the emulator named by a game profile against the scanned emulators"""
+    emulator_name = emulator_name.lower()
+    if emulator_name in AVAILABLE_EMULATORS:
+        return AVAILABLE_EMULATORS[emulator_name]
+    for available_emu, emulator_path in AVAILABLE_EMULATORS.items():
+        if os.path.splitext(available_emu)[0] == emulator_name:
+            return emulator_path
+    return None
+
+def build_launch_chain(game_path, game_profile=None):
+    """Build a launch plan for every emulator in a game's fallback chain, game profile first"""
+    launch_chain = []
+    if game_profile:
+        emulator_path = find_profile_emulator(game_profile['emulator'])
+        if emulator_path:
+            launch_chain.append(compile_profile_launch_plan(game_profile, game_path, emulator_path,
+                                                            cores_directory=CORES_DIRECTORY,
+                                                            cwd=os.path.dirname(os.path.abspath(__file__))))
+    
+    game_info = auto_detect_game_info(game_path)
+    for emulator_path, config, core_path in find_emulator_chain(game_path):
+        if core_path:
+            launch_cmd = [emulator_path, '-L', core_path, game_path]
+            emulator_name = f"RetroArch ({os.path.splitext(os.path.basename(core_path))[0]})"
+        else:
+            launch_cmd = create_launch_command(game_path, emulator_path,
+                                               dict(game_info, launch_template=config['launch_template']))
+            emulator_name = config['emulator_name']
+        if launch_cmd:
+            launch_chain.append(make_launch_plan(launch_cmd, game_path, emulator_path, emulator_name=emulator_name,
+                                                 core_path=core_path))
+    return launch_chain
+
+def build_launch_plan(game_path, game_profile=None):
+    """Resolve the emulator and build the launch command for one game, skipping emulators that keep failing"""
+    launch_plans, _ = select_launch_plans(build_launch_chain(game_path, game_profile),
+                                          auto_detect_game_info(game_path)['system'])
+    return launch_plans[0] if launch_plans else None
+
+def iter_launch_plans(game_path, system):
+    """Yield the plans to try for a launch: the compiled plan if its emulator is healthy, then the rest of the fallback chain"""
+    launch_plan = GAME_LAUNCH_PLANS.get(game_path)
+    if launch_plan and is_emulator_healthy(emulator_id(launch_plan), system):
+        yield launch_plan
+    else:
+        launch_plan = None
+    
+    # Only built when the compiled plan is unhealthy or fails to start
+    launch_plans, _ = select_launch_plans(build_launch_chain(game_path, GAME_PROFILES.get(game_path)), system)
+    for fallback_plan in launch_plans:
+        if not launch_plan or fallback_plan['argv'] != launch_plan['argv']:
+            yield fallback_plan
+
+def ensure_launch_plans():
+    """Compile launch plans for every indexed game if games or emulators changed"""
+    global GAME_PROFILES, GAME_LAUNCH_PLANS, LAUNCH_PLANS_DIRTY, LIBRARY_VERSION
+    
+    if not LAUNCH_PLANS_DIRTY:
+        return
+    
+    profiles, errors = load_game_profiles(GAMES_DIRECTORY)
+    for profile_file, profile_errors in errors.items():
+        print_formatted_text(HTML(f"<ansiyellow>⚠ Invalid game profile {html.escape(profile_file)}: {html.escape('; '.join(profile_errors))}</ansiyellow>"))
+    
+    game_profiles = {}
+    launch_plans = {}
+    for game_path in library_game_paths():
+        game_profile = find_game_profile(game_path, profiles)
+        if game_profile:
+            game_profiles[game_path] = game_profile
+        launch_plan = build_launch_plan(game_path, game_profile)
+        if launch_plan:
+            launch_plans[game_path] = launch_plan
+    
+    if game_profiles != GAME_PROFILES:
+        with GAME_INFO_LOCK:
+            GAME_INFO_CACHE.clear()  # Profiles name games
+        LIBRARY_VERSION += 1
+    GAME_PROFILES = game_profiles
+    GAME_LAUNCH_PLANS = launch_plans
+    LAUNCH_PLANS_DIRTY = False
+
 # --- DOS-Style UI Functions ---
 def print_dos_header():
     """Print authentic DOS-style header with dynamic info"""
@@ -459,38 +711,131 @@ def play_typing_sound():
         play_sound("typing", async_play=True)
 
 # --- Enhanced Auto-Configuration System ---
+def _last_modified(path):
+    """(size, mtime) of a file from the Games or cartridge scan snapshots, or None if not in either"""
+    return GAMES_LAST_MODIFIED.get(path) or CARTRIDGE_LAST_MODIFIED.get(path)
+
+def game_source_identity(game_path):
+    """
+    (size, mtime) of each file a game is read from (the archive of an archived ROM, the base
+    ROM and patch of a patched game). Files seen by the last Games or cartridge scan are
+    looked up in its snapshot; others are stat'ed. None if one is missing.
+    """
+    patched_game = get_patched_game(game_path)
+    if patched_game:
+        sources = (patched_game['base'], patched_game['patch'])
+    else:
+        archive_path = next((game_path[:match.end()] for match in ARCHIVE_PATH_PATTERN.finditer(game_path)
+                             if _last_modified(game_path[:match.end()])), None)
+        sources = (archive_path or game_path,)
+    
+    identity = []
+    for source in sources:
+        last_modified = _last_modified(source)
+        if last_modified:
+            identity.append(last_modified)
+            continue
+        try:
+            stat = os.stat(split_archive_path(source)[0] or source)
+        except OSError:
+            return None
+        identity.append((stat.st_size, stat.st_mtime))
+    return tuple(identity)
+
+def snapshot_game_sources(game_paths):
+    """(size, mtime) of the files the given games are read from, taken once per scan"""
+    snapshot = {}
+    for game_path in game_paths:
+        patched_game = get_patched_game(game_path)
+        if patched_game:
+            sources = (patched_game['base'], patched_game['patch'])
+        else:
+            sources = (split_archive_path(game_path)[0] or game_path,)
+        for source in sources:
+            if source in snapshot:
+                continue
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            snapshot[source] = (stat.st_size, stat.st_mtime)
+    return snapshot
+
 def auto_detect_game_info(file_path):
-    """Automatically detect game information with enhanced recognition"""
+    """
+    Automatically detect game information with enhanced recognition. Results are memoized until
+    the change detector sees the ROM change, or new hashes or DATs can identify it.
+    """
+    identity = game_source_identity(file_path)
+    inputs_version = (get_hash_cache_version(), get_dat_index_version())
+    with GAME_INFO_LOCK:
+        cached = GAME_INFO_CACHE.get(file_path)
+        if cached and identity is not None and cached[0] == identity and cached[1] == inputs_version:
+            GAME_INFO_CACHE.move_to_end(file_path)
+            return dict(cached[2])
+    
+    game_info = derive_game_info(file_path)
+    if identity is not None:
+        with GAME_INFO_LOCK:
+            GAME_INFO_CACHE[file_path] = (identity, inputs_version, game_info)
+            GAME_INFO_CACHE.move_to_end(file_path)
+            while len(GAME_INFO_CACHE) > GAME_INFO_CACHE_SIZE:
+                GAME_INFO_CACHE.popitem(last=False)
+    return dict(game_info)
+
+def derive_game_info(file_path):
+    """Work out a game's name, system, emulator, size and identification from its file"""
     filename = os.path.basename(file_path)
     name_without_ext = os.path.splitext(filename)[0]
     extension = os.path.splitext(filename)[1].lower()
     
     # Get emulator info from extension
-    emulator_info = EMULATOR_CONFIGS.get(extension, {
+    emulator_info = get_emulator_config(extension) or {
         'emulator_exe': 'unknown',
         'emulator_name': 'Unknown',
         'system': 'Unknown System',
         'launch_template': '"{emulator_path}" "{game_path}"',
         'retroarch_core': 'auto'
-    })
+    }
     
-    # Clean up game name
-    clean_name = name_without_ext.replace('_', ' ').replace('-', ' ')
-    clean_name = ' '.join(word.capitalize() for word in clean_name.split())
-    
-    # Remove common ROM tags
-    rom_tags = ['(USA)', '(Europe)', '(Japan)', '(World)', '[!]', '(Rev A)', '(Rev B)', '(Rev 1)', '(Rev 2)', '(U)', '(E)', '(J)']
-    for tag in rom_tags:
-        clean_name = clean_name.replace(tag, '').strip()
-    
-    # Enhanced game recognition using database
-    game_key = clean_name.lower()
-    for key, info in GAME_DATABASE.items():
-        if key in game_key:
-            clean_name = info['full_name']
-            if 'system' in info:
-                emulator_info['system'] = info['system']
-            break
+    # Clean up game name: tags such as (USA), (Rev 1) or [!] are parsed out before casing
+    rom_tags = get_rom_tags(filename)
+    clean_name = rom_tags['title'].replace('-', ' ')
+    clean_name = ' '.join(word.capitalize() for word in clean_name.split()) or name_without_ext
+    
+    # A No-Intro/Redump DAT match names the dump exactly
+    dat_entry = identify_rom(file_path)
+    if dat_entry:
+        clean_name = dat_entry['title']
+        # ... and its system, which matters where the extension alone does not tell
+        if extension_is_ambiguous(extension):
+            emulator_info['system'] = dat_entry['system']
+    
+    # The cartridge header knows the real system, e.g. a .gb file that is a Game Boy Color game
+    rom_header = get_rom_header(file_path)
+    if rom_header:
+        emulator_info['system'] = rom_header['system']
+    
+    # A per-game JSON profile names the game explicitly
+    game_profile = GAME_PROFILES.get(file_path)
+    if game_profile and game_profile.get('game_name'):
+        clean_name = game_profile['game_name']
+    
+    # Patched games report the size of the image their patch produces
+    patched_size = patched_rom_size(file_path)
+    
+    # Content hashes, if the background hasher has reached this ROM
+    hashes = get_cached_rom_hashes(file_path) or {}
+    
+    # Enhanced game recognition using database (the longest known title in the name wins)
+    genre = game_profile.get('genre') if game_profile else None
+    database_key = find_longest_title(GAME_DATABASE_MATCHER, clean_name)
+    if database_key is not None:
+        info = GAME_DATABASE[database_key]
+        clean_name = info['full_name']
+        if 'system' in info:
+            emulator_info['system'] = info['system']
+        genre = genre or info.get('genre')
     
     return {
         'game_name': clean_name,
@@ -500,12 +845,20 @@ def auto_detect_game_info(file_path):
         'emulator_name': emulator_info['emulator_name'],
         'launch_template': emulator_info['launch_template'],
         'retroarch_core': emulator_info['retroarch_core'],
-        'file_size': os.path.getsize(file_path),
-        'auto_configured': True
+        'file_size': patched_size if patched_size is not None else rom_file_size(file_path),
+        'crc32': hashes.get('crc32'),
+        'sha1': hashes.get('sha1'),
+        'region': dat_entry['region'] if dat_entry else ', '.join(rom_tags['regions']) or None,
+        'dat_name': dat_entry['name'] if dat_entry else None,
+        'tags': rom_tags,
+        'genre': genre,
+        'keywords': game_profile.get('keywords', []) if game_profile else [],
+        'header': rom_header,
+        'auto_configured': game_profile is None
     }
 
 def create_launch_command(game_path, emulator_path, game_info):
-    """Create appropriate launch command based on game type and available emulator"""
+    """Create the launch argv list based on game type and available emulator"""
     if not emulator_path:
         return None
     
@@ -513,17 +866,18 @@ def create_launch_command(game_path, emulator_path, game_info):
     if 'retroarch' in os.path.basename(emulator_path).lower():
         core_path = os.path.join(CORES_DIRECTORY, game_info['retroarch_core'])
         if os.path.exists(core_path):
-            return f'"{emulator_path}" -L "{core_path}" "{game_path}"'
+            return [emulator_path, '-L', core_path, game_path]
         else:
             # Try without core specification
-            return f'"{emulator_path}" "{game_path}"'
+            return [emulator_path, game_path]
     
     # Special handling for macOS .app bundles
     if emulator_path.endswith('.app'):
-        return f'open -a "{emulator_path}" "{game_path}"'
+        return ['open', '-a', emulator_path, game_path]
     
-    # Use the template from configuration for regular executables
-    return game_info['launch_template'].format(
+    # Use the template from configuration for regular executables (tokenized once, cached)
+    return render_argv(
+        parse_launch_template(game_info['launch_template']),
         emulator_path=emulator_path,
         game_path=game_path
     )
@@ -536,6 +890,7 @@ def display_games_dos_style_dynamic():
     # Perform dynamic scans
     games_changed = dynamic_discover_games()
     emulators_changed = dynamic_scan_available_emulators()
+    ensure_launch_plans()
     
     all_games_map = {}
     current_number = 1
@@ -557,8 +912,9 @@ def display_games_dos_style_dynamic():
             game_info = auto_detect_game_info(game_path)
             file_size = format_bytes(game_info['file_size'])
             
-            # Check if emulator is available
-            emulator_path, _ = find_emulator_for_game(game_path)
+            # Check if emulator is available (resolved when the launch plans were compiled)
+            launch_plan = GAME_LAUNCH_PLANS.get(game_path)
+            emulator_path = launch_plan['emulator_path'] if launch_plan else None
             status = "✓" if emulator_path else "✗"
             
             # Format game entry with better spacing
@@ -580,10 +936,16 @@ def display_games_dos_style_dynamic():
     return all_games_map
 
 # --- Enhanced Game Launcher ---
-def launch_game_enhanced(game_path):
-    """Enhanced game launcher with auto-configuration"""
+def launch_game_enhanced(game_path, timer=None):
+    """Enhanced game launcher with auto-configuration; timer is an optional launch timer started by the caller"""
+    timer = timer or start_launch_timer(game_path)
+    ensure_launch_plans()
     game_info = auto_detect_game_info(game_path)
-    emulator_path, config = find_emulator_for_game(game_path)
+    mark_phase(timer, 'resolve')
+    launch_plans = iter_launch_plans(game_path, game_info['system'])
+    launch_plan = next(launch_plans, None)
+    mark_phase(timer, 'build')
+    emulator_path = launch_plan['emulator_path'] if launch_plan else None
     
     print_formatted_text(HTML("<ansibrightgreen>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightgreen>"))
     print_formatted_text(HTML("<ansibrightgreen>║                                LAUNCHING GAME                                ║</ansibrightgreen>"))
@@ -608,43 +970,484 @@ def launch_game_enhanced(game_path):
         return
     
     play_sound("launch_game")
+    mark_phase(timer, 'ui')
+    
+    # Patched games are built from their ROM and patch (or reused from the patch cache), ROMs
+    # inside .zip/.7z archives are extracted into the archive cache (or reused from it), and
+    # cartridge ROMs launch from their local copy once one is cached
+    try:
+        if get_patched_game(game_path):
+            rom_path = build_patched_rom(game_path)
+        else:
+            rom_path = local_rom_path(extract_rom(game_path))
+    except (OSError, ValueError) as e:
+        print_formatted_text(HTML(f"<ansired>ERROR: {html.escape(str(e))}</ansired>"))
+        play_sound("error")
+        return
+    mark_phase(timer, 'extract')
+    
+    # RetroArch games can be loaded into the idle warm host instead of a new process
+    if can_launch_warm(launch_plan):
+        session = launch_warm(localize_launch_plan(launch_plan, rom_path), game_name=game_info['game_name'],
+                              system=game_info['system'])
+        mark_phase(timer, 'warm_load')
+        if session:
+            session['game_path'] = game_path
+            mark_patched_session(session, rom_path)
+            apply_session_policy(session, game_info['system'])
+            mark_launch(session)
+            mark_phase(timer, 'setup')
+            finish_launch_timer(timer, session)
+            print_formatted_text(HTML(f"<ansibrightgreen>Game loaded into the warm RetroArch host (PID {session['pid']})!</ansibrightgreen>"))
+            play_sound("menu_select")
+            return
+        print_formatted_text(HTML("<ansiyellow>Warm host could not load the game, starting a new emulator...</ansiyellow>"))
+    
     print_loading_animation("Initializing emulator", 2)
+    mark_phase(timer, 'ui')
+    
+    # Execute the launch command compiled at index time, falling back along the chain
+    while launch_plan:
+        local_plan = localize_launch_plan(launch_plan, rom_path)
+        launch_cmd = local_plan['command']
+        launch_argv = local_plan['argv']
+        
+        if not launch_argv:
+            print_formatted_text(HTML("<ansired>ERROR: Could not create launch command!</ansired>"))
+            play_sound("error")
+            return
+        
+        try:
+            print_formatted_text(HTML(f"<ansicyan>Executing: {html.escape(launch_cmd)}</ansicyan>"))
+            
+            # The emulator runs in the background; its exit is reported at the next prompt.
+            # For macOS 'open' commands, don't capture output as it may hang
+            session = launch_session(
+                launch_argv,
+                cwd=local_plan['cwd'],
+                game_path=game_path,
+                game_name=game_info['game_name'],
+                emulator_name=launch_plan['emulator_name'],
+                system=game_info['system'],
+                capture_output=launch_argv[0] != 'open'
+            )
+            mark_phase(timer, 'spawn')
+            # Pin the emulator per its system's launch policy and keep RetroFlow off its cores
+            policy_notes = apply_session_policy(session, game_info['system'])
+            if policy_notes:
+                print_formatted_text(HTML(f"<ansicyan>Launch policy: {html.escape(', '.join(policy_notes))}</ansicyan>"))
+            mark_launch(session)
+            mark_session_health(session, launch_plan, game_info['system'])
+            mark_patched_session(session, rom_path)
+            mark_phase(timer, 'setup')
+            finish_launch_timer(timer, session)
+            print_formatted_text(HTML(f"<ansibrightgreen>Game launched in session {session['id']} (PID {session['pid']})! Use 'ps' to see running games.</ansibrightgreen>"))
+            play_sound("menu_select")
+            return
+        
+        except OSError as e:
+            # The emulator could not be started at all: remember that and try the next one
+            record_outcome(emulator_id(launch_plan), game_info['system'], None, 0)
+            mark_phase(timer, 'spawn')
+            print_formatted_text(HTML(f"<ansired>Launch error: {html.escape(str(e))}</ansired>"))
+            launch_plan = next(launch_plans, None)
+            mark_phase(timer, 'build')
+            if launch_plan:
+                print_formatted_text(HTML(f"<ansiyellow>Falling back to {html.escape(launch_plan['emulator_name'])}...</ansiyellow>"))
+        except Exception as e:
+            print_formatted_text(HTML(f"<ansired>Launch error: {str(e)}</ansired>"))
+            print_formatted_text(HTML("<ansiyellow>Tip: Make sure the emulator is properly installed in the Emulators directory</ansiyellow>"))
+            play_sound("error")
+            return
+    
+    print_formatted_text(HTML("<ansiyellow>Tip: Make sure the emulator is properly installed in the Emulators directory</ansiyellow>"))
+    play_sound("error")
+
+# --- Emulator Sessions ---
+def format_duration(seconds):
+    """Format a duration in seconds as H:MM:SS"""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+def report_exited_sessions():
+    """Print a notice for every emulator session that exited since the last prompt"""
+    for session in collect_exited_sessions():
+        game_name = html.escape(session['game_name'])
+        if session['returncode'] == 0:
+            print_formatted_text(HTML(f"<ansibrightgreen>🎮 Session {session['id']} ({game_name}) exited after {format_duration(session_runtime(session))}</ansibrightgreen>"))
+        else:
+            print_formatted_text(HTML(f"<ansired>🎮 Session {session['id']} ({game_name}) failed with exit code {session['returncode']}</ansired>"))
+            _, stderr_lines = session_output(session, 3)
+            for line in stderr_lines:
+                print_formatted_text(HTML(f"<ansired>   {html.escape(line)}</ansired>"))
+
+def display_sessions():
+    """Display running and recently finished emulator sessions"""
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>║                              EMULATOR SESSIONS                               ║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    
+    sessions = list_sessions()
+    if not sessions:
+        print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansiyellow>No emulator sessions. Launch a game with 'play (number)'.</ansiyellow>                  <ansibrightcyan>║</ansibrightcyan>"))
+    else:
+        for session in sessions:
+            session_line = f"[{session['id']:2d}] PID {session['pid']:<7} {session['game_name'][:28]:<28} {format_duration(session_runtime(session)):>8} {session['status']}"
+            if len(session_line) > 75:
+                session_line = session_line[:72] + "..."
+            color = "ansibrightgreen" if session['ended_at'] is None else ("ansicyan" if session['returncode'] == 0 else "ansired")
+            print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <{color}>{html.escape(session_line):<75}</{color}> <ansibrightcyan>║</ansibrightcyan>"))
+    
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+
+def kill_session(session_id):
+    """Stop a running emulator session"""
+    session = get_session(session_id)
+    if not session:
+        print_formatted_text(HTML(f"<ansired>Session '{html.escape(session_id)}' not found. Use 'ps' to see sessions.</ansired>"))
+        play_sound("error")
+    elif terminate_session(session['id']):
+        print_formatted_text(HTML(f"<ansibrightgreen>Session {session['id']} ({html.escape(session['game_name'])}) stopped.</ansibrightgreen>"))
+        play_sound("menu_select")
+    else:
+        print_formatted_text(HTML(f"<ansiyellow>Session {session['id']} is not running.</ansiyellow>"))
+
+def display_session_output(session_id, num_lines=20):
+    """Display the captured stdout/stderr tail of an emulator session"""
+    session = get_session(session_id)
+    if not session:
+        print_formatted_text(HTML(f"<ansired>Session '{html.escape(session_id)}' not found. Use 'ps' to see sessions.</ansired>"))
+        play_sound("error")
+        return
+    
+    stdout_lines, stderr_lines = session_output(session, num_lines)
+    print_formatted_text(HTML(f"<ansibrightcyan>--- Session {session['id']} stdout ({len(stdout_lines)} lines) ---</ansibrightcyan>"))
+    for line in stdout_lines:
+        print_formatted_text(HTML(f"<ansiwhite>{html.escape(line)}</ansiwhite>"))
+    print_formatted_text(HTML(f"<ansibrightcyan>--- Session {session['id']} stderr ({len(stderr_lines)} lines) ---</ansibrightcyan>"))
+    for line in stderr_lines:
+        print_formatted_text(HTML(f"<ansired>{html.escape(line)}</ansired>"))
+
+def display_launch_history(num_games=10):
+    """Display the most likely next games and the prefetch hit rate"""
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>║                                LAUNCH HISTORY                                ║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    
+    predictions = predict_games(set(CURRENT_GAMES_LIST), num_games)
+    if not predictions:
+        print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansiyellow>No launches recorded yet. Play something!</ansiyellow>                                   <ansibrightcyan>║</ansibrightcyan>"))
+    else:
+        for game_path, score in predictions:
+            stats = get_game_history(game_path)
+            history_line = f"{os.path.basename(game_path)[:40]:<40} {stats['launches']:>4}x {format_duration(stats['total_duration']):>9}  score {score:5.2f}"
+            print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{html.escape(history_line):<75}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
     
-    # Create and execute launch command
-    launch_cmd = create_launch_command(game_path, emulator_path, game_info)
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    hits, misses, rate = get_hit_rate()
+    if rate is None:
+        print_formatted_text(HTML("<ansicyan>📊 Prefetch hit rate: no predicted launches yet</ansicyan>"))
+    else:
+        print_formatted_text(HTML(f"<ansicyan>📊 Prefetch hit rate: {rate * 100:.0f}% ({hits} of {hits + misses} launches were prefetched)</ansicyan>"))
+
+def display_game_stats(game_arg, current_game_map):
+    """Display resource usage per launch of a game, or the heaviest emulators when no game is given"""
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    if not game_arg:
+        print_formatted_text(HTML("<ansibrightcyan>║                            EMULATOR RESOURCE USAGE                           ║</ansibrightcyan>"))
+        print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+        groups = aggregate_by_emulator(load_session_stats())
+        if not groups:
+            print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansiyellow>No sessions recorded yet. Stats are collected while games run.</ansiyellow>              <ansibrightcyan>║</ansibrightcyan>"))
+        # Heaviest first, so systems and cores that are too much for the hardware stand out
+        for (system, emulator_name), group in sorted(groups.items(), key=lambda item: item[1]['cpu_p95'], reverse=True):
+            stats_line = f"{system[:18]:<18} {emulator_name[:22]:<22} {group['sessions']:>3}x CPU {group['cpu_p95']:>4.0f}% RSS {group['rss_max_mb']:>5.0f}MB"
+            print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{html.escape(stats_line[:75]):<75}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
+        print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+        return
     
-    if not launch_cmd:
-        print_formatted_text(HTML("<ansired>ERROR: Could not create launch command!</ansired>"))
+    game_path = current_game_map.get(game_arg)
+    if not game_path:
+        # Match part of a game's name as well as its number
+        game_path = next((path for path in CURRENT_GAMES_LIST if game_arg.lower() in os.path.basename(path).lower()), None)
+    if not game_path:
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansired>{html.escape(f'No game matches {game_arg!r}')[:75]:<75}</ansired> <ansibrightcyan>║</ansibrightcyan>"))
+        print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
         play_sound("error")
         return
     
+    title = f"STATS: {os.path.basename(game_path)}"[:75]
+    print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightyellow>{html.escape(title):<75}</ansibrightyellow> <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    summaries = load_session_stats(game_path)[-10:]
+    if not summaries:
+        print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansiyellow>No sessions recorded for this game yet.</ansiyellow>                                     <ansibrightcyan>║</ansibrightcyan>"))
+    for summary in reversed(summaries):
+        started = datetime.fromtimestamp(summary['started_at']).strftime('%m-%d %H:%M')
+        cpu = summary['cpu_percent']
+        rss = summary['rss_mb']
+        stats_line = (f"{started} {format_duration(summary['duration'])} "
+                      f"CPU {cpu['p50']:.0f}/{cpu['p95']:.0f}/{cpu['max']:.0f}% "
+                      f"RSS {rss['p95']:.0f}/{rss['max']:.0f}MB thr {summary['threads']['max']:.0f} "
+                      f"I/O {summary['io_read_mb'] + summary['io_write_mb']:.0f}MB")
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{html.escape(stats_line[:75]):<75}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansicyan>CPU is p50/p95/max across samples, RSS is p95/max</ansicyan>"))
+    play_sound("menu_select")
+
+def display_launch_latency():
+    """Display where launch time goes: per-phase percentiles and histograms over recent launches"""
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>║                                LAUNCH LATENCY                                ║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    histograms = get_latency_histograms()
+    if not histograms:
+        print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansiyellow>No launches timed yet. Launch a game with 'play (number)'.</ansiyellow>                 <ansibrightcyan>║</ansibrightcyan>"))
+    else:
+        header = f"{'Phase':<13} {'Count':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}  Histogram"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightyellow>{header:<75}</ansibrightyellow> <ansibrightcyan>║</ansibrightcyan>"))
+    for phase, histogram in histograms.items():
+        phase_line = (f"{phase:<13} {histogram['count']:>5} {histogram['p50']:>8.1f} {histogram['p95']:>8.1f} "
+                      f"{histogram['max']:>8.1f}  [{format_histogram(histogram['buckets'])}]")
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{html.escape(phase_line[:75]):<75}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
+    recent = get_recent_launches(5)
+    if recent:
+        print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    for launch in recent:
+        phases = " ".join(f"{phase}={launch[phase]:.0f}" for phase in PHASES if phase in launch)
+        launch_line = f"{(launch.get('game') or '?')[:20]:<20} {launch['total']:>7.0f}ms {phases}"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansicyan>{html.escape(launch_line[:75]):<75}</ansicyan> <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    print_formatted_text(HTML(f"<ansicyan>Histogram buckets: {html.escape(' '.join(bucket_labels()))}</ansicyan>"))
+    print_formatted_text(HTML("<ansicyan>first_output counts from the spawn and overlaps setup/ui; total is RetroFlow's own time</ansicyan>"))
+
+def display_emulator_health():
+    """Display the recorded launch outcomes per emulator and system, and which emulators are skipped"""
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>║                                EMULATOR HEALTH                                ║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    records = get_health_records()
+    if not records:
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansiyellow>{'No launches recorded yet.':<75}</ansiyellow> <ansibrightcyan>║</ansibrightcyan>"))
+    else:
+        header = f"{'Emulator':<26} {'System':<16} {'Launches':>8} {'Fails':>5} {'Exit':>8} Status"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightyellow>{header:<75}</ansibrightyellow> <ansibrightcyan>║</ansibrightcyan>"))
+    for key, record in sorted(records.items()):
+        emulator, _, system = key.rpartition('@')
+        last_exit = "no start" if record['last_returncode'] is None else str(record['last_returncode'])
+        health_line = f"{emulator[:26]:<26} {system[:16]:<16} {record['launches']:>8} {record['failures']:>5} {last_exit[:8]:>8}"
+        status = "<ansigreen>OK     </ansigreen>" if is_emulator_healthy(emulator, system) else "<ansired>SKIPPED</ansired>"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansicyan>{html.escape(health_line)}</ansicyan> {status} <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansicyan>Emulators that keep failing fast are skipped for a day; the next one in the chain is used</ansicyan>"))
+
+# --- Library Commands ---
+def dat_command(dat_path):
+    """Import a No-Intro/Redump DAT file, or show what the DAT index covers"""
+    if dat_path:
+        try:
+            entries, errors = import_dat_file(dat_path.strip('"'))
+        except (OSError, ValueError) as e:
+            print_formatted_text(HTML(f"<ansired>Could not import {html.escape(dat_path)}: {html.escape(str(e))}</ansired>"))
+            play_sound("error")
+            return
+        for filename, error in errors.items():
+            print_formatted_text(HTML(f"<ansiyellow>Skipped {html.escape(filename)}: {html.escape(error)}</ansiyellow>"))
+        print_formatted_text(HTML(f"<ansibrightgreen>📚 DAT imported! The index now identifies {entries} ROMs.</ansibrightgreen>"))
+        play_sound("menu_select")
+        return
+    
+    stats = get_dat_index_stats()
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>║                                   DAT INDEX                                  ║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    if not stats['entries']:
+        print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansiyellow>No DATs imported. Use 'dat (file)' with a No-Intro or Redump DAT.</ansiyellow>          <ansibrightcyan>║</ansibrightcyan>"))
+    else:
+        summary = f"{stats['entries']} ROMs indexed from {len(stats['sources'])} DAT files"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{summary[:75]:<75}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
+    for system in stats['systems']:
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansicyan>{html.escape(system[:75]):<75}</ansicyan> <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    play_sound("menu_select")
+
+def display_title_matches(matches, current_game_map, heading="SEARCH RESULTS"):
+    """Print (game path, title, score) matches with their game numbers, e.g. for 'find' and 'similar'"""
+    game_numbers = {game_path: number for number, game_path in current_game_map.items()}
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML(f"<ansibrightcyan>║{html.escape(heading[:79]):^79}║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    for game_path, _, score in matches:
+        game_info = auto_detect_game_info(game_path)
+        match_line = f"[{game_numbers.get(game_path, '?'):>2}] {game_info['game_name'][:40]:<40} {game_info['system'][:18]:<18} {min(score, 1.0):>6.0%}"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{html.escape(f'{match_line[:75]:<75}')}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+
+def tag_filter(filters):
+    """A predicate on game paths for rom_matches filters, or None if no filter is set"""
+    if not (filters['region'] or filters['language'] or filters['good_only']):
+        return None
+    return lambda game_path: rom_matches(get_rom_tags(game_path), **filters)
+
+def find_games_command(query, current_game_map):
+    """
+    Search the library by approximate title, e.g. 'find zelda links awakening', optionally
+    filtered with --region, --language and --good; equally good matches list the preferred dump first
+    """
     try:
-        print_formatted_text(HTML(f"<ansicyan>Executing: {launch_cmd}</ansicyan>"))
-        
-        # For macOS 'open' commands, don't capture output as it may hang
-        if launch_cmd.startswith('open -a'):
-            result = subprocess.run(launch_cmd, shell=True)
-            if result.returncode == 0:
-                print_formatted_text(HTML("<ansibrightgreen>Game launched successfully!</ansibrightgreen>"))
-                play_sound("menu_select")
-            else:
-                print_formatted_text(HTML(f"<ansired>Launch failed with exit code: {result.returncode}</ansired>"))
-                play_sound("error")
+        query, filters = split_tag_filters(query)
+    except ValueError as e:
+        print_formatted_text(HTML(f"<ansired>{html.escape(str(e))}. Usage: find (text) [--region name] [--language code] [--good]</ansired>"))
+        play_sound("error")
+        return
+    matches = sorted(search_titles(query, match=tag_filter(filters)),
+                     key=lambda match: (-match[2], rom_sort_key(match[0])))
+    if not matches:
+        print_formatted_text(HTML(f"<ansired>No games match '{html.escape(query)}'.</ansired>"))
+        play_sound("error")
+        return
+    display_title_matches(matches, current_game_map)
+    print_formatted_text(HTML("<ansicyan>Use 'play (number)' or 'play (name)' to launch one.</ansicyan>"))
+    play_sound("menu_select")
+
+def game_added_time(game_path):
+    """When a game arrived in the library: the later of its file's change and modification times"""
+    patched_game = get_patched_game(game_path)
+    source = patched_game['patch'] if patched_game else (split_archive_path(game_path)[0] or game_path)
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return 0
+    return max(stat.st_ctime, stat.st_mtime)
+
+def sync_library_views():
+    """
+    Bring the sorted and per-system library views (local and cartridge games) up to date if
+    games, names or sizes may have changed
+    """
+    global LIBRARY_VIEWS_VERSION
+    version = (LIBRARY_VERSION, get_hash_cache_version(), get_dat_index_version())
+    if version == LIBRARY_VIEWS_VERSION:
+        return
+    records = {}
+    for game_path in library_game_paths():
+        game_info = auto_detect_game_info(game_path)
+        indexed = get_library_record(game_path)
+        records[game_path] = {
+            'title': game_info['game_name'],
+            'system': game_info['system'],
+            'size': game_info['file_size'],
+            'added': indexed['added'] if indexed else game_added_time(game_path)
+        }
+    sync_library(records)  # Only games that were added, changed or removed move
+    LIBRARY_VIEWS_VERSION = version
+
+def parse_list_options(text):
+    """
+    Parse 'list' options: --system <name>, --sort title|size|added|system, --asc/--desc, --page <n>,
+    and the tag filters --region <name>, --language <code>, --good (see split_tag_filters).
+    Raises ValueError for anything else.
+    """
+    text, filters = split_tag_filters(text)
+    options = {'system': None, 'sort': 'title', 'descending': None, 'page': 1, 'filters': filters}
+    tokens = text.split()
+    position = 0
+    while position < len(tokens):
+        flag = tokens[position].lower()
+        position += 1
+        values = []
+        while position < len(tokens) and not tokens[position].startswith('--'):
+            values.append(tokens[position])
+            position += 1
+        if flag == '--system' and values:
+            options['system'] = ' '.join(values)
+        elif flag == '--sort' and len(values) == 1 and values[0].lower() in LIBRARY_SORTS:
+            options['sort'] = values[0].lower()
+        elif flag in ('--asc', '--desc') and not values:
+            options['descending'] = flag == '--desc'
+        elif flag == '--page' and len(values) == 1 and values[0].isdigit() and int(values[0]) > 0:
+            options['page'] = int(values[0])
         else:
-            result = subprocess.run(launch_cmd, shell=True, capture_output=True, text=True)
-            if result.returncode == 0:
-                print_formatted_text(HTML("<ansibrightgreen>Game launched successfully!</ansibrightgreen>"))
-                play_sound("menu_select")
+            raise ValueError(f"unexpected option '{' '.join([flag] + values)}'")
+    if options['descending'] is None:
+        options['descending'] = options['sort'] in ('size', 'added')  # Largest and newest first
+    return options
+
+def list_view_command(options_text, current_game_map):
+    """Show one page of the library filtered by system and tags, and sorted by title, size, time added or system"""
+    try:
+        options = parse_list_options(options_text)
+    except ValueError as e:
+        print_formatted_text(HTML(f"<ansired>{html.escape(str(e))}. Usage: list [--system name] [--sort {'|'.join(LIBRARY_SORTS)}] [--asc|--desc] [--page n] [--region name] [--language code] [--good]</ansired>"))
+        play_sound("error")
+        return
+    
+    dynamic_discover_games()
+    ensure_launch_plans()
+    sync_library_views()
+    system = None
+    if options['system']:
+        system = resolve_system(options['system'])
+        if not system:
+            systems = ', '.join(sorted(get_library_systems())) or 'none yet'
+            print_formatted_text(HTML(f"<ansired>No single system matches '{html.escape(options['system'])}'. Systems: {html.escape(systems)}</ansired>"))
+            play_sound("error")
+            return
+    
+    game_paths, total = list_library(system, options['sort'], options['descending'], options['page'],
+                                     match=tag_filter(options['filters']))
+    pages = max((total + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE, 1)
+    game_numbers = {game_path: number for number, game_path in current_game_map.items()}
+    heading = f"{(system or 'ALL GAMES').upper()} BY {options['sort'].upper()} - PAGE {min(options['page'], pages)}/{pages}"
+    print_formatted_text(HTML("<ansibrightcyan>╔═══════════════════════════════════════════════════════════════════════════════╗</ansibrightcyan>"))
+    print_formatted_text(HTML(f"<ansibrightcyan>║{html.escape(heading[:79]):^79}║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╠═══════════════════════════════════════════════════════════════════════════════╣</ansibrightcyan>"))
+    if not game_paths:
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansiyellow>{'No games on this page.':<75}</ansiyellow> <ansibrightcyan>║</ansibrightcyan>"))
+    for game_path in game_paths:
+        record = get_library_record(game_path) or {'title': os.path.basename(game_path), 'system': '', 'size': 0}
+        emulator_found = bool(GAME_LAUNCH_PLANS.get(game_path))
+        game_line = f"[{game_numbers.get(game_path, '?'):>2}] {'✓' if emulator_found else '✗'} {record['title'][:35]:<35} {record['system'][:15]:<15} {format_bytes(record['size'] or 0):>8}"
+        color = "ansibrightgreen" if emulator_found else "ansiyellow"
+        print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <{color}>{html.escape(f'{game_line[:75]:<75}')}</{color}> <ansibrightcyan>║</ansibrightcyan>"))
+    print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    print_formatted_text(HTML(f"<ansicyan>📊 {total} games in this view | Use 'list ... --page n' for more, 'play (number)' to launch</ansicyan>"))
+    play_sound("menu_select")
+
+def library_features():
+    """TF-IDF features of every local and cartridge game, for 'similar'"""
+    features = {}
+    for game_path in library_game_paths():
+        game_info = auto_detect_game_info(game_path)
+        rom_tags = game_info['tags']
+        features[game_path] = game_features(game_info['game_name'], game_info['system'], game_info['genre'],
+                                            game_info['keywords'], rom_tags['regions'] + rom_tags['flags'])
+    return features
+
+def similar_games_command(game_arg, current_game_map):
+    """Recommend library games like one given by number or name, e.g. 'similar 3' or 'similar mario kart'"""
+    game_path = current_game_map.get(game_arg)
+    if not game_path:
+        game_path, matches = best_title_match(game_arg)
+        if not game_path:
+            if matches:
+                print_formatted_text(HTML(f"<ansiyellow>'{html.escape(game_arg)}' matches several games; pick one by number:</ansiyellow>"))
+                display_title_matches(matches, current_game_map)
             else:
-                print_formatted_text(HTML(f"<ansired>Launch failed with exit code: {result.returncode}</ansired>"))
-                if result.stderr:
-                    print_formatted_text(HTML(f"<ansired>Error: {result.stderr}</ansired>"))
+                print_formatted_text(HTML(f"<ansired>Game '{html.escape(game_arg)}' not found. Use 'list' or 'find (text)' to see available games.</ansired>"))
                 play_sound("error")
-            
-    except Exception as e:
-        print_formatted_text(HTML(f"<ansired>Launch error: {str(e)}</ansired>"))
-        print_formatted_text(HTML("<ansiyellow>Tip: Make sure the emulator is properly installed in the Emulators directory</ansiyellow>"))
-        play_sound("error")
+            return
+    
+    # Rebuilt only when games, profiles, hashes or DATs changed since the last recommendation
+    model = get_similarity_model((LIBRARY_VERSION, get_hash_cache_version(), get_dat_index_version()), library_features)
+    recommendations = similar_games(model, game_path)
+    game_name = auto_detect_game_info(game_path)['game_name']
+    if not recommendations:
+        print_formatted_text(HTML(f"<ansiyellow>Nothing in your library resembles {html.escape(game_name)} yet.</ansiyellow>"))
+        return
+    display_title_matches([(path, None, score) for path, score in recommendations], current_game_map,
+                          f"GAMES LIKE {game_name.upper()}")
+    play_sound("menu_select")
 
 # --- Enhanced Flowey Chatbot ---
 def flowey_chatbot_enhanced(session, style):
@@ -776,14 +1579,19 @@ def detect_removable_drives():
 
 def scan_cartridges():
     """Scan for cartridge games"""
-    global DETECTED_CARTRIDGES, CARTRIDGE_GAMES_MAP
+    global DETECTED_CARTRIDGES, CARTRIDGE_GAMES_MAP, CARTRIDGE_LAST_MODIFIED, LIBRARY_VERSION
     
     print_loading_animation("Scanning cartridges", 2)
     
     DETECTED_CARTRIDGES = detect_removable_drives()
     CARTRIDGE_GAMES_MAP = {}
+    CARTRIDGE_LAST_MODIFIED = {}
+    LIBRARY_VERSION += 1  # Cartridge games count for 'similar' and the 'list' views
+    mark_launch_plans_dirty()  # Cartridge games are listed with their compiled launch plans
+    set_cartridge_roots(DETECTED_CARTRIDGES)  # Frequently played cartridge ROMs are copied locally
     
     if not DETECTED_CARTRIDGES:
+        sync_title_index()  # Games of removed cartridges leave the title index
         print_formatted_text(HTML("<ansiyellow>No cartridges detected. Insert USB drive and try again.</ansiyellow>"))
         return
     
@@ -791,6 +1599,12 @@ def scan_cartridges():
         games_on_cart = discover_games_in_path(drive_path, is_cartridge=True)
         if games_on_cart:
             CARTRIDGE_GAMES_MAP[drive_path] = games_on_cart
+            # Re-listing reads the files' size and mtime from here instead of the slow media
+            CARTRIDGE_LAST_MODIFIED.update(snapshot_game_sources(games_on_cart))
+            hash_roms_in_background(games_on_cart)
+            # Warm the cartridge games the launch history says are likely to be played
+            warm_predicted_games({game_path: None for game_path in games_on_cart}, replace=False)
+    sync_title_index()  # Cartridge games can be found and played by name
     
     print_formatted_text(HTML(f"<ansibrightgreen>Cartridge scan complete! Found {len(CARTRIDGE_GAMES_MAP)} cartridges with games.</ansibrightgreen>"))
 
@@ -800,7 +1614,8 @@ def discover_games_in_path(directory, is_cartridge=False):
     if not os.path.isdir(directory):
         return games
     
-    for filename in os.listdir(directory):
+    filenames = os.listdir(directory)
+    for filename in filenames:
         full_path = os.path.join(directory, filename)
         if os.path.isdir(full_path):
             continue
@@ -808,11 +1623,20 @@ def discover_games_in_path(directory, is_cartridge=False):
         # Skip JSON metadata files
         if filename.endswith('.json'):
             continue
+        
+        # ROMs inside archives are indexed from the archive's directory, without extracting
+        archived_roms = list_archived_roms(full_path, is_supported_extension) if is_archive(full_path) else []
+        if archived_roms:
+            games.extend(archived_roms)
+            continue
             
         extension = os.path.splitext(filename)[1].lower()
-        if extension in EMULATOR_CONFIGS:
+        if is_supported_extension(extension):
             games.append(full_path)
     
+    # IPS/BPS/UPS patches next to a ROM are listed as games of their own
+    games.extend(find_patched_games(directory, filenames, is_supported_extension))
+    
     return sorted(games)
 
 def display_emulator_status():
@@ -830,12 +1654,27 @@ def display_emulator_status():
         print_formatted_text(HTML("<ansibrightcyan>║</ansibrightcyan> <ansicyan>System will auto-detect them when added!</ansicyan>                           <ansibrightcyan>║</ansibrightcyan>"))
     else:
         for emu_name, emu_path in AVAILABLE_EMULATORS.items():
-            status_line = f"✓ {emu_name:<30} {os.path.dirname(emu_path)}"
+            probe = get_probe(emu_path)
+            if probe is None:
+                status_line = f"? {emu_name:<30} not checked yet"
+                color = "ansiyellow"
+            elif probe['runnable']:
+                details = ' '.join(part for part in (probe['format'], '/'.join(probe['arch']), probe['version'] or '') if part)
+                status_line = f"✓ {emu_name:<30} {details}"
+                color = "ansibrightgreen"
+            else:
+                status_line = f"✗ {emu_name:<30} {probe['reason']}"
+                color = "ansired"
             if len(status_line) > 75:
                 status_line = status_line[:72] + "..."
-            print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansibrightgreen>{status_line:<75}</ansibrightgreen> <ansibrightcyan>║</ansibrightcyan>"))
+            print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <{color}>{html.escape(status_line):<75}</{color}> <ansibrightcyan>║</ansibrightcyan>"))
+            if probe and probe.get('cores'):
+                usable_cores = sum(1 for core in probe['cores'] if core['usable'])
+                cores_line = f"  {usable_cores} of {len(probe['cores'])} cores usable"
+                print_formatted_text(HTML(f"<ansibrightcyan>║</ansibrightcyan> <ansicyan>{cores_line:<75}</ansicyan> <ansibrightcyan>║</ansibrightcyan>"))
     
     print_formatted_text(HTML("<ansibrightcyan>╚═══════════════════════════════════════════════════════════════════════════════╝</ansibrightcyan>"))
+    print_formatted_text(HTML(f"<ansicyan>🔥 Warm RetroArch host: {html.escape(get_warm_host_status())}</ansicyan>"))
     print_formatted_text(HTML(f"<ansicyan>🔄 Auto-refresh: Every {SCAN_INTERVAL} seconds | Last scan: {datetime.now().strftime('%H:%M:%S')}</ansicyan>"))
 
 # --- Main Enhanced Terminal ---
@@ -854,9 +1693,27 @@ def main():
     os.makedirs(EMULATORS_DIRECTORY, exist_ok=True)
     os.makedirs(CORES_DIRECTORY, exist_ok=True)
     
+    # Restore RetroFlow's CPU affinity once the last emulator exits, and record the launch
+    add_exit_callback(release_session_policy)
+    add_exit_callback(record_session_history)
+    add_exit_callback(record_session_rom_cache)  # After the history, so the launch counts
+    add_exit_callback(record_session_patch_saves)
+    add_exit_callback(record_session_health)
+    add_exit_callback(record_session_telemetry)
+    add_first_output_callback(record_first_output)
+    set_source_resolver(game_source_files)  # Archived, patched and cached games are warmed from their real files
+    start_telemetry()
+    
     # Initial scans
     dynamic_scan_available_emulators()
     dynamic_discover_games()
+    ensure_launch_plans()
+    
+    # Warm the games the launch history says are most likely to be played
+    warm_predicted_games({game_path: GAME_LAUNCH_PLANS.get(game_path) for game_path in CURRENT_GAMES_LIST})
+    
+    # Pre-spawn the idle RetroArch host if warm host mode is enabled in Config/warm_host.json
+    prestart_warm_host(AVAILABLE_EMULATORS.get('retroarch'))
     
     print_dos_header()
     current_game_map = display_games_dos_style_dynamic()
@@ -873,7 +1730,8 @@ def main():
     # Command completer
     command_words = [
         'help', 'exit', 'list', 'play', 'chat', 'storage', 'scan', 'autoconfig',
-        'clear', 'dir', 'cls', 'info', 'about', 'version', 'emulators', 'refresh'
+        'clear', 'dir', 'cls', 'info', 'about', 'version', 'emulators', 'refresh',
+        'ps', 'kill', 'logs', 'history', 'health', 'stats', 'latency', 'dat', 'find', 'similar'
     ]
     
     try:
@@ -894,6 +1752,9 @@ def main():
             if current_storage > MAX_STORAGE_BYTES:
                 print_formatted_text(HTML(f"<ansired>⚠ WARNING: Storage limit exceeded! ({format_bytes(current_storage)}/{MAX_STORAGE_MB}MB)</ansired>"))
             
+            # Report emulators that exited while we were waiting
+            report_exited_sessions()
+            
             # Get command with dynamic prompt
             command = session.prompt(print_dos_prompt()).strip()
             
@@ -916,7 +1777,11 @@ def main():
                     "║ COMMAND         │ DESCRIPTION                                               ║",
                     "╠═════════════════┼═══════════════════════════════════════════════════════════╣",
                     "║ list            │ Display all available games (auto-refreshes)            ║",
-                    "║ play (number)   │ Launch game by number (e.g., 'play 1')                  ║",
+                    "║ list (options)  │ --system snes --sort title|size|added|system --page 2   ║",
+                    "║                 │ --region usa --language en --good (also for 'find')     ║",
+                    "║ play (number)   │ Launch game by number or name (e.g., 'play 1')          ║",
+                    "║ find (text)     │ Find local and cartridge games by title; typos forgiven ║",
+                    "║ similar (game)  │ Recommend games in your library like this one           ║",
                     "║ chat            │ Talk to Flowey, your AI gaming assistant                ║",
                     "║ scan            │ Scan for cartridge games on USB drives                  ║",
                     "║ storage         │ Check storage usage and limits                           ║",
@@ -924,6 +1789,14 @@ def main():
                     "║ refresh         │ Force refresh of games and emulators                    ║",
                     "║ clear/cls       │ Clear the screen                                         ║",
                     "║ info (number)   │ Get detailed info about a specific game                 ║",
+                    "║ ps              │ List running and recent emulator sessions               ║",
+                    "║ kill (session)  │ Stop a running emulator session                         ║",
+                    "║ logs (session)  │ Show captured emulator output for a session             ║",
+                    "║ history         │ Show most played games and prefetch hit rate            ║",
+                    "║ health          │ Show launch outcomes per emulator; failing ones skipped ║",
+                    "║ stats [game]    │ Show CPU/memory/I/O per launch of a game                ║",
+                    "║ latency         │ Show where launch time goes, phase by phase             ║",
+                    "║ dat [file]      │ Import a No-Intro/Redump DAT, or show what DATs cover   ║",
                     "║ exit            │ Exit RetroFlow                                           ║",
                     "╠═══════════════════════════════════════════════════════════════════════════════╣",
                     "║ 🎮 DYNAMIC FEATURES: Games and emulators auto-detect every 2 seconds!       ║",
@@ -937,12 +1810,16 @@ def main():
                 current_game_map = display_games_dos_style_dynamic()
                 play_sound("menu_select")
             
+            elif cmd_lower.startswith(('list ', 'ls ', 'dir ')):
+                list_view_command(command.split(' ', 1)[1], current_game_map)
+            
             elif cmd_lower in ['refresh', 'reload', 'rescan']:
                 print_loading_animation("Force refreshing system", 2)
                 # Reset scan times to force immediate refresh
                 global LAST_GAMES_SCAN, LAST_EMULATORS_SCAN
                 LAST_GAMES_SCAN = 0
                 LAST_EMULATORS_SCAN = 0
+                mark_launch_plans_dirty()
                 current_game_map = display_games_dos_style_dynamic()
                 print_formatted_text(HTML("<ansibrightgreen>🔄 System refreshed! All games and emulators rescanned.</ansibrightgreen>"))
                 play_sound("menu_select")
@@ -951,17 +1828,78 @@ def main():
                 parts = command.split(' ', 1)
                 if len(parts) > 1:
                     game_num = parts[1].strip()
+                    timer = start_launch_timer()
                     # Refresh game map to ensure it's current
                     current_game_map = display_games_dos_style_dynamic()
+                    mark_phase(timer, 'refresh')
                     if game_num in current_game_map:
-                        launch_game_enhanced(current_game_map[game_num])
+                        launch_game_enhanced(current_game_map[game_num], timer)
                     else:
-                        print_formatted_text(HTML(f"<ansired>Game '{game_num}' not found. Use 'list' to see available games.</ansired>"))
-                        play_sound("error")
+                        # Not a number: launch the game whose title the text names, typos and all
+                        game_path, matches = best_title_match(game_num)
+                        if game_path:
+                            launch_game_enhanced(game_path, timer)
+                        elif matches:
+                            print_formatted_text(HTML(f"<ansiyellow>'{html.escape(game_num)}' matches several games; pick one by number:</ansiyellow>"))
+                            display_title_matches(matches, current_game_map)
+                        else:
+                            print_formatted_text(HTML(f"<ansired>Game '{html.escape(game_num)}' not found. Use 'list' or 'find (text)' to see available games.</ansired>"))
+                            play_sound("error")
                 else:
-                    print_formatted_text(HTML("<ansired>Usage: play <game_number></ansired>"))
+                    print_formatted_text(HTML("<ansired>Usage: play &lt;game_number or name&gt;</ansired>"))
                     play_sound("error")
             
+            elif cmd_lower == 'find' or cmd_lower.startswith('find '):
+                query = command[len('find'):].strip()
+                if query:
+                    dynamic_discover_games()  # Picks up added or removed games without redrawing the list
+                    find_games_command(query, current_game_map)
+                else:
+                    print_formatted_text(HTML("<ansired>Usage: find &lt;title&gt;</ansired>"))
+                    play_sound("error")
+            
+            elif cmd_lower == 'similar' or cmd_lower.startswith('similar '):
+                game_arg = command[len('similar'):].strip()
+                if game_arg:
+                    dynamic_discover_games()
+                    ensure_launch_plans()  # Profiles supply genres and keywords
+                    similar_games_command(game_arg, current_game_map)
+                else:
+                    print_formatted_text(HTML("<ansired>Usage: similar &lt;game_number or name&gt;</ansired>"))
+                    play_sound("error")
+            
+            elif cmd_lower == 'stats' or cmd_lower.startswith('stats '):
+                display_game_stats(command[len('stats'):].strip(), current_game_map)
+            
+            elif cmd_lower == 'latency':
+                display_launch_latency()
+                play_sound("menu_select")
+            
+            elif cmd_lower == 'health':
+                display_emulator_health()
+                play_sound("menu_select")
+            
+            elif cmd_lower == 'dat' or cmd_lower.startswith('dat '):
+                dat_command(command[len('dat'):].strip())
+            
+            elif cmd_lower == 'history':
+                display_launch_history()
+                play_sound("menu_select")
+            
+            elif cmd_lower == 'ps':
+                display_sessions()
+                play_sound("menu_select")
+            
+            elif cmd_lower.startswith('kill '):
+                kill_session(command.split(' ', 1)[1].strip())
+            
+            elif cmd_lower.startswith('logs '):
+                display_session_output(command.split(' ', 1)[1].strip())
+            
+            elif cmd_lower in ['kill', 'logs']:
+                print_formatted_text(HTML(f"<ansired>Usage: {cmd_lower} <session_id></ansired>"))
+                play_sound("error")
+            
             elif cmd_lower == 'chat':
                 flowey_chatbot_enhanced(session, style)
             
@@ -976,6 +1914,14 @@ def main():
             
             elif cmd_lower == 'storage':
                 current_storage = get_directory_size(GAMES_DIRECTORY)
+                archive_cache = get_archive_cache_stats()
+                archive_cache_usage = f"{format_bytes(archive_cache['bytes'])}/{format_bytes(archive_cache['budget_bytes'])} ({archive_cache['entries']} ROMs)"
+                patch_cache = get_patch_cache_stats()
+                patch_cache_usage = f"{format_bytes(patch_cache['bytes'])}/{format_bytes(patch_cache['budget_bytes'])} ({patch_cache['patched_games']} patched games)" if patch_cache['enabled'] else "Disabled"
+                rom_cache = get_rom_cache_stats()
+                rom_cache_usage = f"{format_bytes(rom_cache['bytes'])}/{format_bytes(rom_cache['budget_bytes'])} ({rom_cache['entries']} ROMs, {rom_cache['hits']} hits)" if rom_cache['enabled'] else "Disabled"
+                hash_cache = get_hash_cache_stats()
+                hash_cache_usage = f"{hash_cache['entries']} ROMs" + (f", {hash_cache['pending']} queued" if hash_cache['pending'] else "")
                 storage_lines = [
                     "╔═══════════════════════════════════════════════════════════════════════════════╗",
                     "║                               STORAGE STATUS                                 ║",
@@ -985,6 +1931,10 @@ def main():
                     f"║ Available:      {format_bytes(MAX_STORAGE_BYTES - current_storage):<55} ║",
                     f"║ Status:         {'⚠ OVER LIMIT' if current_storage > MAX_STORAGE_BYTES else '✓ OK':<55} ║",
                     f"║ Games Count:    {len(CURRENT_GAMES_LIST):<55} ║",
+                    f"║ Archive Cache:  {archive_cache_usage[:55]:<55} ║",
+                    f"║ ROM Cache:      {rom_cache_usage[:55]:<55} ║",
+                    f"║ Patch Cache:    {patch_cache_usage[:55]:<55} ║",
+                    f"║ Hashed ROMs:    {hash_cache_usage[:55]:<55} ║",
                     f"║ Auto-Refresh:   Every {SCAN_INTERVAL} seconds{'':<39} ║",
                     "╚═══════════════════════════════════════════════════════════════════════════════╝"
                 ]
@@ -1008,17 +1958,23 @@ def main():
                         game_path = current_game_map[game_num]
                         game_info = auto_detect_game_info(game_path)
                         emulator_path, _ = find_emulator_for_game(game_path)
+                        # The user is likely to play this next: warm its ROM, emulator and core
+                        prefetch_launch_plan(GAME_LAUNCH_PLANS.get(game_path))
                         
                         info_lines = [
                             "╔═══════════════════════════════════════════════════════════════════════════════╗",
                             "║                                GAME INFORMATION                              ║",
                             "╠═══════════════════════════════════════════════════════════════════════════════╣",
-                            f"║ Name:           {game_info['game_name']:<59} ║",
+                            f"║ Name:           {html.escape(game_info['game_name'][:59].ljust(59))} ║",
                             f"║ System:         {game_info['system']:<59} ║",
                             f"║ Required Emu:   {game_info['emulator_name']:<59} ║",
                             f"║ Emulator Found: {'Yes' if emulator_path else 'No':<59} ║",
                             f"║ File Size:      {format_bytes(game_info['file_size']):<59} ║",
-                            f"║ Filename:       {game_info['filename']:<59} ║",
+                            f"║ Filename:       {html.escape(game_info['filename'][:59].ljust(59))} ║",
+                            f"║ Tags:           {html.escape(describe_rom_tags(game_info['tags'])[:59].ljust(59))} ║",
+                            f"║ Header:         {html.escape(describe_rom_header(game_info['header'])[:59].ljust(59))} ║",
+                            f"║ DAT Match:      {html.escape((game_info['dat_name'] or 'Not identified')[:59].ljust(59))} ║",
+                            f"║ CRC32 / SHA-1:  {(game_info['crc32'] + ' / ' + game_info['sha1'][:16] + '...') if game_info['crc32'] else 'Not hashed yet':<59} ║",
                             f"║ Auto-Config:    {'Yes' if game_info['auto_configured'] else 'No':<59} ║",
                             f"║ Detection:      Dynamic (Real-time){'':<43} ║",
                             "╚═══════════════════════════════════════════════════════════════════════════════╝"
@@ -1043,6 +1999,10 @@ def main():
         except Exception as e:
             print_formatted_text(HTML(f"<ansired>System error: {str(e)}</ansired>"))
             play_sound("error")
+    
+    # Don't leave the idle RetroArch host running
+    stop_warm_host()
+    save_header_cache()
 
 if __name__ == "__main__":
     main()
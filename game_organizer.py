@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """
 RetroFlow Game Organizer
-Automatically organizes ROM files by system and creates metadata
+Automatically organizes ROM files by system and records their metadata in one catalog
 """
 
 import os
+import sys
 import shutil
-import json
 from pathlib import Path
 
+from rom_hashing import hash_roms, get_rom_hashes
+from rom_tags import get_rom_tags
+from game_catalog import catalog_batch, prune_catalog, export_sidecars
+
 # System mappings based on file extensions
 SYSTEM_MAPPINGS = {
     '.nes': 'Nintendo/NES',
@@ -39,6 +43,7 @@ def organize_games(source_dir="Games", organized_dir="Games_Organized"):
     
     os.makedirs(organized_dir, exist_ok=True)
     
+    organized_paths = []
     for filename in os.listdir(source_dir):
         if os.path.isfile(os.path.join(source_dir, filename)):
             ext = Path(filename).suffix.lower()
@@ -53,45 +58,67 @@ def organize_games(source_dir="Games", organized_dir="Games_Organized"):
                 try:
                     shutil.copy2(source_path, dest_path)
                     print(f"✓ Moved {filename} to {SYSTEM_MAPPINGS[ext]}")
-                    
-                    # Create metadata
-                    create_game_metadata(dest_path)
+                    organized_paths.append(dest_path)
                     
                 except Exception as e:
                     print(f"✗ Failed to move {filename}: {e}")
+    
+    # Hash every ROM in one parallel pass; create_game_metadata then reads the cached hashes
+    print(f"Hashing {len(organized_paths)} ROMs...")
+    hash_roms(organized_paths)
+    
+    # All metadata goes into the catalog in one transaction, together with dropping the
+    # entries of ROMs that were deleted: a single write, and nothing is written if the run
+    # fails part way
+    try:
+        with catalog_batch(organized_dir) as changes:
+            pruned = prune_catalog(organized_dir, changes)
+            if pruned:
+                print(f"  ✓ Dropped {pruned} missing games from the catalog")
+            for dest_path in organized_paths:
+                try:
+                    metadata = create_game_metadata(dest_path)
+                except OSError as e:
+                    print(f"  ✗ Failed to create metadata: {e}")
+                    continue
+                changes[dest_path] = metadata
+                print(f"  ✓ Created metadata for {metadata['game_name']}")
+    except (OSError, ValueError) as e:
+        print(f"  ✗ Failed to write the game catalog: {e}")
 
 def create_game_metadata(game_path):
-    """Create metadata file for a game"""
+    """Build the catalog metadata for a game"""
     filename = os.path.basename(game_path)
     name_without_ext = os.path.splitext(filename)[0]
     ext = os.path.splitext(filename)[1].lower()
     
-    # Clean up name
-    clean_name = name_without_ext.replace('_', ' ').replace('-', ' ')
-    clean_name = ' '.join(word.capitalize() for word in clean_name.split())
-    
-    # Remove common ROM tags
-    rom_tags = ['(USA)', '(Europe)', '(Japan)', '(World)', '[!]', '(Rev A)', '(Rev B)']
-    for tag in rom_tags:
-        clean_name = clean_name.replace(tag, '').strip()
+    # Clean up name: tags such as (USA), (Rev 1) or [!] are parsed out before casing
+    rom_tags = get_rom_tags(filename)
+    clean_name = rom_tags['title'].replace('-', ' ')
+    clean_name = ' '.join(word.capitalize() for word in clean_name.split()) or name_without_ext
     
     metadata = {
         "game_name": clean_name,
         "filename": filename,
         "system": SYSTEM_MAPPINGS.get(ext, "Unknown"),
+        "regions": rom_tags['regions'],
+        "languages": rom_tags['languages'],
+        "revision": rom_tags['revision'],
+        "disc": rom_tags['disc'],
+        "dump_flags": rom_tags['flags'],
         "file_size": os.path.getsize(game_path),
+        "crc32": None,
+        "md5": None,
+        "sha1": None,
         "auto_generated": True,
         "created_date": "2024-01-01"
     }
     
-    metadata_path = os.path.splitext(game_path)[0] + "_metadata.json"
+    hashes = get_rom_hashes(game_path)
+    if hashes:
+        metadata.update(hashes)
     
-    try:
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
-        print(f"  ✓ Created metadata for {clean_name}")
-    except Exception as e:
-        print(f"  ✗ Failed to create metadata: {e}")
+    return metadata
 
 def main():
     """Main organizer function"""
@@ -103,6 +130,17 @@ def main():
     print("\n" + "=" * 40)
     print("✅ Game organization complete!")
     print("Games have been sorted by system in Games_Organized/")
+    
+    # Per-ROM <name>_metadata.json files, for tools that still read them
+    if "--export-sidecars" in sys.argv[1:]:
+        try:
+            written, errors = export_sidecars("Games_Organized")
+        except (OSError, ValueError) as e:
+            print(f"✗ Failed to export metadata files: {e}")
+            return
+        print(f"Exported {written} metadata files")
+        for game_path, error in errors.items():
+            print(f"✗ {os.path.basename(game_path)}: {error}")
 
 if __name__ == "__main__":
     main()
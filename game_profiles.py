@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Game Profiles
+Loads the per-game JSON files that sit next to ROMs (mario.json, zelda.json, ...),
+validates them and compiles ready-to-execute launch plans at index time
+"""
+
+import os
+import re
+import json
+import string
+
+from game_catalog import CATALOG_FILENAME, SIDECAR_SUFFIX
+from launch_commands import (
+    parse_launch_template, render_argv, bind_template_executable, format_argv
+)
+
+# Fields a game profile may contain and the type each one must have
+GAME_PROFILE_FIELDS = {
+    'game_name': str,
+    'emulator': str,
+    'core': str,
+    'launch_command': str,
+    'resolution': str,
+    'genre': str,
+    'keywords': list
+}
+REQUIRED_FIELDS = ('emulator', 'launch_command')
+RESOLUTION_PATTERN = re.compile(r'^\d+x\d+$')
+
+# Profile cache: path -> (mtime, size, profile, errors)
+GAME_PROFILE_CACHE = {}
+
+def validate_game_profile(raw):
+    """Return a list of validation errors for a raw game profile (empty if valid)"""
+    if not isinstance(raw, dict):
+        return ["profile is not a JSON object"]
+
+    errors = []
+    for field in REQUIRED_FIELDS:
+        if not raw.get(field):
+            errors.append(f"missing required field '{field}'")
+
+    for field, expected_type in GAME_PROFILE_FIELDS.items():
+        if field in raw and not isinstance(raw[field], expected_type):
+            errors.append(f"field '{field}' must be a {expected_type.__name__}")
+
+    template = raw.get('launch_command')
+    if isinstance(template, str):
+        try:
+            parse_launch_template(template)
+            placeholders = {name for _, name, _, _ in string.Formatter().parse(template) if name}
+        except ValueError as e:
+            errors.append(f"launch_command is not a valid template: {e}")
+        else:
+            if 'core' in placeholders and not raw.get('core'):
+                errors.append("launch_command uses {core} but no core is set")
+
+    keywords = raw.get('keywords')
+    if isinstance(keywords, list) and not all(isinstance(keyword, str) for keyword in keywords):
+        errors.append("keywords must be a list of strings")
+
+    resolution = raw.get('resolution')
+    if isinstance(resolution, str) and not RESOLUTION_PATTERN.match(resolution):
+        errors.append(f"invalid resolution '{resolution}' (expected WIDTHxHEIGHT)")
+
+    return errors
+
+def _load_game_profile(profile_path, stat):
+    """Parse and validate one profile, reusing the cached result if the file is unchanged"""
+    cached = GAME_PROFILE_CACHE.get(profile_path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2], cached[3]
+
+    try:
+        with open(profile_path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        profile, errors = None, [f"could not read profile: {e}"]
+    else:
+        errors = validate_game_profile(raw)
+        profile = None if errors else dict(raw, profile_path=profile_path)
+
+    GAME_PROFILE_CACHE[profile_path] = (stat.st_mtime, stat.st_size, profile, errors)
+    return profile, errors
+
+def load_game_profiles(directory):
+    """
+    Load every game profile in a directory in one pass.
+    Returns (profiles, errors): profiles maps the lower-cased file stem (which pairs the
+    profile with the ROM of the same stem) to the profile, errors maps filename -> [errors].
+    """
+    profiles = {}
+    errors = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                # Skip the catalog and exported sidecar files of game_organizer.py
+                if (not name.lower().endswith('.json') or name.lower().endswith(SIDECAR_SUFFIX)
+                        or name.lower() == CATALOG_FILENAME):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                profile, profile_errors = _load_game_profile(entry.path, stat)
+                if profile:
+                    profiles[os.path.splitext(name)[0].lower()] = profile
+                elif profile_errors:
+                    errors[name] = profile_errors
+    except OSError:
+        pass
+    return profiles, errors
+
+def find_game_profile(game_path, profiles):
+    """Return the profile paired with a ROM (same stem), if any"""
+    stem = os.path.splitext(os.path.basename(str(game_path)))[0].lower()
+    return profiles.get(stem)
+
+def compile_launch_plan(game_path, emulator_path, launch_template, emulator_name=None,
+                        core=None, core_path=None, resolution=None, cwd=None, source='auto'):
+    """Render a launch template (string or pre-parsed tokens) once into a launch plan"""
+    tokens = parse_launch_template(launch_template) if isinstance(launch_template, str) else launch_template
+    argv = render_argv(
+        tokens,
+        emulator_path=emulator_path,
+        game_path=game_path,
+        core=core,
+        core_path=core_path,
+        resolution=resolution
+    )
+    return make_launch_plan(argv, game_path, emulator_path, emulator_name=emulator_name,
+                            core=core, core_path=core_path, resolution=resolution, cwd=cwd, source=source)
+
+def make_launch_plan(argv, game_path, emulator_path, emulator_name=None,
+                     core=None, core_path=None, resolution=None, cwd=None, source='auto'):
+    """Wrap an already-built argv list into a launch plan"""
+    return {
+        'argv': list(argv),
+        'command': format_argv(argv),
+        'cwd': cwd,
+        'game_path': str(game_path),
+        'emulator_path': emulator_path,
+        'emulator_name': emulator_name or (os.path.basename(emulator_path) if emulator_path else 'Unknown'),
+        'core': core,
+        'core_path': core_path,
+        'resolution': resolution,
+        'source': source
+    }
+
+def compile_profile_launch_plan(profile, game_path, emulator_path=None, cores_directory=None, cwd=None):
+    """Compile a game profile into a launch plan for the paired ROM"""
+    core = profile.get('core')
+    core_path = os.path.join(str(cores_directory), core) if core and cores_directory else None
+    tokens = parse_launch_template(profile['launch_command'])
+    if emulator_path:
+        # Point the template's bare executable (e.g. retroarch.exe) at the resolved emulator
+        tokens = bind_template_executable(tokens, profile['emulator'])
+    return compile_launch_plan(
+        game_path,
+        emulator_path,
+        tokens,
+        emulator_name=profile['emulator'],
+        core=core,
+        core_path=core_path,
+        resolution=profile.get('resolution'),
+        cwd=cwd,
+        source=profile['profile_path']
+    )
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Similar Games
+Recommends games from the local library that resemble a given one, entirely offline.
+Each game becomes a TF-IDF vector over its features (title words, system, genre, profile
+keywords and filename tags); similarity is the cosine between vectors. The model is built
+once per library version and kept until the library changes. With NumPy installed a query
+scores every game at once with vectorized adds over the term postings; without it the same
+sums are done in Python.
+"""
+
+import math
+import threading
+
+from title_search import normalize_title
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SIMILAR_LIMIT = 5
+SIMILAR_MIN_SCORE = 0.05  # Games sharing no more than a region tag are not recommended
+# How much each kind of feature counts, before IDF weighting
+FEATURE_WEIGHTS = {'word': 1.0, 'system': 0.75, 'genre': 1.5, 'keyword': 1.0, 'tag': 0.25}
+
+# model: {'keys', 'row_of', 'rows', 'postings'}; version is whatever the caller uses to detect library changes
+SIMILARITY_STATE = {'version': None, 'model': None}
+SIMILARITY_LOCK = threading.Lock()
+
+def game_features(title, system=None, genre=None, keywords=(), tags=()):
+    """Weighted feature counts of one game: {('word', 'mario'): 1.0, ('system', 'snes'): 0.75, ...}"""
+    features = {}
+    def add(kind, value):
+        value = normalize_title(str(value))
+        if value:
+            features[(kind, value)] = features.get((kind, value), 0.0) + FEATURE_WEIGHTS[kind]
+    for word in normalize_title(title or "").split():
+        add('word', word)
+    if system:
+        add('system', system)
+    if genre:
+        add('genre', genre)
+    for keyword in keywords or ():
+        add('keyword', keyword)
+    for tag in tags or ():
+        add('tag', tag)
+    return features
+
+def build_similarity_model(games):
+    """
+    Build the TF-IDF model from {key: features} (see game_features). Rows are L2-normalized,
+    so the dot product of two rows is their cosine similarity.
+    """
+    keys = list(games)
+    document_frequency = {}
+    for features in games.values():
+        for feature in features:
+            document_frequency[feature] = document_frequency.get(feature, 0) + 1
+
+    total = len(keys)
+    term_ids = {}
+    rows = []
+    postings = []  # term id -> ([row numbers], [weights])
+    for row_number, key in enumerate(keys):
+        row = {}
+        for feature, weight in games[key].items():
+            # Smoothed IDF: features every game shares still count a little
+            row[feature] = weight * (math.log((1 + total) / (1 + document_frequency[feature])) + 1.0)
+        norm = math.sqrt(sum(value * value for value in row.values())) or 1.0
+        sparse_row = {}
+        for feature, value in row.items():
+            term = term_ids.setdefault(feature, len(term_ids))
+            if term == len(postings):
+                postings.append(([], []))
+            sparse_row[term] = value / norm
+            postings[term][0].append(row_number)
+            postings[term][1].append(value / norm)
+        rows.append(sparse_row)
+
+    if np is not None:
+        postings = [(np.array(numbers, dtype=np.int32), np.array(weights, dtype=np.float32))
+                    for numbers, weights in postings]
+    return {'keys': keys, 'row_of': {key: number for number, key in enumerate(keys)}, 'rows': rows, 'postings': postings}
+
+def get_similarity_model(version, load_games):
+    """
+    The model for the library as of version (any comparable value that changes with the
+    library), built from load_games() -> {key: features} only when the version changed
+    """
+    with SIMILARITY_LOCK:
+        if SIMILARITY_STATE['model'] is not None and SIMILARITY_STATE['version'] == version:
+            return SIMILARITY_STATE['model']
+    model = build_similarity_model(load_games())
+    with SIMILARITY_LOCK:
+        SIMILARITY_STATE['version'] = version
+        SIMILARITY_STATE['model'] = model
+    return model
+
+def similar_games(model, key, limit=SIMILAR_LIMIT):
+    """Return up to limit (key, cosine similarity) pairs most like key's game, best first"""
+    row_number = model['row_of'].get(key)
+    if row_number is None:
+        return []
+    query = model['rows'][row_number]
+    postings = model['postings']
+
+    if np is not None:
+        scores = np.zeros(len(model['keys']), dtype=np.float32)
+        for term, weight in query.items():
+            numbers, weights = postings[term]
+            scores[numbers] += weights * weight  # Row numbers within one posting are unique
+        scores[row_number] = 0.0
+        candidates = np.flatnonzero(scores >= SIMILAR_MIN_SCORE)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        ranked = sorted(((model['keys'][number], float(scores[number])) for number in candidates),
+                        key=lambda match: -match[1])
+        return ranked[:limit]
+
+    scores = {}
+    for term, weight in query.items():
+        for number, other_weight in zip(*postings[term]):
+            scores[number] = scores.get(number, 0.0) + other_weight * weight
+    scores.pop(row_number, None)
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+    return [(model['keys'][number], score) for number, score in ranked if score >= SIMILAR_MIN_SCORE]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Launch Commands
+Parses emulator launch templates once into argv token lists with typed placeholders,
+renders them per game and spawns emulators directly without a shell
+"""
+
+import os
+import re
+import shlex
+import string
+import platform
+import subprocess
+from functools import lru_cache
+
+# Placeholder name -> value type. Paths are passed through os.fspath so Path objects
+# and odd filenames (spaces, quotes, $, ...) end up as a single argv entry.
+PLACEHOLDER_TYPES = {
+    'emulator_path': 'path',
+    'game_path': 'path',
+    'core_path': 'path',
+    'core': 'str',
+    'resolution': 'resolution'
+}
+RESOLUTION_PATTERN = re.compile(r'^\d+x\d+$')
+
+LITERAL = 'literal'
+PLACEHOLDER = 'placeholder'
+
+@lru_cache(maxsize=256)
+def parse_launch_template(template):
+    """
+    Tokenize a launch template into a tuple of argv tokens.
+    Each token is a tuple of (LITERAL, text) / (PLACEHOLDER, name) parts.
+    Raises ValueError for unbalanced quotes or unknown placeholders.
+    """
+    tokens = []
+    for raw_token in shlex.split(template, posix=True):
+        parts = []
+        for literal, field, _, _ in string.Formatter().parse(raw_token):
+            if literal:
+                parts.append((LITERAL, literal))
+            if field is not None:
+                if field not in PLACEHOLDER_TYPES:
+                    raise ValueError(f"unknown placeholder '{{{field}}}' in launch template")
+                parts.append((PLACEHOLDER, field))
+        tokens.append(tuple(parts))
+    return tuple(tokens)
+
+def _convert_placeholder(name, value):
+    """Convert a placeholder value according to its declared type"""
+    if value is None or value == '':
+        return ''
+    value_type = PLACEHOLDER_TYPES[name]
+    if value_type == 'path':
+        return os.fspath(value)
+    if value_type == 'resolution':
+        value = str(value)
+        if not RESOLUTION_PATTERN.match(value):
+            raise ValueError(f"invalid resolution '{value}'")
+        return value
+    return str(value)
+
+def render_argv(tokens, **values):
+    """
+    Render parsed template tokens into an argv list.
+    A token made only of a placeholder with no value is dropped, so optional
+    arguments such as an unset core do not leave empty strings behind.
+    """
+    argv = []
+    for parts in tokens:
+        if len(parts) == 1 and parts[0][0] == PLACEHOLDER and values.get(parts[0][1]) in (None, ''):
+            continue
+        argv.append(''.join(
+            text if kind == LITERAL else _convert_placeholder(text, values.get(text))
+            for kind, text in parts
+        ))
+    return argv
+
+def bind_template_executable(tokens, executable_name):
+    """Replace a bare leading executable (e.g. retroarch.exe) with the {emulator_path} placeholder"""
+    if not tokens or len(tokens[0]) != 1 or tokens[0][0][0] != LITERAL:
+        return tokens
+    executable = os.path.splitext(os.path.basename(tokens[0][0][1]))[0].lower()
+    if executable != executable_name.lower():
+        return tokens
+    return (((PLACEHOLDER, 'emulator_path'),),) + tokens[1:]
+
+def format_argv(argv):
+    """Format an argv list for display and logging"""
+    if platform.system() == 'Windows':
+        return subprocess.list2cmdline(argv)
+    return shlex.join(argv)
+
+def spawn_argv(argv, cwd=None, **popen_kwargs):
+    """Start a process directly from argv (no /bin/sh in between)"""
+    return subprocess.Popen(argv, cwd=cwd, **popen_kwargs)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Launch History
+Append-only record of every launch (game, start time, duration) feeding a
+frequency/recency model that predicts which games to warm up next
+"""
+
+import os
+import time
+import threading
+
+from prefetch import prefetch_launch_plan, prefetch_game
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "launch_history.tsv")
+HALF_LIFE_DAYS = 14  # A launch counts half as much after this many days
+MAX_HISTORY_LINES = 20000  # The file is compacted to this many lines when it grows past twice that
+DEFAULT_PREDICTIONS = 5
+
+# game path -> {'launches', 'last_played', 'total_duration', 'score', 'scored_at'}
+GAME_STATS = {}
+HISTORY_STATE = {'loaded': False, 'lines': 0, 'hits': 0, 'misses': 0}
+PREDICTED_GAMES = set()
+HISTORY_LOCK = threading.Lock()
+
+def _decayed(score, scored_at, now):
+    """Decay a score from scored_at to now"""
+    return score * 0.5 ** ((now - scored_at) / (HALF_LIFE_DAYS * 86400))
+
+def _apply_launch(game_path, started_at, duration, hit):
+    """Fold one launch into the in-memory model (lock held)"""
+    stats = GAME_STATS.get(game_path)
+    if stats is None:
+        stats = GAME_STATS[game_path] = {
+            'launches': 0, 'last_played': 0, 'total_duration': 0.0, 'score': 0.0, 'scored_at': started_at
+        }
+    stats['launches'] += 1
+    stats['last_played'] = max(stats['last_played'], started_at)
+    stats['total_duration'] += duration
+    if started_at >= stats['scored_at']:
+        stats['score'] = _decayed(stats['score'], stats['scored_at'], started_at) + 1.0
+        stats['scored_at'] = started_at
+    else:
+        # Out-of-order entry: decay the launch to the current reference time instead
+        stats['score'] += _decayed(1.0, started_at, stats['scored_at'])
+    if hit is not None:
+        HISTORY_STATE['hits' if hit else 'misses'] += 1
+
+def _parse_line(line):
+    """Parse 'started_at<TAB>duration<TAB>hit<TAB>path'; returns None for malformed lines"""
+    parts = line.rstrip('\n').split('\t', 3)
+    if len(parts) != 4:
+        return None
+    try:
+        hit = None if parts[2] == '-' else parts[2] == '1'
+        return float(parts[0]), float(parts[1]), hit, parts[3]
+    except ValueError:
+        return None
+
+def load_history():
+    """Load the history file into the model once"""
+    with HISTORY_LOCK:
+        if HISTORY_STATE['loaded']:
+            return
+        HISTORY_STATE['loaded'] = True
+        try:
+            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = _parse_line(line)
+                    if entry:
+                        started_at, duration, hit, game_path = entry
+                        _apply_launch(game_path, started_at, duration, hit)
+                        HISTORY_STATE['lines'] += 1
+        except OSError:
+            pass
+
+def _compact_history():
+    """Rewrite the history file keeping only the newest MAX_HISTORY_LINES lines (lock held)"""
+    try:
+        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+            lines = f.readlines()[-MAX_HISTORY_LINES:]
+        temp_file = HISTORY_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(temp_file, HISTORY_FILE)
+        HISTORY_STATE['lines'] = len(lines)
+    except OSError:
+        pass
+
+def record_launch(game_path, started_at, duration, hit=None):
+    """Append one launch to the history file and update the model"""
+    load_history()
+    game_path = str(game_path)
+    hit_flag = '-' if hit is None else ('1' if hit else '0')
+    with HISTORY_LOCK:
+        _apply_launch(game_path, started_at, duration, hit)
+        try:
+            os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+            with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+                f.write(f"{started_at:.0f}\t{duration:.1f}\t{hit_flag}\t{game_path}\n")
+            HISTORY_STATE['lines'] += 1
+        except OSError:
+            return
+        if HISTORY_STATE['lines'] > MAX_HISTORY_LINES * 2:
+            _compact_history()
+
+def mark_launch(session):
+    """Remember on a new session whether the model had predicted (and warmed) its game"""
+    with HISTORY_LOCK:
+        session['predicted'] = session.get('game_path') in PREDICTED_GAMES
+
+def record_session_history(session):
+    """Supervisor exit callback: record a finished emulator session"""
+    if not session.get('game_path'):
+        return
+    duration = (session['ended_at'] or time.time()) - session['started_at']
+    record_launch(session['game_path'], session['started_at'], duration, session.get('predicted'))
+
+def predict_games(candidates=None, count=DEFAULT_PREDICTIONS, now=None):
+    """Return up to count (game_path, score) pairs, most likely first, limited to candidates if given"""
+    load_history()
+    now = now or time.time()
+    with HISTORY_LOCK:
+        scored = [
+            (game_path, _decayed(stats['score'], stats['scored_at'], now))
+            for game_path, stats in GAME_STATS.items()
+            if candidates is None or game_path in candidates
+        ]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:count]
+
+def set_predicted_games(game_paths, replace=True):
+    """Record which games were warmed on the model's behalf (used for the hit rate)"""
+    with HISTORY_LOCK:
+        if replace:
+            PREDICTED_GAMES.clear()
+        PREDICTED_GAMES.update(str(game_path) for game_path in game_paths)
+
+def warm_predicted_games(launch_plans, count=DEFAULT_PREDICTIONS, replace=True):
+    """
+    Warm the most likely games among launch_plans (game path -> launch plan or None).
+    With replace=False the predictions are added to the current set (e.g. on cartridge insert).
+    Returns the predicted game paths.
+    """
+    predictions = predict_games(set(launch_plans), count)
+    for game_path, _ in predictions:
+        if launch_plans[game_path]:
+            prefetch_launch_plan(launch_plans[game_path])
+        else:
+            prefetch_game(game_path)
+    set_predicted_games((game_path for game_path, _ in predictions), replace=replace)
+    return [game_path for game_path, _ in predictions]
+
+def get_game_history(game_path):
+    """Return the launch statistics for one game, or None"""
+    load_history()
+    with HISTORY_LOCK:
+        stats = GAME_STATS.get(str(game_path))
+        return dict(stats) if stats else None
+
+def get_hit_rate():
+    """Return (hits, misses, rate) for predicted launches; rate is None before any launch"""
+    load_history()
+    with HISTORY_LOCK:
+        hits, misses = HISTORY_STATE['hits'], HISTORY_STATE['misses']
+    total = hits + misses
+    return hits, misses, (hits / total if total else None)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Launch Policies
+Per-system CPU affinity, nice level and I/O priority for launched emulators, and
+confinement of RetroFlow's own threads to the remaining cores while a game runs
+"""
+
+import os
+import glob
+import json
+import threading
+import psutil
+
+from process_supervisor import running_sessions
+
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "launch_policies.json")
+
+# cpus: 'all', 'big', 'little' or an explicit list of CPU numbers
+# nice: process niceness (negative values usually need elevated privileges)
+# ionice: 'high', 'normal', 'low' or 'idle' (Linux only)
+DEFAULT_POLICY = {
+    'cpus': 'all',
+    'nice': None,
+    'ionice': None,
+    'confine_host': True
+}
+
+SYSTEM_POLICIES = {
+    'Nintendo 64': {'cpus': 'big', 'ionice': 'high'},
+    'PlayStation 1': {'cpus': 'big', 'ionice': 'high'},
+    'Nintendo DS': {'cpus': 'big'},
+    'Super Nintendo': {'cpus': 'big'}
+}
+
+# Matched against the emulator executable name, so they win over system policies
+EMULATOR_POLICIES = {
+    'mupen64plus': {'cpus': 'big', 'ionice': 'high'}
+}
+
+POLICY_CACHE = {'mtime': None, 'policies': None}
+HOST_AFFINITY = {'original': None}
+POLICY_LOCK = threading.Lock()
+
+def load_policies():
+    """Return (system_policies, emulator_policies), merged with Config/launch_policies.json if present"""
+    try:
+        mtime = os.path.getmtime(POLICY_FILE)
+    except OSError:
+        mtime = None
+
+    if POLICY_CACHE['policies'] is not None and POLICY_CACHE['mtime'] == mtime:
+        return POLICY_CACHE['policies']
+
+    system_policies = {name: dict(policy) for name, policy in SYSTEM_POLICIES.items()}
+    emulator_policies = {name: dict(policy) for name, policy in EMULATOR_POLICIES.items()}
+    if mtime is not None:
+        try:
+            with open(POLICY_FILE, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            for name, policy in overrides.get('systems', {}).items():
+                system_policies.setdefault(name, {}).update(policy)
+            for name, policy in overrides.get('emulators', {}).items():
+                emulator_policies.setdefault(name.lower(), {}).update(policy)
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    POLICY_CACHE['mtime'] = mtime
+    POLICY_CACHE['policies'] = (system_policies, emulator_policies)
+    return POLICY_CACHE['policies']
+
+def get_launch_policy(system, emulator_name):
+    """Merge the default, per-system and per-emulator policies for a launch"""
+    system_policies, emulator_policies = load_policies()
+    policy = dict(DEFAULT_POLICY)
+    policy.update(system_policies.get(system, {}))
+
+    emulator_name = str(emulator_name or '').lower()
+    for name, emulator_policy in emulator_policies.items():
+        if name in emulator_name:
+            policy.update(emulator_policy)
+            break
+    return policy
+
+def available_cpus():
+    """Return the CPUs this process may run on (before any confinement by confine_host)"""
+    if HOST_AFFINITY['original'] is not None:
+        return list(HOST_AFFINITY['original'])
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(psutil.cpu_count() or 1))
+
+def _cpu_max_frequencies():
+    """Return {cpu: max frequency in kHz} from sysfs (empty where unavailable)"""
+    frequencies = {}
+    for path in glob.glob("/sys/devices/system/cpu/cpu[0-9]*/cpufreq/cpuinfo_max_freq"):
+        try:
+            cpu = int(path.split("/cpu/cpu")[1].split("/")[0])
+            with open(path, 'r') as f:
+                frequencies[cpu] = int(f.read().strip())
+        except (OSError, ValueError, IndexError):
+            continue
+    return frequencies
+
+def resolve_cpu_set(spec):
+    """Resolve a policy CPU spec ('all', 'big', 'little' or a list) to a sorted CPU list"""
+    cpus = available_cpus()
+    if isinstance(spec, (list, tuple)):
+        selected = [cpu for cpu in spec if cpu in cpus]
+        return selected or cpus
+
+    if spec in ('big', 'little'):
+        frequencies = {cpu: freq for cpu, freq in _cpu_max_frequencies().items() if cpu in cpus}
+        if len(set(frequencies.values())) > 1:
+            top = max(frequencies.values())
+            if spec == 'big':
+                return sorted(cpu for cpu, freq in frequencies.items() if freq == top)
+            return sorted(cpu for cpu, freq in frequencies.items() if freq != top)
+        # Symmetric CPUs: give the emulator all but one core and leave that one to RetroFlow
+        if len(cpus) > 1:
+            return cpus[1:] if spec == 'big' else cpus[:1]
+    return cpus
+
+def _ionice_value(level):
+    """Map a policy ionice level to psutil.Process.ionice() arguments"""
+    if not hasattr(psutil, 'IOPRIO_CLASS_BE'):
+        return None
+    return {
+        'high': (psutil.IOPRIO_CLASS_BE, 0),
+        'normal': (psutil.IOPRIO_CLASS_BE, 4),
+        'low': (psutil.IOPRIO_CLASS_BE, 7),
+        'idle': (psutil.IOPRIO_CLASS_IDLE, 0)
+    }.get(level)
+
+def apply_launch_policy(pid, policy):
+    """
+    Apply a policy to a running emulator process.
+    Returns a list of human-readable notes describing what was (or could not be) applied.
+    """
+    notes = []
+    try:
+        process = psutil.Process(pid)
+    except psutil.Error as e:
+        return [f"policy not applied: {e}"]
+
+    # Children inherit RetroFlow's affinity, so set it explicitly while the host is confined
+    cpus = resolve_cpu_set(policy.get('cpus', 'all'))
+    host_confined = HOST_AFFINITY['original'] is not None
+    if (policy.get('cpus', 'all') != 'all' or host_confined) and hasattr(process, 'cpu_affinity'):
+        try:
+            process.cpu_affinity(cpus)
+            notes.append(f"affinity {','.join(map(str, cpus))}")
+        except (psutil.Error, OSError, ValueError) as e:
+            notes.append(f"affinity failed: {e}")
+
+    if policy.get('nice') is not None:
+        try:
+            process.nice(int(policy['nice']))
+            notes.append(f"nice {policy['nice']}")
+        except (psutil.Error, OSError, ValueError) as e:
+            notes.append(f"nice failed: {e}")
+
+    ionice = _ionice_value(policy.get('ionice'))
+    if ionice and hasattr(process, 'ionice'):
+        try:
+            process.ionice(*ionice)
+            notes.append(f"ionice {policy['ionice']}")
+        except (psutil.Error, OSError, ValueError) as e:
+            notes.append(f"ionice failed: {e}")
+
+    return notes
+
+def _set_host_affinity(cpus):
+    """Pin every thread of the RetroFlow process to the given CPUs"""
+    if hasattr(os, 'sched_setaffinity'):
+        # sched_setaffinity works per thread on Linux, so apply it to each one
+        for thread in psutil.Process().threads():
+            try:
+                os.sched_setaffinity(thread.id, cpus)
+            except OSError:
+                pass
+    else:
+        process = psutil.Process()
+        if hasattr(process, 'cpu_affinity'):
+            process.cpu_affinity(list(cpus))
+
+def confine_host(emulator_cpus):
+    """Move RetroFlow's own threads (UI, scanner, AI calls) off the emulator's cores"""
+    cpus = available_cpus()
+    host_cpus = [cpu for cpu in cpus if cpu not in emulator_cpus]
+    if not host_cpus:
+        return None
+
+    with POLICY_LOCK:
+        if HOST_AFFINITY['original'] is None:
+            HOST_AFFINITY['original'] = cpus
+        try:
+            _set_host_affinity(host_cpus)
+        except (psutil.Error, OSError, ValueError):
+            return None
+    return host_cpus
+
+def restore_host():
+    """Give RetroFlow its original CPUs back"""
+    with POLICY_LOCK:
+        original = HOST_AFFINITY['original']
+        if original is None:
+            return
+        try:
+            _set_host_affinity(original)
+        except (psutil.Error, OSError, ValueError):
+            pass
+        HOST_AFFINITY['original'] = None
+
+def apply_session_policy(session, system):
+    """Apply the launch policy for a new supervisor session and confine RetroFlow if needed"""
+    emulator_id = f"{os.path.basename(session['argv'][0])} {session['emulator_name']}"
+    policy = get_launch_policy(system, emulator_id)
+    notes = apply_launch_policy(session['pid'], policy)
+    if policy.get('confine_host') and policy.get('cpus', 'all') != 'all':
+        host_cpus = confine_host(resolve_cpu_set(policy['cpus']))
+        if host_cpus:
+            notes.append(f"RetroFlow on {','.join(map(str, host_cpus))}")
+    session['policy'] = policy
+    session['policy_notes'] = notes
+    return notes
+
+def release_session_policy(session):
+    """Exit callback: restore RetroFlow's CPUs once no emulator is running (an idle warm host does not count)"""
+    if not any(not running.get('warm_host') for running in running_sessions()):
+        restore_host()
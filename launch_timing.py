@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Launch Timing
+Per-phase timing of every launch (list refresh, emulator resolution, command build,
+archive extraction, UI delays, process spawn, first emulator output), kept as a rolling
+window of recent launches in Config/launch_timings.json and summarized as histograms
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+
+TIMINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "launch_timings.json")
+MAX_LAUNCHES = 200  # Launches kept in the rolling window
+
+# Display order and descriptions of the measured phases
+PHASES = {
+    'refresh': "game list refresh before launching",
+    'resolve': "find the game and its system",
+    'build': "pick/compile the launch plan",
+    'extract': "extract archived ROMs / pick the local copy of a cartridge ROM",
+    'ui': "launch screen, sounds and animations",
+    'spawn': "start the emulator process",
+    'warm_load': "load into the warm RetroArch host",
+    'setup': "launch policy and bookkeeping",
+    'first_output': "emulator running until its first output"
+}
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+BUCKETS_MS = (1, 10, 50, 100, 250, 500, 1000, 2000, 5000)
+
+LAUNCH_TIMINGS = deque(maxlen=MAX_LAUNCHES)  # Each launch: {'at', 'game', phase: ms, ..., 'total': ms}
+TIMING_STATE = {'loaded': False}
+TIMING_LOCK = threading.Lock()
+
+def start_launch_timer(game_path=None):
+    """Begin timing a launch; pass the returned timer to mark_phase and finish_launch_timer"""
+    now = time.perf_counter()
+    return {'game': os.path.basename(str(game_path)) if game_path else None, 'started': now, 'last': now, 'phases': {}}
+
+def mark_phase(timer, phase):
+    """Attribute the time since the previous mark to a phase"""
+    if timer is None:
+        return
+    now = time.perf_counter()
+    timer['phases'][phase] = timer['phases'].get(phase, 0.0) + (now - timer['last']) * 1000
+    timer['last'] = now
+
+def _load_timings():
+    """Read the saved rolling window once (lock held)"""
+    if TIMING_STATE['loaded']:
+        return
+    TIMING_STATE['loaded'] = True
+    try:
+        with open(TIMINGS_FILE, 'r', encoding='utf-8') as f:
+            launches = json.load(f)
+        LAUNCH_TIMINGS.extend(launch for launch in launches if isinstance(launch, dict))
+    except (OSError, ValueError, TypeError):
+        pass
+
+def _save_timings():
+    """Write the rolling window atomically (lock held)"""
+    try:
+        os.makedirs(os.path.dirname(TIMINGS_FILE), exist_ok=True)
+        temp_file = TIMINGS_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(list(LAUNCH_TIMINGS), f, separators=(',', ':'))
+        os.replace(temp_file, TIMINGS_FILE)
+    except OSError:
+        pass
+
+def finish_launch_timer(timer, session=None):
+    """
+    Record a finished launch; 'total' is the time RetroFlow spent in it. For a session whose
+    output is captured, the time until the emulator's first output is added by record_first_output.
+    """
+    if timer is None:
+        return None
+    launch = {'at': round(time.time()), 'game': timer['game'] or (session or {}).get('game_name')}
+    launch.update({phase: round(ms, 1) for phase, ms in timer['phases'].items()})
+    launch['total'] = round((timer['last'] - timer['started']) * 1000, 1)
+    with TIMING_LOCK:
+        _load_timings()
+        LAUNCH_TIMINGS.append(launch)
+        if session is not None:
+            session['launch_timing'] = launch
+            if session.get('first_output_at') is not None:
+                _apply_first_output(session)
+        _save_timings()
+    return launch
+
+def _apply_first_output(session):
+    """Fill in the first-output phase of a session's launch record (lock held)"""
+    launch = session.get('launch_timing')
+    if launch is None or 'first_output' in launch:
+        return
+    # Counted from the spawn, so it overlaps the setup/ui phases and is not part of 'total'
+    launch['first_output'] = round(max(0.0, session['first_output_at'] - session['started_at']) * 1000, 1)
+
+def record_first_output(session):
+    """Supervisor first-output callback: time from spawn to the emulator's first line of output"""
+    with TIMING_LOCK:
+        if session.get('launch_timing') is None:
+            return  # The launch is still being timed; finish_launch_timer picks it up
+        _apply_first_output(session)
+        _save_timings()
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def get_latency_histograms():
+    """
+    Summarize the rolling window per phase (plus 'total'):
+    {phase: {'count', 'p50', 'p95', 'max', 'buckets': [count per BUCKETS_MS bucket + overflow]}}
+    """
+    with TIMING_LOCK:
+        _load_timings()
+        launches = list(LAUNCH_TIMINGS)
+
+    histograms = {}
+    for phase in list(PHASES) + ['total']:
+        values = sorted(launch[phase] for launch in launches if isinstance(launch.get(phase), (int, float)))
+        if not values:
+            continue
+        buckets = [0] * (len(BUCKETS_MS) + 1)
+        for value in values:
+            buckets[next((i for i, bound in enumerate(BUCKETS_MS) if value < bound), len(BUCKETS_MS))] += 1
+        histograms[phase] = {
+            'count': len(values),
+            'p50': _percentile(values, 0.50),
+            'p95': _percentile(values, 0.95),
+            'max': values[-1],
+            'buckets': buckets
+        }
+    return histograms
+
+def get_recent_launches(count=5):
+    """Return the newest launch records, newest first"""
+    with TIMING_LOCK:
+        _load_timings()
+        return list(LAUNCH_TIMINGS)[-count:][::-1]
+
+def format_histogram(buckets):
+    """Render bucket counts as a one-character-per-bucket bar, e.g. ' ▂█▅▁    '"""
+    blocks = " ▁▂▃▄▅▆▇█"
+    peak = max(buckets) if buckets else 0
+    if not peak:
+        return " " * len(buckets)
+    return "".join(blocks[0] if not count else blocks[max(1, round(count / peak * (len(blocks) - 1)))] for count in buckets)
+
+def bucket_labels():
+    """Short labels of the histogram buckets, matching format_histogram's characters"""
+    labels = [f"<{bound}ms" if bound < 1000 else f"<{bound // 1000}s" for bound in BUCKETS_MS]
+    return labels + [f">={BUCKETS_MS[-1] // 1000}s"]
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Library Index
+Keeps the game library in secondary ordered indexes (by title, size, time added and system,
+for the whole library and for each system), so views such as "SNES games, largest first"
+are a slice of a list that is already in order. The indexes are maintained incrementally:
+a game that is added, removed or changed is inserted into or deleted from each sorted list
+by binary search. Only a first build, or a change to most of the library, sorts the lists.
+"""
+
+import bisect
+import threading
+
+from rom_tags import rom_sort_key
+
+LIBRARY_SORTS = ('title', 'size', 'added', 'system')
+LIST_PAGE_SIZE = 20
+BULK_CHANGE_LIMIT = 1024  # Beyond this many changed games one sort is cheaper than many insertions
+
+# Short names accepted by 'list --system', mapped to the system names games report
+SYSTEM_ALIASES = {
+    'nes': 'Nintendo Entertainment System', 'famicom': 'Nintendo Entertainment System',
+    'snes': 'Super Nintendo', 'sfc': 'Super Nintendo', 'super famicom': 'Super Nintendo',
+    'gb': 'Game Boy', 'gbc': 'Game Boy Color', 'gba': 'Game Boy Advance',
+    'genesis': 'Sega Genesis', 'md': 'Sega Genesis', 'mega drive': 'Sega Genesis',
+    'n64': 'Nintendo 64', 'psx': 'PlayStation 1', 'ps1': 'PlayStation 1', 'dos': 'MS-DOS'
+}
+
+# records: path -> {'title', 'system', 'size', 'added'}
+# orders: (system key, sort) -> sorted [(sort key, path)]; system key '' is the whole library
+# systems: system key -> system name as reported
+LIBRARY_INDEX = {'records': {}, 'orders': {}, 'systems': {}}
+LIBRARY_LOCK = threading.Lock()
+
+def _system_key(system):
+    return ' '.join((system or "").lower().split()) or "unknown"
+
+def _sort_key(record, sort, path):
+    """
+    Position of a game in one ordering; the path breaks ties so every entry is unique.
+    Dumps of one title are ordered by region preference, good dumps first, latest revision
+    first, then disc (see rom_sort_key).
+    """
+    title = record['title'].lower()
+    if sort == 'size':
+        return (record['size'] or 0, title, path)
+    if sort == 'added':
+        return (record['added'] or 0, title, path)
+    if sort == 'system':
+        return (_system_key(record['system']), title, path)
+    return (title, rom_sort_key(path)[1:], path)
+
+def _insert(path, record):
+    """Add a game to every ordering it belongs to (lock held)"""
+    system_key = _system_key(record['system'])
+    LIBRARY_INDEX['records'][path] = record
+    LIBRARY_INDEX['systems'].setdefault(system_key, record['system'] or "Unknown")
+    for sort in LIBRARY_SORTS:
+        entry = (_sort_key(record, sort, path), path)
+        for view in ('', system_key):
+            bisect.insort(LIBRARY_INDEX['orders'].setdefault((view, sort), []), entry)
+
+def _delete(path):
+    """Remove a game from every ordering it is in (lock held)"""
+    record = LIBRARY_INDEX['records'].pop(path)
+    system_key = _system_key(record['system'])
+    orders = LIBRARY_INDEX['orders']
+    for sort in LIBRARY_SORTS:
+        entry = (_sort_key(record, sort, path), path)
+        for view in ('', system_key):
+            entries = orders[(view, sort)]
+            position = bisect.bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+    if not orders.get((system_key, 'title')):
+        for sort in LIBRARY_SORTS:
+            orders.pop((system_key, sort), None)
+        LIBRARY_INDEX['systems'].pop(system_key, None)
+
+def _rebuild(records):
+    """Build every ordering from scratch with one sort each (lock held)"""
+    orders = {}
+    systems = {}
+    for path, record in records.items():
+        system_key = _system_key(record['system'])
+        systems.setdefault(system_key, record['system'] or "Unknown")
+        for sort in LIBRARY_SORTS:
+            entry = (_sort_key(record, sort, path), path)
+            orders.setdefault(('', sort), []).append(entry)
+            orders.setdefault((system_key, sort), []).append(entry)
+    for entries in orders.values():
+        entries.sort()
+    LIBRARY_INDEX['records'] = dict(records)
+    LIBRARY_INDEX['orders'] = orders
+    LIBRARY_INDEX['systems'] = systems
+
+def index_game(path, title, system, size, added):
+    """Add a game to the indexes, or move it if its title, system, size or added time changed"""
+    record = {'title': title or "", 'system': system, 'size': size, 'added': added}
+    with LIBRARY_LOCK:
+        current = LIBRARY_INDEX['records'].get(path)
+        if current == record:
+            return
+        if current:
+            _delete(path)
+        _insert(path, record)
+
+def unindex_game(path):
+    """Drop a game from the indexes"""
+    with LIBRARY_LOCK:
+        if path in LIBRARY_INDEX['records']:
+            _delete(path)
+
+def get_library_record(path):
+    """The indexed {'title', 'system', 'size', 'added'} of a game, or None"""
+    with LIBRARY_LOCK:
+        record = LIBRARY_INDEX['records'].get(path)
+        return dict(record) if record else None
+
+def sync_library(records):
+    """
+    Bring the indexes in line with {path: {'title', 'system', 'size', 'added'}} for the
+    whole library, moving only the games that were added, changed or removed.
+    Returns (added or changed, removed) counts.
+    """
+    records = {path: {'title': record['title'] or "", 'system': record['system'], 'size': record['size'],
+                      'added': record['added']} for path, record in records.items()}
+    with LIBRARY_LOCK:
+        indexed = LIBRARY_INDEX['records']
+        removed = [path for path in indexed if path not in records]
+        changed = [path for path, record in records.items() if indexed.get(path) != record]
+        if len(changed) + len(removed) > BULK_CHANGE_LIMIT:
+            _rebuild(records)
+            return len(changed), len(removed)
+    for path in removed:
+        unindex_game(path)
+    for path in changed:
+        record = records[path]
+        index_game(path, record['title'], record['system'], record['size'], record['added'])
+    return len(changed), len(removed)
+
+def resolve_system(name):
+    """
+    The system name a user means by name ('snes', 'game boy', 'genesis'), among the systems
+    in the library: an exact name or alias, else the only system containing the text.
+    Returns None if nothing (or more than one system) matches.
+    """
+    wanted = _system_key(SYSTEM_ALIASES.get(_system_key(name), name))
+    with LIBRARY_LOCK:
+        systems = dict(LIBRARY_INDEX['systems'])
+    if wanted in systems:
+        return systems[wanted]
+    partial = [system for key, system in systems.items() if wanted in key]
+    return partial[0] if len(partial) == 1 else None
+
+def list_library(system=None, sort='title', descending=False, page=1, page_size=LIST_PAGE_SIZE, match=None):
+    """
+    One page of game paths in the requested order, read straight from the index.
+    match, if given, keeps only the paths it returns True for (e.g. a region filter).
+    Returns (paths, total games in the view). Raises ValueError for an unknown sort.
+    """
+    if sort not in LIBRARY_SORTS:
+        raise ValueError(f"unknown sort '{sort}' (expected one of: {', '.join(LIBRARY_SORTS)})")
+    start = max(page - 1, 0) * page_size
+    with LIBRARY_LOCK:
+        entries = LIBRARY_INDEX['orders'].get((_system_key(system) if system else '', sort), [])
+        if match:
+            entries = [entry for entry in entries if match(entry[1])]
+        total = len(entries)
+        if descending:
+            page_entries = entries[max(total - start - page_size, 0):max(total - start, 0)][::-1]
+        else:
+            page_entries = entries[start:start + page_size]
+    return [path for _, path in page_entries], total
+
+def get_library_systems():
+    """Return {system name: number of games} for the systems in the library"""
+    with LIBRARY_LOCK:
+        return {system: len(LIBRARY_INDEX['orders'].get((key, 'title'), []))
+                for key, system in LIBRARY_INDEX['systems'].items()}
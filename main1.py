@@ -1,4 +1,3 @@
-import subprocess
 import sys
 import os
 import json
@@ -14,6 +13,47 @@ import traceback
 from pathlib import Path # Ensure this is imported
 import pygame # ADD THIS LINE
 import pygame.mixer as mixer # Ensure this is also present
+from emulator_profiles import (
+    get_emulator_candidates, get_extension_systems, get_profile_extensions, load_profile, locate_profile_executable,
+    profile_to_config
+)
+from game_profiles import (
+    load_game_profiles, find_game_profile, compile_launch_plan, compile_profile_launch_plan
+)
+from process_supervisor import (
+    add_exit_callback, add_first_output_callback, launch_session, get_session, list_sessions,
+    collect_exited_sessions, session_runtime, terminate_session, session_output
+)
+from launch_policy import apply_session_policy, release_session_policy
+from prefetch import prefetch_launch_plan, get_prefetch_stats, set_source_resolver
+from launch_history import (
+    mark_launch, record_session_history, warm_predicted_games, predict_games, get_game_history, get_hit_rate
+)
+from emulator_health import (
+    RETROARCH_FALLBACK_CORES, emulator_id, is_emulator_healthy, select_launch_plans, mark_session_health,
+    record_session_health, record_outcome, get_health_records
+)
+from emulator_probe import is_emulator_runnable, is_core_usable, probe_emulators_in_background
+from session_telemetry import start_telemetry, record_session_telemetry, load_session_stats, aggregate_by_emulator
+from warm_host import can_launch_warm, launch_warm, prestart_warm_host, stop_warm_host, get_warm_host_status
+from archive_cache import (
+    is_archive, list_archived_roms, split_archive_path, extract_rom, localize_launch_plan, get_archive_cache_stats
+)
+from rom_cache import set_cartridge_roots, local_rom_path, record_session_rom_cache, get_rom_cache_stats
+from rom_hashing import hash_roms_in_background, get_hash_cache_stats, get_hash_cache_version
+from dat_index import identify_rom, import_dat_file, get_dat_index_stats, get_dat_index_version
+from rom_header import get_rom_header, describe_rom_header, save_header_cache
+from rom_tags import get_rom_tags, describe_rom_tags, rom_matches, rom_sort_key, split_tag_filters
+from title_search import sync_titles, search_titles, best_title_match
+from game_similarity import game_features, get_similarity_model, similar_games
+from soft_patch import (
+    find_patched_games, get_patched_game, build_patched_rom, mark_patched_session, record_session_patch_saves,
+    get_patch_cache_stats, game_source_files
+)
+from launch_timing import (
+    PHASES, start_launch_timer, mark_phase, finish_launch_timer, record_first_output, get_latency_histograms,
+    get_recent_launches, format_histogram, bucket_labels
+)
 
 # --- Third-Party Library Imports ---
 try:
@@ -192,6 +232,7 @@ CURRENT_GAME_MAP = {} # Maps display number (string) to game_path (string)
 LOCAL_GAMES = [] # List of game info dicts from GAMES_DIRECTORY
 CARTRIDGE_GAMES = {} # Maps drive letter/mount point (string) to a list of game info dicts
 LAST_SCAN_TIMES = {} # Stores last modification time for directories to optimize scans
+LIBRARY_VERSION = 0 # Bumped whenever a rescan changes the game lists, so derived models are rebuilt
 SCAN_INTERVAL_SECONDS = 30 # How often to scan for new/removed cartridges/games (in seconds)
 MIN_DRIVE_SIZE_MB = 100 # Minimum size for a drive to be considered for scanning (to avoid system partitions)
 
@@ -356,51 +397,170 @@ def get_directory_modification_times(path):
 
 # --- Game Discovery and Management Functions ---
 
-def find_emulator_for_game(game_path):
+def get_emulator_config(extension):
     """
-    Finds the best emulator configuration for a given game path.
-    Prioritizes specific emulator EXEs, then RetroArch with cores.
-    Returns (emulator_config, emulator_path, is_retroarch_launch).
+    Returns the emulator config for an extension.
+    Built-in EMULATOR_CONFIGS entries win; otherwise the first Config/Emulators profile
+    that declares the extension is used, so new emulators need no code changes.
+    """
+    extension = extension.lower()
+    if extension in EMULATOR_CONFIGS:
+        return EMULATOR_CONFIGS[extension]
+    candidates = get_emulator_candidates(extension)
+    if candidates:
+        return profile_to_config(candidates[0], extension)
+    return None
+
+def is_supported_extension(extension):
+    """Checks whether a built-in config or an emulator profile handles the extension."""
+    extension = extension.lower()
+    return extension in EMULATOR_CONFIGS or extension in get_profile_extensions()
+
+def extension_is_ambiguous(extension):
+    """Checks whether an extension leaves the system open, i.e. profiles emulate several systems with it."""
+    extension = extension.lower()
+    return extension not in EMULATOR_CONFIGS and len(get_extension_systems(extension)) != 1
+
+def find_emulator_chain(game_path):
+    """
+    Finds every available launcher for a game as an ordered fallback chain:
+    the specific emulator EXE, profile emulators, then RetroArch with the primary core
+    followed by the system's fallback cores.
+    Returns a list of (emulator_config, emulator_path, is_retroarch_launch).
     """
     game_path_obj = Path(game_path)
     game_extension = game_path_obj.suffix.lower()
-    config = EMULATOR_CONFIGS.get(game_extension)
+    config = get_emulator_config(game_extension)
 
     if not config:
         log_message("DEBUG", f"No emulator config found for extension: {game_extension}")
-        return None, None, False
+        return []
 
+    chain = []
     # Check for specific emulator EXE first
     if config.get('emulator_exe'):
         emulator_exe_path = EMULATORS_DIRECTORY / config['emulator_exe']
-        if emulator_exe_path.exists():
+        if emulator_exe_path.exists() and not is_emulator_runnable(emulator_exe_path):
+            log_message("DEBUG", f"Skipping {emulator_exe_path}: it cannot run on this machine")
+        elif emulator_exe_path.exists():
             log_message("DEBUG", f"Found specific emulator {emulator_exe_path} for {game_extension}")
-            return config, str(emulator_exe_path), False
-
-    # Check for RetroArch with specific core
-    if RETROARCH_PATH.exists() and config.get('retroarch_core'):
-        core_path = CORES_DIRECTORY / config['retroarch_core']
-        if core_path.exists():
-            log_message("DEBUG", f"Found RetroArch core {core_path} for {game_extension}")
-            # Create a RetroArch specific launch config
-            ra_config = config.copy()
-            # Ensure path is quoted correctly for subprocess
-            ra_config['launch_template'] = f'"{RETROARCH_PATH}" -L "{core_path}" "{game_path_obj}"'
-            ra_config['emulator_name'] = f"RetroArch ({Path(config['retroarch_core']).stem})"
-            return ra_config, str(RETROARCH_PATH), True
-    
+            chain.append((config, str(emulator_exe_path), False))
+
+    # Check the standalone emulators declared by Config/Emulators profiles
+    for profile in get_emulator_candidates(game_extension):
+        if profile['is_retroarch']:
+            continue
+        profile_exe_path = locate_profile_executable(profile, str(EMULATORS_DIRECTORY))
+        if profile_exe_path and is_emulator_runnable(profile_exe_path) and all(profile_exe_path != emulator_path for _, emulator_path, _ in chain):
+            log_message("DEBUG", f"Found profile emulator {profile_exe_path} ({profile['id']}) for {game_extension}")
+            chain.append((profile_to_config(profile, game_extension), profile_exe_path, False))
+
+    # Check for RetroArch with the primary core, then the fallback cores
+    if RETROARCH_PATH.exists() and is_emulator_runnable(RETROARCH_PATH) and config.get('retroarch_core'):
+        core_suffix = Path(config['retroarch_core']).suffix
+        core_names = [config['retroarch_core']] + [
+            core_name + core_suffix for core_name in RETROARCH_FALLBACK_CORES.get(config['system'], [])
+        ]
+        for core_name in core_names:
+            core_path = CORES_DIRECTORY / core_name
+            if core_path.exists() and is_core_usable(core_path):
+                log_message("DEBUG", f"Found RetroArch core {core_path} for {game_extension}")
+                # Create a RetroArch specific launch config
+                ra_config = config.copy()
+                # Paths are substituted per argv entry at launch-plan time, so no quoting is needed
+                ra_config['launch_template'] = '"{emulator_path}" -L "{core_path}" "{game_path}"'
+                ra_config['core_path'] = str(core_path)
+                ra_config['emulator_name'] = f"RetroArch ({Path(core_name).stem})"
+                chain.append((ra_config, str(RETROARCH_PATH), True))
+
     # For .exe games, the game path itself is the executable
     if game_extension == '.exe' and game_path_obj.exists():
         log_message("DEBUG", f"Treating .exe game as its own executable: {game_path_obj}")
-        return config, str(game_path_obj), False # The game path is the "emulator"
+        chain.append((config, str(game_path_obj), False)) # The game path is the "emulator"
 
-    log_message("DEBUG", f"No suitable launcher found for {game_path_obj.name} (ext: {game_extension})")
+    if not chain:
+        log_message("DEBUG", f"No suitable launcher found for {game_path_obj.name} (ext: {game_extension})")
+    return chain
+
+def find_emulator_for_game(game_path):
+    """
+    Finds the best emulator configuration for a given game path.
+    Prioritizes specific emulator EXEs, then RetroArch with cores.
+    Returns (emulator_config, emulator_path, is_retroarch_launch).
+    """
+    chain = find_emulator_chain(game_path)
+    if chain:
+        return chain[0]
     return None, None, False # No suitable emulator found
 
+def resolve_named_emulator(emulator_name):
+    """
+    Resolves an emulator named by a game profile (e.g. 'retroarch', 'snes9x') to an
+    executable path, using RETROARCH_PATH or the matching Config/Emulators profile.
+    Returns None if the emulator is not installed.
+    """
+    if emulator_name.lower() == 'retroarch':
+        return str(RETROARCH_PATH) if RETROARCH_PATH.exists() else None
+    profile = load_profile(emulator_name.lower())
+    if profile:
+        return locate_profile_executable(profile, str(EMULATORS_DIRECTORY))
+    emulator_path = EMULATORS_DIRECTORY / emulator_name
+    return str(emulator_path) if emulator_path.exists() else None
+
+def build_launch_chain(file_path, game_profile=None):
+    """
+    Compiles a launch plan for every launcher in a game's fallback chain.
+    A per-game JSON profile's launch_command comes first, then the emulator chain.
+    """
+    launch_chain = []
+    if game_profile:
+        emulator_path = resolve_named_emulator(game_profile['emulator'])
+        if emulator_path:
+            launch_chain.append(compile_profile_launch_plan(game_profile, file_path, emulator_path,
+                                                            cores_directory=CORES_DIRECTORY, cwd=str(PROJECT_ROOT)))
+
+    for emulator_config, emulator_path, is_retroarch in find_emulator_chain(file_path):
+        launch_chain.append(compile_launch_plan(file_path, emulator_path, emulator_config['launch_template'],
+                                                emulator_name=emulator_config['emulator_name'],
+                                                core_path=emulator_config.get('core_path')))
+    return launch_chain
+
+def build_launch_plan(file_path, game_profile=None):
+    """
+    Resolves the emulator and formats the launch command for a game once, at index time.
+    Picks the first emulator in the fallback chain that is not known to fail fast.
+    Returns a launch plan dict, or None if no launcher is available.
+    """
+    config = get_emulator_config(Path(file_path).suffix)
+    launch_plans, _ = select_launch_plans(build_launch_chain(file_path, game_profile),
+                                          config['system'] if config else None)
+    return launch_plans[0] if launch_plans else None
+
+def iter_launch_plans(game_path_obj, launch_plan, system):
+    """
+    Yields the launch plans to try for a game, in order: the plan compiled at index time
+    if its emulator is still present and healthy, then the rest of the fallback chain
+    (built only if that plan is unusable or fails to start).
+    """
+    if launch_plan and Path(launch_plan['emulator_path']).exists() and is_emulator_healthy(emulator_id(launch_plan), system):
+        yield launch_plan
+    else:
+        launch_plan = None
+
+    archive_path, _ = split_archive_path(game_path_obj)
+    game_profiles, _ = load_game_profiles(Path(archive_path).parent if archive_path else game_path_obj.parent)
+    launch_chain = build_launch_chain(game_path_obj, find_game_profile(game_path_obj, game_profiles))
+    launch_plans, skipped = select_launch_plans(launch_chain, system)
+    if skipped:
+        log_message("WARNING", f"Skipping emulators that keep failing for {game_path_obj.name}: {', '.join(skipped)}")
+    for fallback_plan in launch_plans:
+        if not launch_plan or fallback_plan['argv'] != launch_plan['argv']:
+            yield fallback_plan
+
 def discover_games_in_path(base_path):
     """
     Scans a given path for supported game ROMs.
-    Returns a list of dictionaries, each describing a game.
+    Returns a list of dictionaries, each describing a game, with a precompiled launch plan.
     """
     found_games = []
     if not base_path.is_dir():
@@ -409,24 +569,61 @@ def discover_games_in_path(base_path):
 
     try:
         for root, _, files in os.walk(base_path):
+            # Per-game JSON profiles are loaded in bulk once per directory
+            game_profiles, profile_errors = load_game_profiles(root)
+            for profile_file, errors in profile_errors.items():
+                log_message("WARNING", f"Invalid game profile {Path(root) / profile_file}: {'; '.join(errors)}")
+
+            rom_paths = []
             for filename in files:
-                file_path = Path(root) / filename
+                path = Path(root) / filename
+                # Archives are indexed from their directory without extracting anything;
+                # one without supported ROMs inside is listed itself if its extension is supported
+                archived_roms = [Path(rom_path) for rom_path in list_archived_roms(path, is_supported_extension)] if is_archive(path) else []
+                if archived_roms:
+                    rom_paths.extend(archived_roms)
+                elif is_supported_extension(path.suffix.lower()):
+                    rom_paths.append(path)
+            # IPS/BPS/UPS patches next to a ROM are listed as games of their own
+            rom_paths.extend(Path(game_path) for game_path in find_patched_games(root, files, is_supported_extension))
+
+            for file_path in rom_paths:
                 extension = file_path.suffix.lower()
-
-                if extension in EMULATOR_CONFIGS:
-                    emulator_config, emulator_path, is_retroarch = find_emulator_for_game(file_path)
-                    
-                    game_info = {
-                        'name': file_path.stem,
-                        'path': str(file_path),
-                        'extension': extension,
-                        'system': EMULATOR_CONFIGS[extension]['system'],
-                        'filename': filename,
-                        'launcher_found': bool(emulator_path),
-                        'auto_configured': True # All dynamically found games are auto-configured
-                    }
-                    found_games.append(game_info)
-                    log_message("DEBUG", f"Discovered game: {file_path.name} (Launcher found: {game_info['launcher_found']})")
+                game_profile = find_game_profile(file_path, game_profiles)
+                launch_plan = build_launch_plan(file_path, game_profile)
+                # A No-Intro/Redump DAT match names the dump exactly (until then, the filename does)
+                dat_entry = identify_rom(file_path)
+                default_name = dat_entry['title'] if dat_entry else file_path.stem
+                # The cartridge header knows the real system, e.g. a .gb file that is a Game Boy Color game;
+                # for extensions several systems use (.bin, .iso), the DAT match does
+                rom_header = get_rom_header(file_path)
+                if rom_header:
+                    system = rom_header['system']
+                elif dat_entry and extension_is_ambiguous(extension):
+                    system = dat_entry['system']
+                else:
+                    system = get_emulator_config(extension)['system']
+                # Region, language, revision and dump flags from GoodTools/No-Intro filename tags
+                rom_tags = get_rom_tags(file_path)
+                
+                game_info = {
+                    'name': game_profile.get('game_name', default_name) if game_profile else default_name,
+                    'path': str(file_path),
+                    'extension': extension,
+                    'system': system,
+                    'filename': file_path.name,
+                    'launcher_found': bool(launch_plan),
+                    'launch_plan': launch_plan,
+                    'region': dat_entry['region'] if dat_entry else ', '.join(rom_tags['regions']) or None,
+                    'dat_name': dat_entry['name'] if dat_entry else None,
+                    'tags': rom_tags,
+                    'genre': game_profile.get('genre') if game_profile else None,
+                    'keywords': game_profile.get('keywords', []) if game_profile else [],
+                    'header': rom_header,
+                    'auto_configured': game_profile is None # Games with a JSON profile are configured by hand
+                }
+                found_games.append(game_info)
+                log_message("DEBUG", f"Discovered game: {file_path.name} (Launcher found: {game_info['launcher_found']})")
         return found_games
     except Exception as e:
         log_message("ERROR", f"Error discovering games in {base_path}: {e}")
@@ -474,12 +671,18 @@ def detect_removable_drives():
             continue
     return list(set(removable_drives)) # Use set to remove duplicates if any
 
+def game_search_title(game):
+    """The title a game is found by: its DAT or profile name, else its filename without tags."""
+    if game['name'] != Path(game['path']).stem:
+        return game['name']
+    return get_rom_tags(game['path'])['title']
+
 def update_game_lists():
     """
     Scans for local and cartridge games and updates the global game maps.
     This function is thread-safe and optimized with modification times.
     """
-    global LOCAL_GAMES, CARTRIDGE_GAMES, CURRENT_GAME_MAP, LAST_SCAN_TIMES
+    global LOCAL_GAMES, CARTRIDGE_GAMES, CURRENT_GAME_MAP, LAST_SCAN_TIMES, LIBRARY_VERSION
 
     log_message("INFO", "Starting game list update.")
 
@@ -488,6 +691,8 @@ def update_game_lists():
     if 'local_games' not in LAST_SCAN_TIMES or local_mod_times != LAST_SCAN_TIMES.get('local_games'):
         new_local_games = discover_games_in_path(GAMES_DIRECTORY)
         log_message("INFO", f"Local games rescanned. Found {len(new_local_games)} games.")
+        # Each ROM is hashed once until it changes; new hashes may match DAT entries, so rescan then
+        hash_roms_in_background((game['path'] for game in new_local_games), on_complete=invalidate_launch_plans)
         LAST_SCAN_TIMES['local_games'] = local_mod_times
     else:
         new_local_games = LOCAL_GAMES # Use existing if no change detected
@@ -497,6 +702,7 @@ def update_game_lists():
     new_cartridge_games = {}
     detected_drives = detect_removable_drives()
     current_connected_drive_ids = {str(d) for d in detected_drives}
+    set_cartridge_roots(detected_drives) # Frequently played cartridge ROMs are copied locally
 
     # First, handle drives that are no longer connected
     removed_drives = set(CARTRIDGE_GAMES.keys()) - current_connected_drive_ids
@@ -516,6 +722,7 @@ def update_game_lists():
             print_formatted_text(HTML(f"<ansiyellow>Scanning cartridge: {drive_path}...</ansiyellow>"))
             new_cartridge_games[drive_id] = discover_games_in_path(drive_path)
             LAST_SCAN_TIMES[drive_id] = current_mod_times
+            hash_roms_in_background((game['path'] for game in new_cartridge_games[drive_id]), on_complete=invalidate_launch_plans)
         else:
             # If no change, retain previously scanned games for this drive if it's still connected
             if drive_id in CARTRIDGE_GAMES:
@@ -524,11 +731,21 @@ def update_game_lists():
             else: # Fallback for newly connected drives that didn't immediately trigger a full scan
                  new_cartridge_games[drive_id] = discover_games_in_path(drive_path)
                  LAST_SCAN_TIMES[drive_id] = current_mod_times
+                 hash_roms_in_background((game['path'] for game in new_cartridge_games[drive_id]), on_complete=invalidate_launch_plans)
                  log_message("INFO", f"New cartridge {drive_id} detected and scanned.")
 
+    save_header_cache() # Headers parsed during the scans are read from the cache next time
+
+    # Warm the likeliest games of a freshly inserted cartridge
+    for drive_id, games_on_drive in new_cartridge_games.items():
+        if drive_id not in CARTRIDGE_GAMES:
+            warm_likely_games(games_on_drive, replace=False)
 
     # Acquire lock before updating global state
     with SCAN_LOCK:
+        if new_local_games is not LOCAL_GAMES or any(new_cartridge_games.get(drive_id) is not CARTRIDGE_GAMES.get(drive_id)
+                                                      for drive_id in set(new_cartridge_games) | set(CARTRIDGE_GAMES)):
+            LIBRARY_VERSION += 1
         LOCAL_GAMES = new_local_games
         CARTRIDGE_GAMES = new_cartridge_games
 
@@ -549,9 +766,40 @@ def update_game_lists():
             for game in games_on_drive:
                 CURRENT_GAME_MAP[str(game_number)] = game['path']
                 game_number += 1
+    # Only added, renamed or removed games are re-indexed for 'find' and 'play <name>'
+    sync_titles({game['path']: game_search_title(game) for game in new_local_games + [game for games in new_cartridge_games.values() for game in games]})
     log_message("INFO", f"Game lists updated. Total games mapped: {len(CURRENT_GAME_MAP)}")
+    probe_game_emulators() # One-time check that the emulators can actually run here
     # print_formatted_text(HTML("<ansigreen>Game lists updated.</ansigreen>")) # For debugging
 
+def invalidate_launch_plans():
+    """
+    Forces the next scan to rediscover every game, recompiling launch plans and identifying ROMs
+    again (e.g. after emulator probes or background hashing finish, or a DAT is imported).
+    """
+    with SCAN_LOCK:
+        LAST_SCAN_TIMES.clear()
+
+def probe_game_emulators():
+    """
+    Queues a one-time capability probe for RetroArch and every emulator the games launch with.
+    Probes are cached by (path, size, mtime), so this is cheap once they ran; launch plans are
+    recompiled when a probe finds an emulator that cannot run here.
+    """
+    with SCAN_LOCK:
+        all_games = LOCAL_GAMES + [game for games in CARTRIDGE_GAMES.values() for game in games]
+    emulator_paths = {game['launch_plan']['emulator_path'] for game in all_games
+                      if game['launch_plan'] and game['launch_plan']['emulator_path'] != game['path']}
+    if RETROARCH_PATH.exists():
+        emulator_paths.add(str(RETROARCH_PATH))
+    probe_emulators_in_background(sorted(emulator_paths), CORES_DIRECTORY, on_complete=invalidate_launch_plans)
+
+def warm_likely_games(games, replace=True):
+    """Prefetches the games the launch history says are most likely to be played next."""
+    predicted = warm_predicted_games({game['path']: game.get('launch_plan') for game in games}, replace=replace)
+    if predicted:
+        log_message("INFO", f"Prefetching {len(predicted)} likely games: {', '.join(Path(p).name for p in predicted)}")
+
 def background_scan_thread():
     """Thread function to periodically scan for games."""
     log_message("INFO", "Background scan thread started.")
@@ -584,6 +832,19 @@ def stop_background_scan():
         SCAN_THREAD = None
         log_message("INFO", "Background scan thread stopped successfully.")
 
+def get_game_record(game_path):
+    """Returns the indexed game record for a path without probing emulators, or None."""
+    game_path = str(game_path)
+    with SCAN_LOCK:
+        for game in LOCAL_GAMES:
+            if game['path'] == game_path:
+                return game
+        for games_on_drive in CARTRIDGE_GAMES.values():
+            for game in games_on_drive:
+                if game['path'] == game_path:
+                    return game
+    return None
+
 def find_game_info_by_path(game_path):
     """Retrieves detailed game information by its path from the current game lists."""
     game_path_obj = Path(game_path)
@@ -733,7 +994,9 @@ def display_help():
     play_sound("menu_select") # Using the new sound key
     help_text = [
         ("list", "Display the list of local and cartridge games.", "Refreshes the game display."),
-        ("play &lt;number&gt;", "Launch a game by its number.", "Example: play 5"),
+        ("play &lt;number&gt;", "Launch a game by its number or name.", "Example: play 5 / play zelda"),
+        ("find &lt;title&gt;", "Search games by title; typos are forgiven. Filter with --region, --language, --good.", "Example: find mraio kart --region usa"),
+        ("similar &lt;game&gt;", "Recommend library games like this one (offline).", "Example: similar 3"),
         ("info &lt;number&gt;", "Show detailed information about a game.", "Example: info 12"),
         ("scan / cartridge / refresh", "Force an immediate scan for new/removed cartridge drives and games.", "Useful after inserting/removing a cartridge."),
         ("drives / cartridges", "List all currently detected cartridge drives and their status.", "Shows mount points and game counts."),
@@ -741,6 +1004,14 @@ def display_help():
         ("apikey", "Set or update your Google Gemini API key.", "Required for AI features."),
         ("settings", "Display current application settings and configuration.", "Shows paths, scan intervals, etc."),
         ("log", "Display the last few entries from the application log.", "Useful for debugging issues."),
+        ("ps", "List running and recently finished emulator sessions.", "Games run in the background."),
+        ("kill &lt;session&gt;", "Stop a running emulator session.", "Example: kill 2"),
+        ("logs &lt;session&gt;", "Show the captured emulator output of a session.", "Example: logs 2"),
+        ("history", "Show the most played games and the prefetch hit rate.", "Likely games are prefetched."),
+        ("health", "Show launch outcomes per emulator and system.", "Failing emulators are skipped."),
+        ("stats [game]", "Show CPU/memory/I/O per launch of a game (number or name).", "Example: stats 3 / stats"),
+        ("latency", "Show where launch time goes, phase by phase.", "Percentiles over recent launches."),
+        ("dat [file]", "Import a No-Intro/Redump DAT, or show what the DATs cover.", "Example: dat nes.dat"),
         ("clear / cls", "Clear the terminal screen.", "Clears the console output."),
         ("exit", "Exit the RetroFlow application.", "Safely shuts down the system."),
         ("help", "Display this help message.", "You are here!"),
@@ -777,6 +1048,19 @@ def display_settings():
         (f"Cartridge Drives Connected", len(CARTRIDGE_GAMES)),
         (f"Total Mapped Games", len(CURRENT_GAME_MAP)),
     ]
+    prefetch_stats = get_prefetch_stats()
+    settings.append(("Prefetch Warm Set", f"{prefetch_stats['warm_files']} files, {prefetch_stats['warm_bytes'] / (1024*1024):.1f} MB"))
+    settings.append(("Warm RetroArch Host", get_warm_host_status()))
+    archive_stats = get_archive_cache_stats()
+    settings.append(("Archive Extraction Cache", f"{archive_stats['entries']} ROMs, {archive_stats['bytes'] / (1024*1024):.1f}/{archive_stats['budget_bytes'] / (1024*1024):.0f} MB in {archive_stats['directory']}"))
+    patch_stats = get_patch_cache_stats()
+    settings.append(("Soft-Patched Games", f"{patch_stats['patched_games']} games, {patch_stats['entries']} images cached ({patch_stats['bytes'] / (1024*1024):.1f}/{patch_stats['budget_bytes'] / (1024*1024):.0f} MB)" if patch_stats['enabled'] else "Disabled"))
+    dat_stats = get_dat_index_stats()
+    settings.append(("DAT Index", f"{dat_stats['entries']} ROMs from {len(dat_stats['sources'])} DATs" if dat_stats['entries'] else "No DATs imported"))
+    hash_stats = get_hash_cache_stats()
+    settings.append(("ROM Content Hashes", f"{hash_stats['entries']} ROMs hashed" + (f", {hash_stats['pending']} queued" if hash_stats['pending'] else "")))
+    rom_stats = get_rom_cache_stats()
+    settings.append(("Cartridge ROM Cache", f"{rom_stats['entries']} ROMs, {rom_stats['bytes'] / (1024*1024):.1f}/{rom_stats['budget_bytes'] / (1024*1024):.0f} MB, {rom_stats['hits']} hits" if rom_stats['enabled'] else "Disabled"))
 
     print_formatted_text(HTML("<ansibrightgreen>Current Configuration:</ansibrightgreen>"))
     print_formatted_text(HTML("<ansibrightyellow>  Setting                           Value</ansibrightyellow>"))
@@ -843,43 +1127,397 @@ def launch_game_universal(game_path):
     Handles different operating systems.
     """
     game_path_obj = Path(game_path)
-    emulator_config, emulator_path, is_retroarch_launch = find_emulator_for_game(game_path_obj)
-
-    if not emulator_path:
+    timer = start_launch_timer(game_path_obj) # Per-phase timing for the 'latency' command
+
+    # Use the launch plan compiled at index time; the fallback chain is only built if the
+    # game was not indexed yet, or that plan's emulator disappeared, keeps failing fast
+    # or cannot be started.
+    game_record = get_game_record(game_path_obj)
+    config = get_emulator_config(game_path_obj.suffix)
+    system = game_record['system'] if game_record else (config['system'] if config else None)
+    mark_phase(timer, 'resolve')
+    launch_plans = iter_launch_plans(game_path_obj, game_record.get('launch_plan') if game_record else None, system)
+    launch_plan = next(launch_plans, None)
+    mark_phase(timer, 'build')
+
+    if not launch_plan:
         print_formatted_text(HTML(f"<ansired>Error: No suitable emulator found for '{html.escape(game_path_obj.name)}'.</ansired>"))
         play_sound("error") # Using the new sound key
         log_message("ERROR", f"No suitable emulator found for {game_path_obj.name}")
         return
 
-    command = ""
+    # Patched games are built from their ROM and patch (or reused from the patch cache), ROMs
+    # inside .zip/.7z archives are extracted into the archive cache (or reused from it), and
+    # cartridge ROMs launch from their local copy once one is cached
     try:
-        # Construct the command based on the launch template
-        template = emulator_config['launch_template']
-        command = template.format(emulator_path=emulator_path, game_path=str(game_path_obj))
-        
-        log_message("INFO", f"Attempting to launch game: {game_path_obj.name} with command: {command}")
-        print_formatted_text(HTML(f"Launching {emulator_config['emulator_name']}: {html.escape(game_path_obj.name)}"))
-        if platform.system() == "Windows":
-            subprocess.Popen(command, shell=True)
+        if get_patched_game(game_path_obj):
+            rom_path = build_patched_rom(game_path_obj)
         else:
-            subprocess.Popen(command, shell=True)
-        
-        play_sound("launch_game") # Using the new sound key for game launch
-        # Give the emulator a moment to launch before clearing
-        time.sleep(1)
-        clear_screen() # Clear after launching for a cleaner look
-        log_message("INFO", f"Successfully launched {game_path_obj.name}.")
-    except FileNotFoundError:
-        print_formatted_text(HTML(f"<ansired>Error: Launcher executable not found.</ansired>"))
-        print_formatted_text(HTML(f"<ansired>Please check if '{Path(emulator_path).name}' exists in '{EMULATORS_DIRECTORY}'.</ansired>"))
-        play_sound("error") # Using the new sound key
-        log_message("ERROR", f"Launcher not found for {game_path_obj.name}: {emulator_path}")
-    except Exception as e:
-        print_formatted_text(HTML(f"<ansired>Error launching game: {e}</ansired>"))
-        print_formatted_text(HTML(f"Command attempted: {html.escape(command)}"))
+            rom_path = local_rom_path(extract_rom(game_path_obj))
+    except (OSError, ValueError) as e:
+        print_formatted_text(HTML(f"<ansired>Error: {html.escape(str(e))}</ansired>"))
+        play_sound("error")
+        log_message("ERROR", f"Could not prepare the ROM of {game_path_obj.name}: {e}")
+        return
+    mark_phase(timer, 'extract')
+
+    # RetroArch games can be loaded into the idle warm host instead of a new process
+    if can_launch_warm(launch_plan):
+        session = launch_warm(localize_launch_plan(launch_plan, rom_path), game_name=game_path_obj.stem, system=system)
+        mark_phase(timer, 'warm_load')
+        if session:
+            session['game_path'] = str(game_path_obj)
+            mark_patched_session(session, rom_path)
+            apply_session_policy(session, system)
+            mark_launch(session)
+            mark_phase(timer, 'setup')
+            finish_launch_timer(timer, session)
+            play_sound("launch_game")
+            print_formatted_text(HTML(f"<ansibrightgreen>{html.escape(game_path_obj.name)} loaded into the warm RetroArch host (PID {session['pid']}).</ansibrightgreen>"))
+            log_message("INFO", f"Loaded {game_path_obj.name} into the warm host (PID {session['pid']}).")
+            return
+        log_message("WARNING", f"Warm host could not load {game_path_obj.name}; starting a new emulator process.")
 
-        play_sound("error") # Using the new sound key
-        log_message("ERROR", f"General error launching {game_path_obj.name}: {e} (Command: {command})")
+    while launch_plan:
+        emulator_path = launch_plan['emulator_path']
+        local_plan = localize_launch_plan(launch_plan, rom_path)
+        command = local_plan['command']
+        try:
+            log_message("INFO", f"Attempting to launch game: {game_path_obj.name} with command: {command}")
+            print_formatted_text(HTML(f"Launching {html.escape(launch_plan['emulator_name'])}: {html.escape(game_path_obj.name)}"))
+            # The supervisor runs the emulator in the background and reaps it when it exits
+            session = launch_session(local_plan['argv'], cwd=local_plan['cwd'], game_path=game_path_obj,
+                                     game_name=game_path_obj.stem, emulator_name=launch_plan['emulator_name'],
+                                     system=system)
+            mark_phase(timer, 'spawn')
+            # Pin the emulator per its system's launch policy and keep RetroFlow off its cores
+            policy_notes = apply_session_policy(session, system)
+            if policy_notes:
+                log_message("INFO", f"Launch policy for session {session['id']}: {', '.join(policy_notes)}")
+            mark_launch(session)
+            mark_session_health(session, launch_plan, system)
+            mark_patched_session(session, rom_path)
+            mark_phase(timer, 'setup')
+            
+            play_sound("launch_game") # Using the new sound key for game launch
+            # Give the emulator a moment to launch before clearing
+            time.sleep(1)
+            clear_screen() # Clear after launching for a cleaner look
+            mark_phase(timer, 'ui')
+            finish_launch_timer(timer, session)
+            print_formatted_text(HTML(f"<ansibrightgreen>{html.escape(game_path_obj.name)} is running as session {session['id']} (PID {session['pid']}). Use 'ps' to see running games.</ansibrightgreen>"))
+            log_message("INFO", f"Successfully launched {game_path_obj.name} (session {session['id']}, PID {session['pid']}).")
+            return
+        except OSError as e:
+            # Could not even start (missing or broken executable): record it and fall back
+            record_outcome(emulator_id(launch_plan), system, None, 0)
+            mark_phase(timer, 'spawn')
+            if isinstance(e, FileNotFoundError):
+                print_formatted_text(HTML(f"<ansired>Error: Launcher executable not found.</ansired>"))
+                print_formatted_text(HTML(f"<ansired>Please check if '{Path(emulator_path).name}' exists in '{EMULATORS_DIRECTORY}'.</ansired>"))
+                log_message("ERROR", f"Launcher not found for {game_path_obj.name}: {emulator_path}")
+            else:
+                print_formatted_text(HTML(f"<ansired>Error starting {html.escape(launch_plan['emulator_name'])}: {html.escape(str(e))}</ansired>"))
+                log_message("ERROR", f"Could not start {emulator_path} for {game_path_obj.name}: {e}")
+            launch_plan = next(launch_plans, None)
+            mark_phase(timer, 'build')
+            if launch_plan:
+                print_formatted_text(HTML(f"<ansiyellow>Falling back to {html.escape(launch_plan['emulator_name'])}...</ansiyellow>"))
+        except Exception as e:
+            print_formatted_text(HTML(f"<ansired>Error launching game: {e}</ansired>"))
+            print_formatted_text(HTML(f"Command attempted: {html.escape(command)}"))
+
+            play_sound("error") # Using the new sound key
+            log_message("ERROR", f"General error launching {game_path_obj.name}: {e} (Command: {command})")
+            return
+
+    play_sound("error") # Using the new sound key
+    log_message("ERROR", f"No emulator in the fallback chain could start {game_path_obj.name}")
+
+def format_duration(seconds):
+    """Formats a duration in seconds as H:MM:SS."""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+def report_exited_sessions():
+    """Prints a notice for every emulator session that exited since the last prompt."""
+    for session in collect_exited_sessions():
+        color = "ansigreen" if session['returncode'] == 0 else "ansired"
+        print_formatted_text(HTML(f"<{color}>Session {session['id']} ({html.escape(session['game_name'])}) {html.escape(session['status'])} after {format_duration(session_runtime(session))}.</{color}>"))
+        log_message("INFO", f"Session {session['id']} ({session['game_name']}) {session['status']} after {session_runtime(session):.1f}s.")
+
+def display_sessions():
+    """Displays running and recently finished emulator sessions."""
+    display_header("Emulator Sessions")
+    play_sound("menu_select")
+    sessions = list_sessions()
+    if not sessions:
+        print_formatted_text(HTML("<ansiyellow>No emulator sessions. Launch a game with 'play &lt;number&gt;'.</ansiyellow>"))
+        return
+
+    print_formatted_text(HTML("<ansibrightyellow>  ID   PID      Game                           Emulator           Runtime   Status</ansibrightyellow>"))
+    print_formatted_text(HTML("<ansibrightyellow>  ---- -------- ------------------------------ ------------------ --------- ------------</ansibrightyellow>"))
+    for session in sessions:
+        status_color = "ansigreen" if session['ended_at'] is None else ("ansicyan" if session['returncode'] == 0 else "ansired")
+        print_formatted_text(HTML(f"  <ansibrightcyan>{session['id']:<4}</ansibrightcyan> {session['pid']:<8} <ansiblue>{html.escape(session['game_name'][:30]):<30}</ansiblue> <ansimagenta>{html.escape(session['emulator_name'][:18]):<18}</ansimagenta> {format_duration(session_runtime(session)):>9} <{status_color}>{html.escape(session['status'])}</{status_color}>"))
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", "Session list displayed.")
+
+def kill_session_command(session_id):
+    """Stops a running emulator session."""
+    session = get_session(session_id)
+    if not session:
+        print_formatted_text(HTML(f"<ansired>Error: No session '{html.escape(session_id)}'. Use 'ps' to see sessions.</ansired>"))
+        play_sound("error")
+        return
+    if terminate_session(session['id']):
+        print_formatted_text(HTML(f"<ansibrightgreen>Stopped session {session['id']} ({html.escape(session['game_name'])}).</ansibrightgreen>"))
+        play_sound("menu_select")
+        log_message("INFO", f"Session {session['id']} ({session['game_name']}) stopped by user.")
+    else:
+        print_formatted_text(HTML(f"<ansiyellow>Session {session['id']} is not running.</ansiyellow>"))
+
+def display_session_output(session_id, num_lines=20):
+    """Displays the captured stdout/stderr tail of an emulator session."""
+    session = get_session(session_id)
+    if not session:
+        print_formatted_text(HTML(f"<ansired>Error: No session '{html.escape(session_id)}'. Use 'ps' to see sessions.</ansired>"))
+        play_sound("error")
+        return
+    display_header(f"Session {session['id']} Output")
+    stdout_lines, stderr_lines = session_output(session, num_lines)
+    for title, lines, color in (("stdout", stdout_lines, "ansiwhite"), ("stderr", stderr_lines, "ansired")):
+        print_formatted_text(HTML(f"<ansibrightyellow>  --- {title} (last {len(lines)} lines) ---</ansibrightyellow>"))
+        for line in lines:
+            print_formatted_text(HTML(f"  <{color}>{html.escape(line)}</{color}>"))
+    print_formatted_text(HTML("═" * 80))
+
+def display_history(num_games=10):
+    """Displays the most likely next games from the launch history and the prefetch hit rate."""
+    display_header("Launch History")
+    play_sound("menu_select")
+    with SCAN_LOCK:
+        known_paths = set(CURRENT_GAME_MAP.values())
+    predictions = predict_games(known_paths, num_games)
+    if not predictions:
+        print_formatted_text(HTML("<ansiyellow>No launches recorded yet. Play something!</ansiyellow>"))
+    else:
+        print_formatted_text(HTML("<ansibrightyellow>  Game                                       Launches  Played     Score</ansibrightyellow>"))
+        print_formatted_text(HTML("<ansibrightyellow>  ------------------------------------------ --------- ---------- ------</ansibrightyellow>"))
+        for game_path, score in predictions:
+            stats = get_game_history(game_path)
+            print_formatted_text(HTML(f"  <ansiblue>{html.escape(Path(game_path).stem[:42]):<42}</ansiblue> {stats['launches']:<9} {format_duration(stats['total_duration']):<10} <ansibrightcyan>{score:.2f}</ansibrightcyan>"))
+
+    hits, misses, rate = get_hit_rate()
+    rate_text = f"{rate * 100:.0f}% ({hits} of {hits + misses} launches were prefetched)" if rate is not None else "No predicted launches yet"
+    print_formatted_text(HTML(f"\n<ansibrightgreen>Prefetch Hit Rate:</ansibrightgreen> <ansicyan>{rate_text}</ansicyan>"))
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", "Launch history displayed.")
+
+def resolve_game_argument(game_arg):
+    """Resolves a game number or part of a game's name to its path, or None."""
+    with SCAN_LOCK:
+        game_path = CURRENT_GAME_MAP.get(game_arg)
+        if game_path:
+            return game_path
+        for number in sorted(CURRENT_GAME_MAP, key=int):
+            if game_arg.lower() in Path(CURRENT_GAME_MAP[number]).stem.lower():
+                return CURRENT_GAME_MAP[number]
+    return None
+
+def display_title_matches(matches):
+    """Prints search matches with their game numbers, for 'find' and an ambiguous 'play <name>'."""
+    with SCAN_LOCK:
+        game_numbers = {game_path: number for number, game_path in CURRENT_GAME_MAP.items()}
+        games_by_path = {game['path']: game for game in LOCAL_GAMES + [game for games in CARTRIDGE_GAMES.values() for game in games]}
+    print_formatted_text(HTML("<ansibrightyellow>  #   Game Title                                 System             Match</ansibrightyellow>"))
+    print_formatted_text(HTML("<ansibrightyellow>  --- ------------------------------------------ ------------------ -----</ansibrightyellow>"))
+    for game_path, title, score in matches:
+        game = games_by_path.get(game_path)
+        name = game['name'] if game else title
+        system = game['system'] if game else "Unknown"
+        print_formatted_text(HTML(f"  <ansibrightcyan>{game_numbers.get(game_path, '?'):<3}</ansibrightcyan> <ansiblue>{html.escape(f'{name[:42]:<42}')}</ansiblue> <ansimagenta>{html.escape(f'{system[:18]:<18}')}</ansimagenta> {min(score, 1.0):>5.0%}"))
+
+def display_find_results(query):
+    """
+    Searches the library by approximate title, e.g. 'find zelda links awakening', optionally
+    filtered with --region, --language and --good. Equally good matches list the preferred dump first.
+    """
+    try:
+        query, filters = split_tag_filters(query)
+    except ValueError as e:
+        print_formatted_text(HTML(f"<ansired>Error: {html.escape(str(e))}. Usage: find &lt;title&gt; [--region name] [--language code] [--good]</ansired>"))
+        play_sound("error")
+        return
+    tag_filter = None
+    if filters['region'] or filters['language'] or filters['good_only']:
+        tag_filter = lambda game_path: rom_matches(get_rom_tags(game_path), **filters)
+    matches = sorted(search_titles(query, match=tag_filter), key=lambda match: (-match[2], rom_sort_key(match[0])))
+    if not matches:
+        print_formatted_text(HTML(f"<ansired>Error: No games match '{html.escape(query)}'.</ansired>"))
+        play_sound("error")
+        log_message("INFO", f"Search found nothing: {query}")
+        return
+    display_header(f"Search: {query}")
+    play_sound("menu_select")
+    display_title_matches(matches)
+    print_formatted_text(HTML("<ansicyan>Use 'play &lt;number&gt;' or 'play &lt;name&gt;' to launch one.</ansicyan>"))
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", f"Search for '{query}' found {len(matches)} games")
+
+def library_features():
+    """TF-IDF features of every local and cartridge game, for 'similar'."""
+    with SCAN_LOCK:
+        games = LOCAL_GAMES + [game for games_on_drive in CARTRIDGE_GAMES.values() for game in games_on_drive]
+    features = {}
+    for game in games:
+        rom_tags = game.get('tags') or {}
+        features[game['path']] = game_features(game_search_title(game), game['system'], game.get('genre'),
+                                               game.get('keywords'), rom_tags.get('regions', []) + rom_tags.get('flags', []))
+    return features
+
+def display_similar_games(game_arg):
+    """Recommends games from the library that resemble one given by number or name."""
+    with SCAN_LOCK:
+        game_path = CURRENT_GAME_MAP.get(game_arg)
+        library_version = LIBRARY_VERSION
+    if not game_path:
+        game_path, matches = best_title_match(game_arg)
+        if not game_path:
+            if matches:
+                print_formatted_text(HTML(f"<ansiyellow>'{html.escape(game_arg)}' matches several games; pick one by number:</ansiyellow>"))
+                display_title_matches(matches)
+            else:
+                print_formatted_text(HTML(f"<ansired>Error: No game matches '{html.escape(game_arg)}'.</ansired>"))
+                play_sound("error")
+            return
+
+    # Rebuilt only when a rescan changed the games, or new hashes/DATs may have renamed them
+    model = get_similarity_model((library_version, get_hash_cache_version(), get_dat_index_version()), library_features)
+    recommendations = similar_games(model, game_path)
+    display_header(f"Games Like {Path(game_path).stem}")
+    play_sound("menu_select")
+    if not recommendations:
+        print_formatted_text(HTML("<ansiyellow>Nothing in your library resembles this game yet.</ansiyellow>"))
+    else:
+        display_title_matches([(path, Path(path).stem, score) for path, score in recommendations])
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", f"Recommended {len(recommendations)} games like {game_path}")
+
+def display_game_stats(game_arg=""):
+    """Displays resource usage per launch of a game, or the heaviest emulators overall."""
+    if not game_arg:
+        display_header("Emulator Resource Usage")
+        play_sound("menu_select")
+        groups = aggregate_by_emulator(load_session_stats())
+        if not groups:
+            print_formatted_text(HTML("<ansiyellow>No sessions recorded yet. Stats are collected while games run.</ansiyellow>"))
+            return
+        print_formatted_text(HTML("<ansibrightyellow>  System             Emulator                       Sessions  CPU p95   RSS max  Threads</ansibrightyellow>"))
+        print_formatted_text(HTML("<ansibrightyellow>  ------------------ ------------------------------ -------- -------- --------- -------</ansibrightyellow>"))
+        # Heaviest first, so systems and cores that are too much for the hardware stand out
+        for (system, emulator_name), group in sorted(groups.items(), key=lambda item: item[1]['cpu_p95'], reverse=True):
+            print_formatted_text(HTML(f"  <ansimagenta>{html.escape(system[:18]):<18}</ansimagenta> <ansibrightcyan>{html.escape(emulator_name[:30]):<30}</ansibrightcyan> {group['sessions']:>8} {group['cpu_p95']:>7.0f}% {group['rss_max_mb']:>6.0f} MB {group['threads_max']:>7.0f}"))
+        print_formatted_text(HTML("═" * 80))
+        return
+
+    game_path = resolve_game_argument(game_arg)
+    if not game_path:
+        print_formatted_text(HTML(f"<ansired>Error: No game matches '{html.escape(game_arg)}'.</ansired>"))
+        play_sound("error")
+        return
+    display_header(f"Stats: {Path(game_path).name}")
+    play_sound("menu_select")
+    summaries = load_session_stats(game_path)[-10:]
+    if not summaries:
+        print_formatted_text(HTML("<ansiyellow>No sessions recorded for this game yet.</ansiyellow>"))
+        return
+    print_formatted_text(HTML("<ansibrightyellow>  Started          Emulator             Runtime  CPU p50/p95/max    RSS p95/max MB  Thr  I/O MB</ansibrightyellow>"))
+    print_formatted_text(HTML("<ansibrightyellow>  ---------------- -------------------- -------- ------------------ --------------- ---- ------</ansibrightyellow>"))
+    for summary in reversed(summaries):
+        started = datetime.fromtimestamp(summary['started_at']).strftime('%Y-%m-%d %H:%M')
+        cpu = summary['cpu_percent']
+        rss = summary['rss_mb']
+        cpu_text = f"{cpu['p50']:.0f}/{cpu['p95']:.0f}/{cpu['max']:.0f}%"
+        rss_text = f"{rss['p95']:.0f}/{rss['max']:.0f}"
+        io_text = f"{summary['io_read_mb'] + summary['io_write_mb']:.0f}"
+        print_formatted_text(HTML(f"  <ansicyan>{started}</ansicyan> <ansibrightcyan>{html.escape((summary['emulator_name'] or '')[:20]):<20}</ansibrightcyan> {format_duration(summary['duration']):>8} {cpu_text:>18} {rss_text:>15} {summary['threads']['max']:>4.0f} {io_text:>6}"))
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", f"Displayed stats for {Path(game_path).name}")
+
+def display_launch_latency():
+    """Displays per-phase launch timing percentiles and histograms over recent launches."""
+    display_header("Launch Latency")
+    play_sound("menu_select")
+    histograms = get_latency_histograms()
+    if not histograms:
+        print_formatted_text(HTML("<ansiyellow>No launches timed yet. Launch a game with 'play &lt;number&gt;'.</ansiyellow>"))
+        return
+
+    print_formatted_text(HTML("<ansibrightyellow>  Phase          Count   p50 ms   p95 ms   max ms  Histogram</ansibrightyellow>"))
+    print_formatted_text(HTML("<ansibrightyellow>  ------------- ------ -------- -------- --------  ------------</ansibrightyellow>"))
+    for phase, histogram in histograms.items():
+        print_formatted_text(HTML(f"  <ansibrightcyan>{phase:<13}</ansibrightcyan> {histogram['count']:>6} {histogram['p50']:>8.1f} {histogram['p95']:>8.1f} {histogram['max']:>8.1f}  <ansigreen>[{html.escape(format_histogram(histogram['buckets']))}]</ansigreen>"))
+    print_formatted_text(HTML(f"<ansicyan>  Histogram buckets: {html.escape(' '.join(bucket_labels()))}</ansicyan>"))
+
+    print_formatted_text(HTML("\n<ansibrightyellow>  Recent launches (ms):</ansibrightyellow>"))
+    for launch in get_recent_launches(5):
+        phases = " ".join(f"{phase}={launch[phase]:.0f}" for phase in PHASES if phase in launch)
+        print_formatted_text(HTML(f"  <ansiblue>{html.escape((launch.get('game') or '?')[:24]):<24}</ansiblue> {launch['total']:>7.0f}  <ansicyan>{html.escape(phases)}</ansicyan>"))
+    print_formatted_text(HTML("<ansibrightwhite>Note: first_output counts from the spawn and overlaps setup/ui; total is RetroFlow's own time.</ansibrightwhite>"))
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", "Launch latency displayed.")
+
+def dat_command(dat_path):
+    """Imports a No-Intro/Redump DAT file and rescans, or shows what the DAT index covers."""
+    if dat_path:
+        try:
+            entries, errors = import_dat_file(dat_path.strip('"'))
+        except (OSError, ValueError) as e:
+            print_formatted_text(HTML(f"<ansired>Could not import {html.escape(dat_path)}: {html.escape(str(e))}</ansired>"))
+            play_sound("error")
+            log_message("WARNING", f"DAT import of {dat_path} failed: {e}")
+            return
+        for filename, error in errors.items():
+            print_formatted_text(HTML(f"<ansiyellow>Skipped {html.escape(filename)}: {html.escape(error)}</ansiyellow>"))
+        print_formatted_text(HTML(f"<ansibrightgreen>DAT imported. The index now identifies {entries} ROMs.</ansibrightgreen>"))
+        log_message("INFO", f"Imported DAT {dat_path}; {entries} ROMs indexed.")
+        invalidate_launch_plans() # Games are renamed from the DATs on the next scan
+        update_game_lists()
+        play_sound("menu_select")
+        return
+
+    display_header("DAT Index")
+    play_sound("menu_select")
+    stats = get_dat_index_stats()
+    if not stats['entries']:
+        print_formatted_text(HTML("<ansiyellow>No DATs imported. Use 'dat &lt;file&gt;' with a No-Intro or Redump DAT.</ansiyellow>"))
+        return
+    print_formatted_text(HTML(f"<ansibrightgreen>{stats['entries']} ROMs indexed from {len(stats['sources'])} DAT files:</ansibrightgreen>"))
+    for source in stats['sources']:
+        print_formatted_text(HTML(f"  <ansicyan>{html.escape(source)}</ansicyan>"))
+    print_formatted_text(HTML(f"<ansibrightyellow>Systems:</ansibrightyellow> <ansicyan>{html.escape(', '.join(stats['systems']))}</ansicyan>"))
+    print_formatted_text(HTML("═" * 80))
+
+def display_emulator_health():
+    """Displays the recorded launch outcomes per emulator and system."""
+    display_header("Emulator Health")
+    play_sound("menu_select")
+    records = get_health_records()
+    if not records:
+        print_formatted_text(HTML("<ansiyellow>No launches recorded yet.</ansiyellow>"))
+        return
+
+    print_formatted_text(HTML("<ansibrightyellow>  Emulator                          System             Launches Failures Last Exit  Status</ansibrightyellow>"))
+    print_formatted_text(HTML("<ansibrightyellow>  --------------------------------- ------------------ -------- -------- ---------- --------</ansibrightyellow>"))
+    for key, record in sorted(records.items()):
+        emulator, _, system = key.rpartition('@')
+        healthy = is_emulator_healthy(emulator, system)
+        last_exit = "no start" if record['last_returncode'] is None else str(record['last_returncode'])
+        status = "<ansigreen>OK</ansigreen>" if healthy else "<ansired>SKIPPED</ansired>"
+        print_formatted_text(HTML(f"  <ansibrightcyan>{html.escape(emulator[:33]):<33}</ansibrightcyan> <ansimagenta>{html.escape(system[:18]):<18}</ansimagenta> {record['launches']:>8} {record['failures']:>8} {last_exit:>10} {status}"))
+    print_formatted_text(HTML("═" * 80))
+    log_message("INFO", "Emulator health displayed.")
 
 def set_api_key_command():
     """Allows the user to set or update the Gemini API key."""
@@ -957,7 +1595,8 @@ def create_command_completer():
     """Creates a completer for prompt_toolkit commands."""
     commands = [
         "list", "play", "info", "scan", "cartridge", "drives", "cartridges",
-        "ai", "apikey", "clear", "cls", "exit", "help", "settings", "refresh", "log"
+        "ai", "apikey", "clear", "cls", "exit", "help", "settings", "refresh", "log",
+        "ps", "kill", "logs", "history", "health", "stats", "latency", "dat", "find", "similar"
     ]
     # Add game numbers dynamically to completer for 'play' and 'info'
     # This might make the completer slow with thousands of games, but okay for moderate numbers.
@@ -980,8 +1619,24 @@ def main():
 
     display_intro_splash() # Show the fancy intro
 
+    # Restore RetroFlow's CPU affinity once the last emulator exits, and record the launch
+    add_exit_callback(release_session_policy)
+    add_exit_callback(record_session_history)
+    add_exit_callback(record_session_rom_cache) # After the history, so the launch counts
+    add_exit_callback(record_session_patch_saves)
+    add_exit_callback(record_session_health)
+    add_exit_callback(record_session_telemetry)
+    add_first_output_callback(record_first_output) # Time to the emulator's first output, for 'latency'
+    set_source_resolver(game_source_files) # Archived, patched and cached games are warmed from their real files
+    start_telemetry() # Sample running emulators for the 'stats' command
+
     # Initial scan before starting the main loop
     update_game_lists()
+    with SCAN_LOCK:
+        all_games = LOCAL_GAMES + [game for games in CARTRIDGE_GAMES.values() for game in games]
+    warm_likely_games(all_games)
+    # Pre-spawn the idle RetroArch host if warm host mode is enabled in Config/warm_host.json
+    prestart_warm_host(str(RETROARCH_PATH) if RETROARCH_PATH.exists() else None)
     start_background_scan() # Start the background scanning thread
 
     # Define prompt_toolkit styles
@@ -1019,8 +1674,9 @@ def main():
         while True:
             # Re-create completer in loop to update game numbers dynamically
             session.completer = create_command_completer() 
+            report_exited_sessions()
             try:
-                command_line = session.prompt(HTML("\n<prompt>C:\\RETROFLOW> </prompt>")).strip().lower()
+                command_line = session.prompt(HTML("\n<prompt>C:\\RETROFLOW> </prompt>")).strip()
             except EOFError: # Ctrl+D to exit
                 print_formatted_text(HTML("\n<ansibrightcyan>Ctrl+D detected. Exiting...</ansibrightcyan>"))
                 break
@@ -1034,8 +1690,8 @@ def main():
             # Robust command parsing using regex
             import re # Ensure re is imported for regex operations
             parts = re.split(r'\s+', command_line, 1) # Split only on first space
-            command = parts[0]
-            args = parts[1] if len(parts) > 1 else ""
+            command = parts[0].lower()
+            args = parts[1] if len(parts) > 1 else "" # Original case: file paths and names are case-sensitive
 
             if command == 'exit':
                 print_formatted_text(HTML("<ansibrightcyan>Goodbye! Thanks for using Dynamic RetroFlow!</ansibbrightcyan>"))
@@ -1055,6 +1711,13 @@ def main():
                     game_num_str = args
                     with SCAN_LOCK: # Acquire lock to read game lists
                         game_path = CURRENT_GAME_MAP.get(game_num_str)
+                    if not game_path and not game_num_str.isdigit():
+                        # A name rather than a number: launch the game it names, typos and all
+                        game_path, matches = best_title_match(game_num_str)
+                        if not game_path and matches:
+                            print_formatted_text(HTML(f"<ansiyellow>'{html.escape(game_num_str)}' matches several games; pick one by number:</ansiyellow>"))
+                            display_title_matches(matches)
+                            continue
                     
                     if game_path:
                         running_game_name = Path(game_path).name
@@ -1066,7 +1729,7 @@ def main():
                         play_sound("error") # Using the new sound key
                         log_message("WARNING", f"Invalid game number entered for play: {game_num_str}")
                 else:
-                    print_formatted_text(HTML("<ansired>Usage: play &lt;game_number&gt;</ansired>"))
+                    print_formatted_text(HTML("<ansired>Usage: play &lt;game_number or name&gt;</ansired>"))
                     play_sound("error") # Using the new sound key
                     log_message("WARNING", "Play command used without arguments.")
             elif command == 'info':
@@ -1078,6 +1741,8 @@ def main():
                     if game_path:
                         game_info = find_game_info_by_path(game_path)
                         if game_info:
+                            # The user is likely to play this next: warm its ROM, emulator and core
+                            prefetch_launch_plan(game_info.get('launch_plan'))
                             display_header("Game Information")
                             play_sound("menu_select") # Using the new sound key
                             info_lines = [
@@ -1088,6 +1753,9 @@ def main():
                                 f"║ <ansibrightgreen>Path:</ansibrightgreen>           {html.escape(game_info['path'])[:59]:<59} ║", # Truncate long paths
                                 f"║ <ansibrightgreen>Extension:</ansibrightgreen>      {game_info['extension'][:59]:<59} ║",
                                 f"║ <ansibrightgreen>Filename:</ansibrightgreen>       {game_info['filename'][:59]:<59} ║",
+                                f"║ <ansibrightgreen>Tags:</ansibrightgreen>           {html.escape(describe_rom_tags(game_info.get('tags') or {})[:59]):<59} ║",
+                                f"║ <ansibrightgreen>Header:</ansibrightgreen>         {html.escape(describe_rom_header(game_info.get('header'))[:59]):<59} ║",
+                                f"║ <ansibrightgreen>DAT Match:</ansibrightgreen>      {html.escape((game_info.get('dat_name') or 'Not identified')[:59]):<59} ║",
                                 f"║ <ansibrightgreen>Launcher Found:</ansibrightgreen> {'Yes' if game_info['launcher_found'] else 'No':<59} ║",
                                 f"║ <ansibrightgreen>Emulator Used:</ansibrightgreen>  {game_info['emulator_used'][:59]:<59} ║",
                                 f"║ <ansibrightgreen>Is RetroArch:</ansibrightgreen>   {'Yes' if game_info['is_retroarch'] else 'No':<59} ║",
@@ -1158,6 +1826,42 @@ def main():
                 display_settings()
             elif command == 'log':
                 display_log()
+            elif command == 'history':
+                display_history()
+            elif command == 'health':
+                display_emulator_health()
+            elif command == 'find':
+                if args:
+                    display_find_results(args)
+                else:
+                    print_formatted_text(HTML("<ansired>Usage: find &lt;title&gt;</ansired>"))
+                    play_sound("error")
+            elif command == 'similar':
+                if args:
+                    display_similar_games(args)
+                else:
+                    print_formatted_text(HTML("<ansired>Usage: similar &lt;game_number or name&gt;</ansired>"))
+                    play_sound("error")
+            elif command == 'stats':
+                display_game_stats(args)
+            elif command == 'latency':
+                display_launch_latency()
+            elif command == 'dat':
+                dat_command(args)
+            elif command == 'ps':
+                display_sessions()
+            elif command == 'kill':
+                if args:
+                    kill_session_command(args)
+                else:
+                    print_formatted_text(HTML("<ansired>Usage: kill &lt;session_id&gt;</ansired>"))
+                    play_sound("error")
+            elif command == 'logs':
+                if args:
+                    display_session_output(args)
+                else:
+                    print_formatted_text(HTML("<ansired>Usage: logs &lt;session_id&gt;</ansired>"))
+                    play_sound("error")
             else:
                 print_formatted_text(HTML(f"<ansired>Unknown command: '{command}'. Type 'help' for available commands.</ansired>"))
                 play_sound("error") # Using the new sound key
@@ -1175,6 +1879,8 @@ def main():
         log_message("CRITICAL", f"Fatal unhandled exception: {traceback.format_exc()}")
     finally:
         stop_background_scan() # Ensure background thread is stopped on exit
+        stop_warm_host() # Don't leave the idle RetroArch host running
+        save_header_cache()
         try:
             mixer.quit() # Quit pygame mixer
             log_message("INFO", "Pygame mixer quit.")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Prefetch
+Warms the page cache with a game's ROM, emulator executable and RetroArch core in the
+background, so launching from slow cartridge/USB media does not start cold
+"""
+
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import psutil
+
+PREFETCH_BUDGET_BYTES = 256 * 1024 * 1024  # Most bytes kept warm at once
+MIN_FREE_MEMORY_BYTES = 128 * 1024 * 1024  # Never prefetch into the last bit of free RAM
+READ_CHUNK_BYTES = 1024 * 1024
+MAX_BUNDLE_FILES = 64  # Files warmed from inside a directory (e.g. a macOS .app bundle)
+
+PREFETCH_QUEUE = queue.Queue()
+WARM_FILES = OrderedDict()  # path -> (size, mtime), least recently warmed first
+PREFETCH_STATS = {'requests': 0, 'files_warmed': 0, 'bytes_warmed': 0, 'skipped': 0, 'evicted': 0}
+PREFETCH_LOCK = threading.Lock()
+PREFETCH_THREAD = None
+SOURCE_RESOLVER = None  # game path -> files the game is read from (see set_source_resolver)
+
+def _warm_bytes():
+    """Total bytes currently tracked as warm (lock held)"""
+    return sum(size for size, _ in WARM_FILES.values())
+
+def _advise(path, advice):
+    """Apply posix_fadvise to a whole file; returns False where unsupported"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    finally:
+        os.close(fd)
+    return True
+
+def _read_through(path):
+    """Populate the cache by reading the file sequentially (no fadvise on this platform)"""
+    with open(path, 'rb', buffering=0) as f:
+        while f.read(READ_CHUNK_BYTES):
+            pass
+
+def _count(key, amount=1):
+    """Increment a prefetch counter"""
+    with PREFETCH_LOCK:
+        PREFETCH_STATS[key] += amount
+
+def _evict_until_fits(size):
+    """Drop the least recently warmed files until size fits the budget (lock held)"""
+    while WARM_FILES and _warm_bytes() + size > PREFETCH_BUDGET_BYTES:
+        path, _ = WARM_FILES.popitem(last=False)
+        PREFETCH_STATS['evicted'] += 1
+        try:
+            if hasattr(os, 'POSIX_FADV_DONTNEED'):
+                _advise(path, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+def warm_file(path):
+    """Bring one file into the page cache, respecting the budget. Returns bytes warmed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 0
+
+    with PREFETCH_LOCK:
+        if WARM_FILES.get(path) == (stat.st_size, stat.st_mtime):
+            WARM_FILES.move_to_end(path)
+            return 0
+        too_large = stat.st_size > PREFETCH_BUDGET_BYTES
+    if too_large:
+        _count('skipped')
+        return 0
+
+    try:
+        if psutil.virtual_memory().available - stat.st_size < MIN_FREE_MEMORY_BYTES:
+            _count('skipped')
+            return 0
+    except Exception:
+        pass
+
+    with PREFETCH_LOCK:
+        _evict_until_fits(stat.st_size)
+
+    try:
+        if not _advise(path, getattr(os, 'POSIX_FADV_WILLNEED', 0)):
+            _read_through(path)
+    except OSError:
+        _count('skipped')
+        return 0
+
+    with PREFETCH_LOCK:
+        WARM_FILES[path] = (stat.st_size, stat.st_mtime)
+        PREFETCH_STATS['files_warmed'] += 1
+        PREFETCH_STATS['bytes_warmed'] += stat.st_size
+    return stat.st_size
+
+def warm_path(path):
+    """Warm a file, or the largest files inside a directory such as an .app bundle"""
+    if os.path.isdir(path):
+        files = []
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                try:
+                    files.append((os.path.getsize(file_path), file_path))
+                except OSError:
+                    pass
+        return sum(warm_file(file_path) for _, file_path in sorted(files, reverse=True)[:MAX_BUNDLE_FILES])
+    return warm_file(path)
+
+def _prefetch_worker():
+    """Background thread: warm queued paths one at a time"""
+    while True:
+        path = PREFETCH_QUEUE.get()
+        try:
+            warm_path(path)
+        except Exception:
+            pass
+        finally:
+            PREFETCH_QUEUE.task_done()
+
+def _ensure_worker():
+    """Start the prefetch thread on first use"""
+    global PREFETCH_THREAD
+    with PREFETCH_LOCK:
+        if PREFETCH_THREAD is None or not PREFETCH_THREAD.is_alive():
+            PREFETCH_THREAD = threading.Thread(target=_prefetch_worker, daemon=True)
+            PREFETCH_THREAD.start()
+
+def prefetch_paths(*paths):
+    """Queue files for background warming; None entries are ignored"""
+    paths = [str(path) for path in paths if path]
+    if not paths:
+        return
+    _ensure_worker()
+    _count('requests')
+    for path in paths:
+        PREFETCH_QUEUE.put(path)
+
+def set_source_resolver(resolver):
+    """
+    Register resolver(game path) -> list of files, for game paths that are not files of their
+    own (archive members, soft-patched games) or that launch from a local copy
+    """
+    global SOURCE_RESOLVER
+    SOURCE_RESOLVER = resolver
+
+def _source_files(game_path):
+    """The files to warm for a game path"""
+    if SOURCE_RESOLVER is None:
+        return [game_path]
+    try:
+        return SOURCE_RESOLVER(game_path)
+    except Exception:
+        return [game_path]
+
+def prefetch_game(game_path):
+    """Queue the files a game is read from for warming"""
+    if game_path:
+        prefetch_paths(*_source_files(game_path))
+
+def prefetch_launch_plan(launch_plan):
+    """Queue the ROM, emulator and core of a compiled launch plan for warming"""
+    if not launch_plan:
+        return
+    prefetch_paths(*_source_files(launch_plan['game_path']), launch_plan.get('emulator_path'),
+                   launch_plan.get('core_path'))
+
+def is_warm(path):
+    """Check whether a file was warmed and has not changed since"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    with PREFETCH_LOCK:
+        return WARM_FILES.get(str(path)) == (stat.st_size, stat.st_mtime)
+
+def get_prefetch_stats():
+    """Return a copy of the prefetch counters plus the current warm set size"""
+    with PREFETCH_LOCK:
+        stats = dict(PREFETCH_STATS)
+        stats['warm_files'] = len(WARM_FILES)
+        stats['warm_bytes'] = _warm_bytes()
+    return stats
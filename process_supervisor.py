@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Process Supervisor
+Launches emulators asynchronously, tracks running sessions, reaps exits and keeps
+the tail of each emulator's stdout/stderr in bounded ring buffers
+"""
+
+import os
+import time
+import threading
+import subprocess
+from collections import deque
+
+RING_BUFFER_LINES = 200  # Lines of stdout/stderr kept per session
+MAX_LINE_LENGTH = 1024  # Longer lines are split into chunks of this size
+MAX_FINISHED_SESSIONS = 20  # Finished sessions kept around for 'ps' and 'logs'
+TERMINATE_TIMEOUT = 5  # Seconds to wait after SIGTERM before killing
+
+SESSIONS = {}  # session id -> session dict
+EXITED_SESSIONS = deque()  # Sessions that exited but were not reported yet
+EXIT_CALLBACKS = []  # Called as callback(session) from the reaper thread
+FIRST_OUTPUT_CALLBACKS = []  # Called as callback(session) when an emulator first writes output
+SUPERVISOR_LOCK = threading.Lock()
+NEXT_SESSION_ID = 1
+
+def add_exit_callback(callback):
+    """Register a function called with the session dict whenever an emulator exits"""
+    if callback not in EXIT_CALLBACKS:
+        EXIT_CALLBACKS.append(callback)
+
+def add_first_output_callback(callback):
+    """Register a function called with the session dict when an emulator prints its first line"""
+    if callback not in FIRST_OUTPUT_CALLBACKS:
+        FIRST_OUTPUT_CALLBACKS.append(callback)
+
+def _note_first_output(session):
+    """Record when a session first produced output and run the first-output callbacks once"""
+    with SUPERVISOR_LOCK:
+        if session['first_output_at'] is not None:
+            return
+        session['first_output_at'] = time.time()
+    for callback in list(FIRST_OUTPUT_CALLBACKS):
+        try:
+            callback(session)
+        except Exception:
+            pass
+
+def _read_stream(stream, buffer, session):
+    """Copy lines from a child pipe into a bounded ring buffer until EOF"""
+    try:
+        for raw_line in iter(lambda: stream.readline(MAX_LINE_LENGTH), b''):
+            if session['first_output_at'] is None:
+                _note_first_output(session)
+            buffer.append(raw_line.decode('utf-8', errors='replace').rstrip('\r\n'))
+    except (OSError, ValueError):
+        pass
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+def _reap_session(session):
+    """Wait for a session's process to exit and record the outcome"""
+    process = session['process']
+    returncode = process.wait()
+    for reader in session['readers']:
+        reader.join(timeout=1)
+
+    with SUPERVISOR_LOCK:
+        session['returncode'] = returncode
+        session['ended_at'] = time.time()
+        session['status'] = 'exited' if returncode == 0 else f"failed ({returncode})"
+        EXITED_SESSIONS.append(session)
+        _prune_finished_sessions()
+
+    run_exit_callbacks(session)
+
+def run_exit_callbacks(session):
+    """
+    Run the exit callbacks for a finished session. Used by the reaper, and by hosts that
+    run several games in one process (e.g. the warm RetroArch host) when a game ends.
+    """
+    for callback in list(EXIT_CALLBACKS):
+        try:
+            callback(session)
+        except Exception:
+            pass
+
+def _prune_finished_sessions():
+    """Drop the oldest finished sessions beyond MAX_FINISHED_SESSIONS (lock held)"""
+    finished = sorted((s for s in SESSIONS.values() if s['ended_at'] is not None), key=lambda s: s['ended_at'])
+    for session in finished[:max(0, len(finished) - MAX_FINISHED_SESSIONS)]:
+        SESSIONS.pop(session['id'], None)
+
+def launch_session(argv, cwd=None, game_path=None, game_name=None, emulator_name=None, system=None,
+                   capture_output=True, **popen_kwargs):
+    """
+    Start an emulator without blocking and register it as a session.
+    Raises OSError (e.g. FileNotFoundError) if the process cannot be started.
+    """
+    global NEXT_SESSION_ID
+
+    output = subprocess.PIPE if capture_output else subprocess.DEVNULL
+    process = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=output,
+        stderr=output,
+        **popen_kwargs
+    )
+
+    with SUPERVISOR_LOCK:
+        session_id = NEXT_SESSION_ID
+        NEXT_SESSION_ID += 1
+        session = {
+            'id': session_id,
+            'pid': process.pid,
+            'argv': list(argv),
+            'game_path': str(game_path) if game_path else None,
+            'game_name': game_name or (os.path.basename(str(game_path)) if game_path else argv[0]),
+            'emulator_name': emulator_name or os.path.basename(str(argv[0])),
+            'system': system,
+            'process': process,
+            'started_at': time.time(),
+            'first_output_at': None,
+            'ended_at': None,
+            'returncode': None,
+            'status': 'running',
+            'stdout': deque(maxlen=RING_BUFFER_LINES),
+            'stderr': deque(maxlen=RING_BUFFER_LINES),
+            'readers': []
+        }
+        SESSIONS[session_id] = session
+
+    if capture_output:
+        for stream, buffer in ((process.stdout, session['stdout']), (process.stderr, session['stderr'])):
+            reader = threading.Thread(target=_read_stream, args=(stream, buffer, session), daemon=True)
+            reader.start()
+            session['readers'].append(reader)
+
+    threading.Thread(target=_reap_session, args=(session,), daemon=True).start()
+    return session
+
+def register_session(host_session, game_path=None, game_name=None, emulator_name=None, system=None, stop=None):
+    """
+    Register a game running inside another session's process (e.g. the warm RetroArch host)
+    as its own session. It shares the host's pid and output buffers; stop() is called to end
+    it from terminate_session, and the host reports its end through finish_session.
+    """
+    global NEXT_SESSION_ID
+
+    with SUPERVISOR_LOCK:
+        session_id = NEXT_SESSION_ID
+        NEXT_SESSION_ID += 1
+        session = {
+            'id': session_id,
+            'pid': host_session['pid'],
+            'argv': list(host_session['argv']),
+            'game_path': str(game_path) if game_path else None,
+            'game_name': game_name or (os.path.basename(str(game_path)) if game_path else host_session['game_name']),
+            'emulator_name': emulator_name or host_session['emulator_name'],
+            'system': system,
+            'process': None,
+            'host_session_id': host_session['id'],
+            'stop': stop,
+            'started_at': time.time(),
+            'first_output_at': None,
+            'ended_at': None,
+            'returncode': None,
+            'status': 'running',
+            'stdout': host_session['stdout'],
+            'stderr': host_session['stderr'],
+            'readers': []
+        }
+        SESSIONS[session_id] = session
+    return session
+
+def finish_session(session, returncode=0, ended_at=None):
+    """Record the end of a session registered with register_session and run the exit callbacks"""
+    with SUPERVISOR_LOCK:
+        if session['ended_at'] is not None:
+            return
+        session['returncode'] = returncode
+        session['ended_at'] = ended_at or time.time()
+        session['status'] = 'exited' if returncode == 0 else f"failed ({returncode})"
+        EXITED_SESSIONS.append(session)
+        _prune_finished_sessions()
+
+    run_exit_callbacks(session)
+
+def get_session(session_id):
+    """Return a session by id (int or numeric string), or None"""
+    try:
+        session_id = int(session_id)
+    except (TypeError, ValueError):
+        return None
+    with SUPERVISOR_LOCK:
+        return SESSIONS.get(session_id)
+
+def list_sessions(include_finished=True):
+    """Return sessions ordered by id"""
+    with SUPERVISOR_LOCK:
+        sessions = sorted(SESSIONS.values(), key=lambda s: s['id'])
+    if not include_finished:
+        sessions = [s for s in sessions if s['ended_at'] is None]
+    return sessions
+
+def running_sessions():
+    """Return the sessions whose emulator is still running"""
+    return list_sessions(include_finished=False)
+
+def collect_exited_sessions():
+    """Return the sessions that exited since the last call"""
+    with SUPERVISOR_LOCK:
+        exited = list(EXITED_SESSIONS)
+        EXITED_SESSIONS.clear()
+    return exited
+
+def session_runtime(session):
+    """Return how long a session has been (or was) running, in seconds"""
+    end_time = session['ended_at'] if session['ended_at'] is not None else time.time()
+    return end_time - session['started_at']
+
+def terminate_session(session_id, timeout=TERMINATE_TIMEOUT):
+    """
+    Stop a running session: terminate, then kill if it ignores the request.
+    Returns True if the session was running and has been stopped.
+    """
+    session = get_session(session_id)
+    if not session or session['ended_at'] is not None:
+        return False
+
+    process = session['process']
+    if process is None:
+        # A game hosted by another process: ask the host to close it
+        if session.get('stop') is None:
+            return False
+        session['stopped_by_user'] = True
+        session['stop']()
+        return True
+
+    session['stopped_by_user'] = True  # The exit code reflects the signal, not an emulator failure
+    try:
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait(timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return True
+
+def session_output(session, lines=20):
+    """Return the last lines of a session's stdout and stderr"""
+    return list(session['stdout'])[-lines:], list(session['stderr'])[-lines:]
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+RetroFlow ROM Cache
+Copies frequently played ROMs from slow cartridge/USB media to a local directory and
+launches the local copy instead. Copies are verified against the original's size and
+mtime, kept within a byte budget with least-recently-used eviction, and save files the
+emulator writes next to the copy are written back to the cartridge.
+"""
+
+import os
+import json
+import time
+import queue
+import shutil
+import hashlib
+import threading
+
+from archive_cache import split_archive_path, SHEET_EXTENSIONS
+from launch_history import get_game_history
+from process_supervisor import running_sessions
+
+ROM_CACHE_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "rom_cache.json")
+DEFAULT_ROM_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache", "ROMs")
+INDEX_FILENAME = "index.json"
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# min_launches: launches of a cartridge game before it is copied locally
+DEFAULT_ROM_CACHE_CONFIG = {
+    'enabled': True,
+    'directory': None,
+    'max_mb': 4096,
+    'min_launches': 2
+}
+
+CONFIG_CACHE = {'mtime': None, 'config': None}
+# source path -> {'entry', 'filename', 'size', 'mtime', 'last_used'}
+ROM_CACHE = {}
+CACHE_STATE = {'directory': None, 'hits': 0, 'copies': 0, 'evictions': 0, 'pending': set()}
+CARTRIDGE_ROOTS = set()
+COPY_QUEUE = queue.Queue()
+ROM_CACHE_LOCK = threading.RLock()
+COPY_THREAD = None
+
+def get_rom_cache_config():
+    """Return the ROM cache settings, merged with Config/rom_cache.json if present"""
+    try:
+        mtime = os.path.getmtime(ROM_CACHE_CONFIG_FILE)
+    except OSError:
+        mtime = None
+
+    if CONFIG_CACHE['config'] is not None and CONFIG_CACHE['mtime'] == mtime:
+        return CONFIG_CACHE['config']
+
+    config = dict(DEFAULT_ROM_CACHE_CONFIG)
+    if mtime is not None:
+        try:
+            with open(ROM_CACHE_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            config.update({key: value for key, value in overrides.items() if key in DEFAULT_ROM_CACHE_CONFIG})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    CONFIG_CACHE['mtime'] = mtime
+    CONFIG_CACHE['config'] = config
+    return config
+
+def set_cartridge_roots(roots):
+    """Tell the cache which mount points are cartridges (only ROMs below them are cached)"""
+    with ROM_CACHE_LOCK:
+        CARTRIDGE_ROOTS.clear()
+        CARTRIDGE_ROOTS.update(os.path.abspath(str(root)) for root in roots)
+
+def is_cartridge_rom(path):
+    """Check whether a ROM is a single file on a cartridge (archived ROMs and cue sheets are not cached)"""
+    path = os.path.abspath(str(path))
+    if os.path.splitext(path)[1].lower() in SHEET_EXTENSIONS or split_archive_path(path)[0]:
+        return False
+    with ROM_CACHE_LOCK:
+        roots = list(CARTRIDGE_ROOTS)
+    for root in roots:
+        try:
+            if os.path.commonpath([root, path]) == root:
+                return True
+        except ValueError:
+            continue  # Different drives on Windows
+    return False
+
+def _cache_directory():
+    """Return the cache directory, loading its index on first use (lock held)"""
+    directory = get_rom_cache_config()['directory'] or DEFAULT_ROM_CACHE_DIRECTORY
+    if CACHE_STATE['directory'] != directory:
+        CACHE_STATE['directory'] = directory
+        ROM_CACHE.clear()
+        try:
+            with open(os.path.join(directory, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                ROM_CACHE.update({path: entry for path, entry in entries.items() if isinstance(entry, dict)})
+        except (OSError, ValueError):
+            pass
+    return directory
+
+def _save_index(directory):
+    """Write the cache index atomically (lock held)"""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        temp_file = os.path.join(directory, INDEX_FILENAME + ".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(ROM_CACHE, f, indent=2, sort_keys=True)
+        os.replace(temp_file, os.path.join(directory, INDEX_FILENAME))
+    except OSError:
+        pass
+
+def _entry_key(source_path):
+    return hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:16]
+
+def sync_save_files(from_directory, to_directory, stem, rom_filename, skip_extensions=()):
+    """
+    Copy save files (same stem as the ROM, e.g. Game.sav) that are newer on one side to the other;
+    files with an extension in skip_extensions are not saves and stay where they are
+    """
+    try:
+        filenames = os.listdir(from_directory)
+    except OSError:
+        return False
+    synced = True
+    for filename in filenames:
+        stem_part, extension = os.path.splitext(filename)
+        if filename == rom_filename or stem_part != stem or extension.lower() in skip_extensions:
+            continue
+        source = os.path.join(from_directory, filename)
+        target = os.path.join(to_directory, filename)
+        try:
+            if not os.path.isfile(source):
+                continue
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                continue
+            shutil.copy2(source, target)
+        except OSError:
+            synced = False
+    return synced
+
+def _entry_is_valid(source_path, entry, directory):
+    """A copy is valid while the original has the size/mtime it was copied with"""
+    try:
+        stat = os.stat(source_path)
+        local_size = os.path.getsize(os.path.join(directory, entry['entry'], entry['filename']))
+    except OSError:
+        return False
+    return stat.st_size == entry['size'] == local_size and stat.st_mtime == entry['mtime']
+
+def cached_rom_path(path):
+    """
+    The local copy of a cartridge ROM if one is cached and still matches the original, else
+    None. Unlike local_rom_path nothing is counted or synced, e.g. for prefetching.
+    """
+    path = str(path)
+    if not get_rom_cache_config()['enabled'] or not is_cartridge_rom(path):
+        return None
+    source_path = os.path.abspath(path)
+    with ROM_CACHE_LOCK:
+        directory = _cache_directory()
+        entry = ROM_CACHE.get(source_path)
+        if not entry or not _entry_is_valid(source_path, entry, directory):
+            return None
+        return os.path.join(directory, entry['entry'], entry['filename'])
+
+def local_rom_path(path):
+    """
+    Return the path to launch for a ROM: its local copy if one is cached and still matches
+    the cartridge original, else the path unchanged
+    """
+    path = str(path)
+    if not get_rom_cache_config()['enabled'] or not is_cartridge_rom(path):
+        return path
+    source_path = os.path.abspath(path)
+    with ROM_CACHE_LOCK:
+        directory = _cache_directory()
+        entry = ROM_CACHE.get(source_path)
+        if not entry or not _entry_is_valid(source_path, entry, directory):
+            return path
+        entry['last_used'] = time.time()
+        CACHE_STATE['hits'] += 1
+        _save_index(directory)
+    entry_directory = os.path.join(directory, entry['entry'])
+    # Bring over saves made while the game was played from the cartridge directly
+    sync_save_files(os.path.dirname(source_path), entry_directory, os.path.splitext(entry['filename'])[0], entry['filename'])
+    return os.path.join(entry_directory, entry['filename'])
+
+def _write_back(source_path, entry, directory):
+    """Copy save files next to the local copy back to the cartridge; False if it is not reachable"""
+    source_directory = os.path.dirname(source_path)
+    if not os.path.isdir(source_directory):
+        return False
+    return sync_save_files(os.path.join(directory, entry['entry']), source_directory,
+                          os.path.splitext(entry['filename'])[0], entry['filename'])
+
+def _evict_until_fits(directory, needed_bytes, budget):
+    """Remove least recently used copies until needed_bytes fits, keeping ones in use (lock held)"""
+    in_use = {os.path.abspath(session['game_path']) for session in running_sessions() if session.get('game_path')}
+    for source_path, entry in sorted(ROM_CACHE.items(), key=lambda item: item[1]['last_used']):
+        if sum(entry['size'] for entry in ROM_CACHE.values()) + needed_bytes <= budget:
+            return True
+        if source_path in in_use:
+            continue
+        # Saves written next to the copy must reach the cartridge before it is dropped
+        if not _write_back(source_path, entry, directory):
+            continue
+        shutil.rmtree(os.path.join(directory, entry['entry']), ignore_errors=True)
+        del ROM_CACHE[source_path]
+        CACHE_STATE['evictions'] += 1
+    return sum(entry['size'] for entry in ROM_CACHE.values()) + needed_bytes <= budget
+
+def cache_rom(path):
+    """Copy one cartridge ROM into the cache; returns the local path, or None if it was not cached"""
+    source_path = os.path.abspath(str(path))
+    config = get_rom_cache_config()
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        return None
+    budget = config['max_mb'] * 1024 * 1024
+    if stat.st_size > budget:
+        return None
+
+    with ROM_CACHE_LOCK:
+        directory = _cache_directory()
+        entry = ROM_CACHE.get(source_path)
+        if entry and _entry_is_valid(source_path, entry, directory):
+            return os.path.join(directory, entry['entry'], entry['filename'])
+        if not _evict_until_fits(directory, stat.st_size, budget):
+            return None
+
+    entry = {'entry': _entry_key(source_path), 'filename': os.path.basename(source_path),
+             'size': stat.st_size, 'mtime': stat.st_mtime, 'last_used': time.time()}
+    entry_directory = os.path.join(directory, entry['entry'])
+    local_path = os.path.join(entry_directory, entry['filename'])
+    temp_path = local_path + ".partial"
+    try:
+        os.makedirs(entry_directory, exist_ok=True)
+        with open(source_path, 'rb') as source, open(temp_path, 'wb') as target:
+            shutil.copyfileobj(source, target, COPY_CHUNK_BYTES)
+        after = os.stat(source_path)
+        if after.st_size != stat.st_size or after.st_mtime != stat.st_mtime:
+            raise OSError("the ROM changed while it was being copied")
+        os.replace(temp_path, local_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return None
+
+    with ROM_CACHE_LOCK:
+        ROM_CACHE[source_path] = entry
+        CACHE_STATE['copies'] += 1
+        _save_index(directory)
+    return local_path
+
+def _copy_worker():
+    """Background thread: copy queued ROMs one at a time"""
+    while True:
+        source_path = COPY_QUEUE.get()
+        try:
+            cache_rom(source_path)
+        except Exception:
+            pass
+        finally:
+            with ROM_CACHE_LOCK:
+                CACHE_STATE['pending'].discard(source_path)
+            COPY_QUEUE.task_done()
+
+def cache_rom_in_background(path):
+    """Queue a cartridge ROM for copying"""
+    global COPY_THREAD
+    source_path = os.path.abspath(str(path))
+    with ROM_CACHE_LOCK:
+        if source_path in CACHE_STATE['pending']:
+            return
+        CACHE_STATE['pending'].add(source_path)
+        if COPY_THREAD is None or not COPY_THREAD.is_alive():
+            COPY_THREAD = threading.Thread(target=_copy_worker, daemon=True)
+            COPY_THREAD.start()
+    COPY_QUEUE.put(source_path)
+
+def record_session_rom_cache(session):
+    """
+    Supervisor exit callback: write saves back to the cartridge, and copy the ROM locally once
+    it has been played often enough. A copy of a ROM that was since replaced on the cartridge
+    is dropped and the new ROM copied in its place. Register after record_session_history so
+    the launch counts.
+    """
+    game_path = session.get('game_path')
+    config = get_rom_cache_config()
+    if not game_path or not config['enabled'] or not is_cartridge_rom(game_path):
+        return
+    source_path = os.path.abspath(str(game_path))
+    with ROM_CACHE_LOCK:
+        directory = _cache_directory()
+        entry = ROM_CACHE.get(source_path)
+        if entry:
+            if not _write_back(source_path, entry, directory):
+                return  # The cartridge is not reachable: keep the copy and its saves
+            if _entry_is_valid(source_path, entry, directory):
+                return
+            shutil.rmtree(os.path.join(directory, entry['entry']), ignore_errors=True)
+            del ROM_CACHE[source_path]
+            CACHE_STATE['evictions'] += 1
+            _save_index(directory)
+    history = get_game_history(game_path)
+    if history and history['launches'] >= config['min_launches']:
+        cache_rom_in_background(source_path)
+
+def get_rom_cache_stats():
+    """Return the cache directory, its size and budget, and the hit/copy/eviction counters"""
+    config = get_rom_cache_config()
+    with ROM_CACHE_LOCK:
+        directory = _cache_directory()
+        return {
+            'enabled': config['enabled'],
+            'directory': directory,
+            'entries': len(ROM_CACHE),
+            'bytes': sum(entry['size'] for entry in ROM_CACHE.values()),
+            'budget_bytes': config['max_mb'] * 1024 * 1024,
+            'hits': CACHE_STATE['hits'],
+            'copies': CACHE_STATE['copies'],
+            'evictions': CACHE_STATE['evictions'],
+            'pending': len(CACHE_STATE['pending'])
+        }
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+RetroFlow ROM Hashing
+Identifies ROMs by content: CRC32, MD5 and SHA-1 computed in a single streaming pass per file
+(mmap for plain files, a decompressing stream for archived ones), spread over a process pool
+for large batches. Results are kept in Config/rom_hashes.json keyed by path and checked
+against the file's size and mtime, so each file is hashed once until it changes.
+"""
+
+import os
+import json
+import mmap
+import zlib
+import hashlib
+import zipfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from archive_cache import split_archive_path
+
+try:
+    import py7zr
+except ImportError:
+    py7zr = None
+
+HASH_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "rom_hashes.json")
+HASH_CHUNK_BYTES = 1024 * 1024
+POOL_MIN_FILES = 8  # Smaller batches are hashed in-process; starting workers would cost more
+POOL_CHUNK_FILES = 16  # Files handed to a worker at a time
+
+HASH_CACHE = {}  # absolute path -> {'size', 'mtime', 'crc32', 'md5', 'sha1'}
+# version changes once per hashing batch that stored new hashes, not with every file
+HASH_STATE = {'loaded': False, 'dirty': False, 'hashed': 0, 'hashed_bytes': 0, 'version': 0, 'pending': set()}
+HASH_LOCK = threading.RLock()
+
+def _hash_stream(chunks):
+    """Feed chunks through CRC32, MD5 and SHA-1 at once"""
+    crc = 0
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    for chunk in chunks:
+        crc = zlib.crc32(chunk, crc)
+        md5.update(chunk)
+        sha1.update(chunk)
+    return {'crc32': f"{crc & 0xFFFFFFFF:08x}", 'md5': md5.hexdigest(), 'sha1': sha1.hexdigest()}
+
+def _file_chunks(path):
+    """Yield a plain file's content in HASH_CHUNK_BYTES slices of an mmap"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return  # Empty files cannot be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, memoryview(data) as view:
+            for offset in range(0, size, HASH_CHUNK_BYTES):
+                # Slices are released once hashed, or the mapping could not be closed
+                with view[offset:offset + HASH_CHUNK_BYTES] as chunk:
+                    yield chunk
+
+def _member_chunks(archive_path, member_name):
+    """Yield an archive member's content while decompressing it, without extracting to disk"""
+    if archive_path.lower().endswith('.7z'):
+        if py7zr is None:
+            raise OSError("py7zr is needed to read .7z archives")
+        with py7zr.SevenZipFile(archive_path, 'r') as archive:
+            member = archive.read([member_name]).get(member_name)
+            if member is None:
+                raise FileNotFoundError(f"{member_name} is not in {archive_path}")
+            while True:
+                chunk = member.read(HASH_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    with zipfile.ZipFile(archive_path) as archive, archive.open(member_name) as member:
+        while True:
+            chunk = member.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+def compute_rom_hashes(path):
+    """Hash one ROM (plain file or archive member path) in a single pass; raises OSError if unreadable"""
+    path = str(path)
+    archive_path, member_name = split_archive_path(path)
+    if archive_path is None:
+        return _hash_stream(_file_chunks(path))
+    try:
+        return _hash_stream(_member_chunks(archive_path, member_name))
+    except (KeyError, zipfile.BadZipFile, RuntimeError) as e:
+        raise OSError(f"cannot read {member_name} from {archive_path}: {e}") from e
+
+def _hash_worker(path):
+    """Process pool entry point: (path, hashes) or (path, None) if the file could not be read"""
+    try:
+        return path, compute_rom_hashes(path)
+    except Exception:
+        return path, None
+
+def _file_identity(path):
+    """(size, mtime) of the file holding a ROM: the archive for archived ROMs; None if it is missing"""
+    archive_path = split_archive_path(path)[0]
+    try:
+        stat = os.stat(archive_path or path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+def _load_cache():
+    """Read the saved hashes once (lock held)"""
+    if HASH_STATE['loaded']:
+        return
+    HASH_STATE['loaded'] = True
+    try:
+        with open(HASH_CACHE_FILE, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            HASH_CACHE.update({path: entry for path, entry in entries.items() if isinstance(entry, dict)})
+    except (OSError, ValueError):
+        pass
+
+def save_hash_cache():
+    """Write the hash cache atomically if it changed"""
+    with HASH_LOCK:
+        if not HASH_STATE['dirty']:
+            return
+        try:
+            os.makedirs(os.path.dirname(HASH_CACHE_FILE), exist_ok=True)
+            temp_file = HASH_CACHE_FILE + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(HASH_CACHE, f, separators=(',', ':'))
+            os.replace(temp_file, HASH_CACHE_FILE)
+            HASH_STATE['dirty'] = False
+        except OSError:
+            pass
+
+def _cached_entry(path, identity):
+    """Return the cached hashes of a path if they were computed for this size/mtime (lock held)"""
+    _load_cache()
+    entry = HASH_CACHE.get(path)
+    if entry and identity is not None and entry.get('size') == identity[0] and entry.get('mtime') == identity[1]:
+        return entry
+    return None
+
+def _store_entry(path, identity, hashes):
+    """Remember freshly computed hashes (lock held)"""
+    entry = {'size': identity[0], 'mtime': identity[1]}
+    entry.update(hashes)
+    HASH_CACHE[path] = entry
+    HASH_STATE['dirty'] = True
+    HASH_STATE['hashed'] += 1
+    HASH_STATE['hashed_bytes'] += identity[0]
+    return entry
+
+def get_cached_rom_hashes(path):
+    """Return {'crc32', 'md5', 'sha1'} of a ROM if it has been hashed since it last changed, else None"""
+    path = os.path.abspath(str(path))
+    identity = _file_identity(path)
+    with HASH_LOCK:
+        entry = _cached_entry(path, identity)
+    return {key: entry[key] for key in ('crc32', 'md5', 'sha1')} if entry else None
+
+def get_rom_hashes(path):
+    """Return {'crc32', 'md5', 'sha1'} of a ROM, hashing it now if needed; None if it cannot be read"""
+    return hash_roms([path]).get(os.path.abspath(str(path)))
+
+def hash_roms(paths, workers=None, progress=None):
+    """
+    Hash many ROMs, reusing cached results and spreading the rest over a process pool.
+    Returns {absolute path: {'crc32', 'md5', 'sha1'}} for every ROM that could be read.
+    progress, if given, is called as progress(done, total) while hashing.
+    """
+    results = {}
+    missing = {}  # path -> identity
+    with HASH_LOCK:
+        for path in dict.fromkeys(os.path.abspath(str(path)) for path in paths):
+            identity = _file_identity(path)
+            if identity is None:
+                continue
+            entry = _cached_entry(path, identity)
+            if entry:
+                results[path] = {key: entry[key] for key in ('crc32', 'md5', 'sha1')}
+            else:
+                missing[path] = identity
+    if not missing:
+        return results
+
+    stored = []
+    def finish(path, hashes):
+        if hashes is None:
+            return
+        with HASH_LOCK:
+            # The file may have changed while it was being read
+            if _file_identity(path) == missing[path]:
+                _store_entry(path, missing[path], hashes)
+                stored.append(path)
+        results[path] = hashes
+
+    total = len(missing)
+    done = 0
+    workers = workers or os.cpu_count() or 1
+    if total >= POOL_MIN_FILES and workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+                for path, hashes in pool.map(_hash_worker, missing, chunksize=POOL_CHUNK_FILES):
+                    finish(path, hashes)
+                    done += 1
+                    if progress:
+                        progress(done, total)
+        except (OSError, RuntimeError, NotImplementedError):
+            pass  # No usable process pool (e.g. no semaphores in a sandbox); finish in-process
+    for path in list(missing)[done:]:
+        finish(*_hash_worker(path))
+        done += 1
+        if progress:
+            progress(done, total)
+
+    if stored:
+        with HASH_LOCK:
+            HASH_STATE['version'] += 1
+    save_hash_cache()
+    return results
+
+def hash_roms_in_background(paths, on_complete=None):
+    """
+    Hash a library's ROMs on a daemon thread so later lookups find them cached. on_complete
+    is called once the batch is done if it stored new hashes (e.g. to identify the ROMs again).
+    """
+    with HASH_LOCK:
+        paths = [path for path in dict.fromkeys(os.path.abspath(str(path)) for path in paths)
+                 if path not in HASH_STATE['pending']]
+        if not paths:
+            return
+        HASH_STATE['pending'].update(paths)
+
+    def run():
+        version = HASH_STATE['version']
+        try:
+            hash_roms(paths)
+        except Exception:
+            pass
+        finally:
+            with HASH_LOCK:
+                HASH_STATE['pending'].difference_update(paths)
+        if on_complete and HASH_STATE['version'] != version:
+            try:
+                on_complete()
+            except Exception:
+                pass
+
+    threading.Thread(target=run, daemon=True).start()
+
+def get_hash_cache_version():
+    """A number that changes when a hashing batch stores new hashes, for caches of data derived from them"""
+    return HASH_STATE['version']
+
+def get_hash_cache_stats():
+    """Return how many ROMs are hashed, and how many files/bytes were hashed this run"""
+    with HASH_LOCK:
+        _load_cache()
+        return {
+            'entries': len(HASH_CACHE),
+            'hashed': HASH_STATE['hashed'],
+            'hashed_bytes': HASH_STATE['hashed_bytes'],
+            'pending': len(HASH_STATE['pending'])
+        }
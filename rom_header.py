@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+RetroFlow ROM Headers
+Reads the internal header of NES (iNES/NES 2.0), SNES, Game Boy/Game Boy Color and
+Game Boy Advance ROMs to report the real system, the title stored in the cartridge,
+the mapper and the header checksum. Only the start of a file is mapped (the pages
+holding a header are the only ones read), and results are kept in
+Config/rom_headers.json keyed by path and checked against the file's size and mtime.
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import zipfile
+import threading
+
+from archive_cache import split_archive_path
+
+HEADER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "rom_headers.json")
+HEADER_BYTES = 0x10000 + 0x200  # SNES HiROM header at 0xFFC0, after a 512-byte copier header
+HEADER_SAVE_INTERVAL = 10  # Seconds between writes of the cache while ROMs are being parsed
+
+NES_EXTENSIONS = ('.nes', '.unf')
+SNES_EXTENSIONS = ('.smc', '.sfc', '.swc', '.fig')
+GB_EXTENSIONS = ('.gb', '.gbc', '.sgb')
+GBA_EXTENSIONS = ('.gba', '.agb')
+
+NINTENDO_LOGO_START = bytes.fromhex('ceed6666cc0d000b')  # First bytes of the logo the Game Boy boot ROM checks
+GBA_LOGO_START = bytes.fromhex('24ffae51699aa221')
+
+GB_CARTRIDGE_TYPES = {
+    0x00: 'ROM only', 0x01: 'MBC1', 0x02: 'MBC1+RAM', 0x03: 'MBC1+RAM+Battery', 0x05: 'MBC2',
+    0x06: 'MBC2+Battery', 0x08: 'ROM+RAM', 0x09: 'ROM+RAM+Battery', 0x0B: 'MMM01', 0x0C: 'MMM01+RAM',
+    0x0D: 'MMM01+RAM+Battery', 0x0F: 'MBC3+Timer+Battery', 0x10: 'MBC3+Timer+RAM+Battery', 0x11: 'MBC3',
+    0x12: 'MBC3+RAM', 0x13: 'MBC3+RAM+Battery', 0x19: 'MBC5', 0x1A: 'MBC5+RAM', 0x1B: 'MBC5+RAM+Battery',
+    0x1C: 'MBC5+Rumble', 0x1D: 'MBC5+Rumble+RAM', 0x1E: 'MBC5+Rumble+RAM+Battery', 0x20: 'MBC6',
+    0x22: 'MBC7+Sensor+Rumble+RAM+Battery', 0xFC: 'Pocket Camera', 0xFD: 'Bandai TAMA5', 0xFE: 'HuC3',
+    0xFF: 'HuC1+RAM+Battery'
+}
+SNES_MAP_MODES = {
+    0x20: 'LoROM', 0x21: 'HiROM', 0x22: 'LoROM (S-DD1)', 0x23: 'LoROM (SA-1)', 0x25: 'ExHiROM',
+    0x30: 'FastROM LoROM', 0x31: 'FastROM HiROM', 0x32: 'FastROM LoROM (S-DD1)', 0x35: 'FastROM ExHiROM'
+}
+SNES_COPROCESSORS = {0x0: 'DSP', 0x1: 'Super FX', 0x2: 'OBC1', 0x3: 'SA-1', 0x4: 'S-DD1', 0x5: 'S-RTC',
+                     0xE: 'Other', 0xF: 'Custom'}
+SNES_REGIONS = {
+    0x00: 'Japan', 0x01: 'USA', 0x02: 'Europe', 0x03: 'Sweden', 0x04: 'Finland', 0x05: 'Denmark',
+    0x06: 'France', 0x07: 'Netherlands', 0x08: 'Spain', 0x09: 'Germany', 0x0A: 'Italy', 0x0B: 'China',
+    0x0D: 'Korea', 0x0F: 'Canada', 0x10: 'Brazil', 0x11: 'Australia'
+}
+NES_CONSOLE_TYPES = {0: None, 1: 'VS. System', 2: 'PlayChoice-10', 3: 'Extended console type'}
+
+HEADER_CACHE = {}  # absolute path -> {'size', 'mtime', 'header': dict or None}
+HEADER_STATE = {'loaded': False, 'dirty': False, 'saved_at': 0.0}
+HEADER_LOCK = threading.RLock()
+
+def _text(data):
+    """Decode a fixed-width header title: ASCII, padded with NULs or spaces"""
+    title = bytes(data).split(b'\x00', 1)[0].decode('ascii', errors='replace')
+    title = ''.join(char if char.isprintable() and char != '�' else ' ' for char in title)
+    return ' '.join(title.split()) or None
+
+def _parse_ines(data, file_size):
+    """iNES / NES 2.0: 16-byte header with ROM sizes, mapper number and console type"""
+    if len(data) < 16 or data[:4] != b'NES\x1a':
+        return None
+    flags6, flags7 = data[6], data[7]
+    nes2 = flags7 & 0x0C == 0x08
+    mapper = (flags6 >> 4) | (flags7 & 0xF0)
+    if nes2:
+        mapper |= (data[8] & 0x0F) << 8
+    variant = NES_CONSOLE_TYPES[flags7 & 0x03]
+    return {
+        'format': 'NES 2.0' if nes2 else 'iNES',
+        'system': 'Nintendo Entertainment System',
+        'variant': variant,
+        'title': None,  # iNES headers carry no title
+        'mapper': mapper,
+        'prg_rom_kb': data[4] * 16,
+        'chr_rom_kb': data[5] * 8,
+        'battery': bool(flags6 & 0x02),
+        'checksum': None,
+        'checksum_valid': None
+    }
+
+def _snes_header_score(data, offset):
+    """How much a 32-byte window at offset looks like a SNES internal header"""
+    if offset + 0x20 > len(data):
+        return -1
+    header = data[offset:offset + 0x20]
+    complement, checksum = struct.unpack_from('<HH', header, 0x1C)
+    score = 0
+    if complement ^ checksum == 0xFFFF:
+        score += 4
+    if header[0x15] in SNES_MAP_MODES:
+        score += 2
+    if header[0x17] <= 0x0D:  # ROM size up to 8 MB
+        score += 1
+    if all(0x20 <= byte < 0x7F for byte in header[:0x15]):
+        score += 2
+    return score
+
+def _parse_snes(data, file_size):
+    """SNES internal header at 0x7FC0 (LoROM) or 0xFFC0 (HiROM), after an optional copier header"""
+    base = 0x200 if file_size % 1024 == 512 else 0
+    candidates = [(score, offset) for offset in (base + 0x7FC0, base + 0xFFC0)
+                  for score in (_snes_header_score(data, offset),) if score >= 4]
+    if not candidates:
+        return None
+    _, offset = max(candidates)
+    header = data[offset:offset + 0x20]
+    complement, checksum = struct.unpack_from('<HH', header, 0x1C)
+    map_mode, cartridge_type = header[0x15], header[0x16]
+    coprocessor = SNES_COPROCESSORS.get(cartridge_type >> 4) if cartridge_type & 0x0F >= 3 else None
+    return {
+        'format': 'SNES',
+        'system': 'Super Nintendo',
+        'variant': coprocessor,
+        'title': _text(header[:0x15]),
+        'mapper': SNES_MAP_MODES.get(map_mode, f"0x{map_mode:02X}"),
+        'region': SNES_REGIONS.get(header[0x19]),
+        'version': header[0x1B],
+        'copier_header': bool(base),
+        'checksum': f"{checksum:04x}",
+        'checksum_valid': complement ^ checksum == 0xFFFF
+    }
+
+def _parse_gb(data, file_size):
+    """Game Boy / Game Boy Color cartridge header at 0x100-0x14F"""
+    if len(data) < 0x150 or data[0x104:0x10C] != NINTENDO_LOGO_START:
+        return None
+    cgb_flag = data[0x143]
+    header_checksum = 0
+    for byte in data[0x134:0x14D]:
+        header_checksum = (header_checksum - byte - 1) & 0xFF
+    # Color games use the last title bytes for a manufacturer code and the CGB flag
+    title = _text(data[0x134:0x13F] if cgb_flag & 0x80 else data[0x134:0x144])
+    if cgb_flag == 0xC0:
+        system, variant = 'Game Boy Color', 'Game Boy Color only'
+    elif cgb_flag & 0x80:
+        system, variant = 'Game Boy Color', 'Game Boy compatible'
+    else:
+        system, variant = 'Game Boy', None
+    if data[0x146] == 0x03:
+        variant = f"{variant}, Super Game Boy enhanced" if variant else 'Super Game Boy enhanced'
+    return {
+        'format': 'Game Boy',
+        'system': system,
+        'variant': variant,
+        'title': title,
+        'mapper': GB_CARTRIDGE_TYPES.get(data[0x147], f"0x{data[0x147]:02X}"),
+        'rom_kb': 32 << data[0x148] if data[0x148] <= 8 else None,
+        'version': data[0x14C],
+        'checksum': f"{data[0x14D]:02x}",
+        'checksum_valid': header_checksum == data[0x14D],
+        'global_checksum': f"{struct.unpack_from('>H', data, 0x14E)[0]:04x}"
+    }
+
+def _parse_gba(data, file_size):
+    """Game Boy Advance cartridge header at 0x00-0xBF"""
+    if len(data) < 0xC0 or data[0xB2] != 0x96 or data[0x04:0x0C] != GBA_LOGO_START:
+        return None
+    complement = (-sum(data[0xA0:0xBD]) - 0x19) & 0xFF
+    return {
+        'format': 'Game Boy Advance',
+        'system': 'Game Boy Advance',
+        'variant': None,
+        'title': _text(data[0xA0:0xAC]),
+        'mapper': None,
+        'game_code': _text(data[0xAC:0xB0]),
+        'maker_code': _text(data[0xB0:0xB2]),
+        'version': data[0xBC],
+        'checksum': f"{data[0xBD]:02x}",
+        'checksum_valid': complement == data[0xBD]
+    }
+
+# Parsers tried for an extension, in order; formats with a signature are tried for any extension
+PARSERS_BY_EXTENSION = {}
+PARSERS_BY_EXTENSION.update({extension: (_parse_ines,) for extension in NES_EXTENSIONS})
+PARSERS_BY_EXTENSION.update({extension: (_parse_snes,) for extension in SNES_EXTENSIONS})
+PARSERS_BY_EXTENSION.update({extension: (_parse_gb, _parse_gba) for extension in GB_EXTENSIONS})
+PARSERS_BY_EXTENSION.update({extension: (_parse_gba, _parse_gb) for extension in GBA_EXTENSIONS})
+SIGNATURE_PARSERS = (_parse_ines, _parse_gba, _parse_gb)
+
+def parse_header_bytes(data, file_size, extension):
+    """Decode a ROM header from the first HEADER_BYTES of a ROM; None if no known header is found"""
+    for parser in PARSERS_BY_EXTENSION.get(extension.lower(), SIGNATURE_PARSERS):
+        header = parser(data, file_size)
+        if header:
+            return header
+    return None
+
+def read_rom_header(path):
+    """Parse the header of a ROM (plain file or archive member path) without caching; raises OSError"""
+    path = str(path)
+    extension = os.path.splitext(path)[1]
+    archive_path, member_name = split_archive_path(path)
+    if archive_path is not None:
+        if not archive_path.lower().endswith('.zip'):
+            return None  # Solid .7z archives would have to be decompressed from the start
+        try:
+            with zipfile.ZipFile(archive_path) as archive, archive.open(member_name) as member:
+                return parse_header_bytes(member.read(HEADER_BYTES), archive.getinfo(member_name).file_size, extension)
+        except (KeyError, zipfile.BadZipFile, RuntimeError) as e:
+            raise OSError(f"cannot read {member_name} from {archive_path}: {e}") from e
+
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size == 0:
+            return None
+        # Only the mapped pages a parser touches are read from disk
+        with mmap.mmap(f.fileno(), min(file_size, HEADER_BYTES), access=mmap.ACCESS_READ) as data:
+            return parse_header_bytes(data, file_size, extension)
+
+def describe_rom_header(header):
+    """One-line summary of a decoded header for info screens"""
+    if not header:
+        return "No recognizable header"
+    parts = [header['format'], header['variant'], header['title'] and f"'{header['title']}'",
+             header['mapper'] is not None and f"mapper {header['mapper']}",
+             header['checksum_valid'] is not None and f"checksum {'ok' if header['checksum_valid'] else 'BAD'}"]
+    return ", ".join(str(part) for part in parts if part)
+
+def _load_cache():
+    """Read the saved headers once (lock held)"""
+    if HEADER_STATE['loaded']:
+        return
+    HEADER_STATE['loaded'] = True
+    try:
+        with open(HEADER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            HEADER_CACHE.update({path: entry for path, entry in entries.items() if isinstance(entry, dict)})
+    except (OSError, ValueError):
+        pass
+
+def save_header_cache():
+    """Write the header cache atomically if it changed"""
+    with HEADER_LOCK:
+        if not HEADER_STATE['dirty']:
+            return
+        try:
+            os.makedirs(os.path.dirname(HEADER_CACHE_FILE), exist_ok=True)
+            temp_file = HEADER_CACHE_FILE + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(HEADER_CACHE, f, separators=(',', ':'))
+            os.replace(temp_file, HEADER_CACHE_FILE)
+            HEADER_STATE['dirty'] = False
+        except OSError:
+            pass
+        HEADER_STATE['saved_at'] = time.time()
+
+def get_rom_header(path):
+    """
+    Return the decoded header of a ROM, cached by (path, size, mtime), or None if it has
+    no recognizable header or cannot be read. Keys: 'format', 'system', 'variant', 'title',
+    'mapper', 'checksum', 'checksum_valid', plus format-specific details.
+    """
+    path = os.path.abspath(str(path))
+    try:
+        stat = os.stat(split_archive_path(path)[0] or path)
+    except OSError:
+        return None
+    with HEADER_LOCK:
+        _load_cache()
+        entry = HEADER_CACHE.get(path)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            return entry['header']
+    try:
+        header = read_rom_header(path)
+    except (OSError, ValueError):
+        return None  # Not cached: the file may be readable next time
+    with HEADER_LOCK:
+        HEADER_CACHE[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'header': header}
+        HEADER_STATE['dirty'] = True
+        if time.time() - HEADER_STATE['saved_at'] >= HEADER_SAVE_INTERVAL:
+            save_header_cache()
+    return header
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+RetroFlow ROM Tags
+Parses the tags of GoodTools and No-Intro/Redump style ROM names, e.g.
+"Tetris (USA, Europe) (En,Fr) (Rev 1) [!].gb" or "Sonic (UE) [b1].gen", into structured
+fields in a single pass of one compiled pattern: title, regions, languages, revision,
+disc number and dump flags. Parsed filenames are cached, so listing, filtering and
+sorting a library reads each name once.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+TAG_CACHE_SIZE = 65536
+
+# No-Intro region names, written out in full and comma separated: (USA, Europe)
+REGION_NAMES = {
+    'World', 'USA', 'Europe', 'Japan', 'Asia', 'Australia', 'Brazil', 'Canada', 'China', 'Denmark',
+    'Finland', 'France', 'Germany', 'Greece', 'Hong Kong', 'Italy', 'Korea', 'Mexico', 'Netherlands',
+    'Norway', 'Poland', 'Portugal', 'Russia', 'Scandinavia', 'Spain', 'Sweden', 'Taiwan', 'UK', 'Unknown'
+}
+REGION_LOOKUP = {region.lower(): region for region in REGION_NAMES}
+# GoodTools country codes: (U), (E), (J), combined as (UE) or (JUE) for the three main ones
+GOODTOOLS_REGIONS = {
+    'U': 'USA', 'E': 'Europe', 'J': 'Japan', 'W': 'World', 'A': 'Australia', 'B': 'Brazil',
+    'C': 'China', 'F': 'France', 'G': 'Germany', 'I': 'Italy', 'K': 'Korea', 'S': 'Spain',
+    'FN': 'Finland', 'GR': 'Greece', 'HK': 'Hong Kong', 'NL': 'Netherlands', 'UK': 'UK',
+    'Unk': 'Unknown', '1': 'Japan', '4': 'USA'
+}
+# Two-letter codes shaped like a No-Intro language (As, Ch, Fr, Sw) are read as languages
+# Regions listed first when several dumps of a game are sorted
+REGION_PREFERENCE = ('USA', 'World', 'Europe', 'Japan')
+
+# Flags of dumps that differ from the original cartridge or disc
+PROBLEM_FLAGS = ('bad dump', 'overdump', 'hack', 'pirate', 'trainer')
+
+# GoodTools bracket codes, e.g. [!], [a1], [b2], [h1C], [T+Eng]
+DUMP_FLAGS = {
+    '!': 'verified', 'a': 'alternate', 'b': 'bad dump', 'o': 'overdump', 'h': 'hack',
+    'f': 'fixed', 't': 'trainer', 'p': 'pirate', 'T': 'translation', 'x': 'bad checksum'
+}
+# No-Intro status tags, e.g. (Beta), (Proto), (Unl)
+STATUS_FLAGS = {
+    'beta': 'beta', 'proto': 'prototype', 'prototype': 'prototype', 'demo': 'demo',
+    'sample': 'sample', 'unl': 'unlicensed', 'pirate': 'pirate', 'hack': 'hack', 'pd': 'public domain'
+}
+
+# One alternation per tag kind; the title is whatever lies outside the tags
+TAG_PATTERN = re.compile(r"""
+    \s*\(\s*(?:
+        (?P<revision>(?:Rev|REV)\s*[\w.]+|v\d+(?:\.\w+)*)
+      | (?P<disc>(?:Disc|Disk|CD)\s*(?P<disc_number>\d+)(?:\s*of\s*\d+)?)
+      | (?P<languages>[A-Z][a-z](?:-[A-Za-z]+)?(?:\s*[,+]\s*[A-Z][a-z](?:-[A-Za-z]+)?)*)
+      | (?P<paren>[^()]*)
+    )\s*\)
+  | \s*\[\s*(?P<flag>[^\[\]]*?)\s*\]
+""", re.VERBOSE)
+FLAG_CODE = re.compile(r'(!|[abfhopt](?=\d|$|[A-Z])|T(?=[+-])|x(?=\d|$))')
+
+def _parse_regions(tag):
+    """Region names of a parenthesised tag, or None if it is not a region tag"""
+    regions = [REGION_LOOKUP.get(part.strip().lower()) for part in tag.split(',')]
+    if all(regions):
+        return regions
+    if tag in GOODTOOLS_REGIONS:
+        return [GOODTOOLS_REGIONS[tag]]
+    if re.fullmatch(r'[UEJ]{2,3}', tag) and len(set(tag)) == len(tag):
+        return [GOODTOOLS_REGIONS[code] for code in tag]
+    return None
+
+def parse_rom_name(name):
+    """
+    Split a ROM name (without extension) into its title and tags:
+    {'title', 'regions', 'languages', 'revision', 'disc', 'flags', 'tags'}.
+    'flags' holds dump and status flags ('verified', 'bad dump', 'beta', ...);
+    'tags' keeps any other tag text as written, e.g. 'Virtual Console' or 'M3'.
+    """
+    parsed = {'title': '', 'regions': [], 'languages': [], 'revision': None, 'disc': None, 'flags': [], 'tags': []}
+    title_parts = []
+    position = 0
+    for match in TAG_PATTERN.finditer(name):
+        title_parts.append(name[position:match.start()])
+        position = match.end()
+        if match.group('revision'):
+            parsed['revision'] = re.sub(r'^(?:Rev|REV)\s*', '', match.group('revision'))
+        elif match.group('disc'):
+            parsed['disc'] = int(match.group('disc_number'))
+        elif match.group('languages'):
+            parsed['languages'].extend(re.split(r'\s*[,+]\s*', match.group('languages')))
+        elif match.group('flag') is not None:
+            flag = match.group('flag')
+            code = FLAG_CODE.match(flag)
+            if code:
+                parsed['flags'].append(DUMP_FLAGS[code.group(1)])
+            elif flag:
+                parsed['tags'].append(flag)
+        else:
+            tag = (match.group('paren') or '').strip()
+            regions = _parse_regions(tag) if tag else None
+            if regions and not parsed['regions']:
+                parsed['regions'] = regions
+            elif tag.lower() in STATUS_FLAGS:
+                parsed['flags'].append(STATUS_FLAGS[tag.lower()])
+            elif tag:
+                parsed['tags'].append(tag)
+    title_parts.append(name[position:])
+    parsed['title'] = ' '.join(''.join(title_parts).replace('_', ' ').split())
+    parsed['flags'] = list(dict.fromkeys(parsed['flags']))
+    return parsed
+
+@lru_cache(maxsize=TAG_CACHE_SIZE)
+def _cached_rom_tags(filename):
+    parsed = parse_rom_name(os.path.splitext(filename)[0])
+    return tuple((key, tuple(value) if isinstance(value, list) else value) for key, value in parsed.items())
+
+def get_rom_tags(path):
+    """Parsed tags of a ROM file's name (see parse_rom_name), cached per filename"""
+    return {key: list(value) if isinstance(value, tuple) else value
+            for key, value in _cached_rom_tags(os.path.basename(str(path)))}
+
+def describe_rom_tags(tags):
+    """One-line summary of parsed tags, e.g. 'USA, Europe · En, Fr · Rev 1 · Disc 2 · verified'"""
+    parts = []
+    if tags.get('regions'):
+        parts.append(', '.join(tags['regions']))
+    if tags.get('languages'):
+        parts.append(', '.join(tags['languages']))
+    if tags.get('revision'):
+        revision = tags['revision']
+        parts.append(revision if revision.startswith('v') else f"Rev {revision}")
+    if tags.get('disc'):
+        parts.append(f"Disc {tags['disc']}")
+    parts.extend(tags.get('flags', []))
+    return ' · '.join(parts) or "None"
+
+def _revision_rank(revision):
+    """
+    Later revisions sort first: numbers compared numerically, letters alphabetically, and
+    numbered revisions ahead of lettered ones. The closing (2,) puts 'v1.1' ahead of 'v1'
+    and the original release (no revision) after all of its revisions.
+    """
+    parts = re.findall(r'\d+|[A-Za-z]+', (revision or '').lstrip('v'))
+    return tuple((0, -int(part)) if part.isdigit() else (1, -ord(part[0].upper())) for part in parts) + ((2,),)
+
+def rom_sort_key(path):
+    """
+    Sort key grouping the dumps of one game together: by title, then preferred region,
+    good dumps before bad ones, latest revision first, then disc order
+    """
+    tags = _cached_rom_tags(os.path.basename(str(path)))
+    fields = dict(tags)
+    regions = fields['regions']
+    region_rank = min((REGION_PREFERENCE.index(region) for region in regions if region in REGION_PREFERENCE),
+                      default=len(REGION_PREFERENCE))
+    problem = any(flag in PROBLEM_FLAGS for flag in fields['flags'])
+    return (fields['title'].lower(), region_rank, problem, _revision_rank(fields['revision']), fields['disc'] or 0)
+
+def rom_matches(tags, region=None, language=None, good_only=False):
+    """Whether parsed tags pass a filter: a region or language name (case-insensitive), verified/good dumps"""
+    if region and region.lower() not in {name.lower() for name in tags['regions']}:
+        return False
+    if language and language.lower() not in {name.lower() for name in tags['languages']}:
+        return False
+    if good_only and any(flag in PROBLEM_FLAGS for flag in tags['flags']):
+        return False
+    return True
+
+def split_tag_filters(text):
+    """
+    Take the tag filters out of a command's arguments: --region <name>, --language <code>
+    and --good. Returns (remaining text, keyword arguments for rom_matches).
+    Raises ValueError for a filter without its value.
+    """
+    filters = {'region': None, 'language': None, 'good_only': False}
+    remaining = []
+    tokens = text.split()
+    position = 0
+    while position < len(tokens):
+        token = tokens[position]
+        position += 1
+        flag = token.lower()
+        if flag == '--good':
+            filters['good_only'] = True
+        elif flag in ('--region', '--language'):
+            values = []
+            while position < len(tokens) and not tokens[position].startswith('--'):
+                values.append(tokens[position])
+                position += 1
+            if not values:
+                raise ValueError(f"{flag} needs a value")
+            filters[flag[2:]] = ' '.join(values)
+        else:
+            remaining.append(token)
+    return ' '.join(remaining), filters
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Session Telemetry
+Samples every running emulator (and its child processes) at a fixed low rate for CPU%,
+RSS, I/O bytes and thread count, and stores a compact p50/p95/max summary per session
+in Config/session_stats.jsonl when the emulator exits
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+
+import psutil
+
+from process_supervisor import running_sessions
+
+STATS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "session_stats.jsonl")
+SAMPLE_INTERVAL = 1.0  # Seconds between samples
+MAX_SAMPLES = 4 * 3600  # Samples kept per session (the oldest are dropped on very long sessions)
+MAX_STATS_LINES = 5000  # The stats file is compacted to this many lines when it grows past twice that
+
+PROCESS_CACHE = {}  # pid -> psutil.Process, kept so cpu_percent() measures since the last sample
+TELEMETRY_STATE = {'lines': None}
+TELEMETRY_LOCK = threading.Lock()
+SAMPLER_THREAD = None
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def summarize(values):
+    """Return {'p50', 'p95', 'max'} for a list of numbers"""
+    return {
+        'p50': round(percentile(values, 0.50), 1),
+        'p95': round(percentile(values, 0.95), 1),
+        'max': round(max(values) if values else 0, 1)
+    }
+
+def _cached_process(pid):
+    """Return the cached psutil.Process for a pid (priming cpu_percent on first use)"""
+    process = PROCESS_CACHE.get(pid)
+    if process is None:
+        process = PROCESS_CACHE[pid] = psutil.Process(pid)
+        process.cpu_percent(None)
+    return process
+
+def sample_process_tree(pid, seen_pids):
+    """
+    Take one sample of a process and its children:
+    (timestamp, cpu percent, rss bytes, read bytes, write bytes, threads), or None if it is gone.
+    The sampled pids are added to seen_pids.
+    """
+    try:
+        root = _cached_process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        PROCESS_CACHE.pop(pid, None)
+        return None
+
+    cpu = rss = read_bytes = write_bytes = threads = 0
+    for process in processes:
+        try:
+            process = _cached_process(process.pid)
+            seen_pids.add(process.pid)
+            with process.oneshot():
+                cpu += process.cpu_percent(None)
+                rss += process.memory_info().rss
+                threads += process.num_threads()
+                if hasattr(process, 'io_counters'):
+                    io = process.io_counters()
+                    read_bytes += io.read_bytes
+                    write_bytes += io.write_bytes
+        except (psutil.Error, OSError):
+            PROCESS_CACHE.pop(process.pid, None)
+    return time.time(), cpu, rss, read_bytes, write_bytes, threads
+
+def _sampler_loop():
+    """Background thread: sample every running emulator session at SAMPLE_INTERVAL"""
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        seen_pids = set()
+        for session in running_sessions():
+            if session.get('warm_host'):
+                continue  # The idle warm host is not a game
+            sample = sample_process_tree(session['pid'], seen_pids)
+            if sample is None:
+                continue
+            if 'telemetry' not in session:
+                session['telemetry'] = deque(maxlen=MAX_SAMPLES)
+            session['telemetry'].append(sample)
+        # Forget processes that were not seen this round (exited emulators and children)
+        for pid in set(PROCESS_CACHE) - seen_pids:
+            PROCESS_CACHE.pop(pid, None)
+
+def start_telemetry():
+    """Start the sampler thread (idempotent)"""
+    global SAMPLER_THREAD
+    with TELEMETRY_LOCK:
+        if SAMPLER_THREAD is None or not SAMPLER_THREAD.is_alive():
+            SAMPLER_THREAD = threading.Thread(target=_sampler_loop, daemon=True)
+            SAMPLER_THREAD.start()
+
+def summarize_session(session):
+    """Build the compact summary of a finished session, or None if it was never sampled"""
+    samples = list(session.get('telemetry') or ())
+    if not samples:
+        return None
+    cpu = [sample[1] for sample in samples]
+    rss_mb = [sample[2] / (1024 * 1024) for sample in samples]
+    threads = [sample[5] for sample in samples]
+    # I/O counters are cumulative: report per-second rates and the total moved
+    io_rates = [
+        ((current[3] + current[4]) - (previous[3] + previous[4])) / max(current[0] - previous[0], 0.001) / 1024
+        for previous, current in zip(samples, samples[1:])
+    ]
+    return {
+        'game_path': session.get('game_path'),
+        'game_name': session.get('game_name'),
+        'emulator_name': session.get('emulator_name'),
+        'system': session.get('system'),
+        'started_at': round(session['started_at']),
+        'duration': round((session['ended_at'] or time.time()) - session['started_at'], 1),
+        'returncode': session.get('returncode'),
+        'samples': len(samples),
+        'cpu_percent': summarize(cpu),
+        'rss_mb': summarize(rss_mb),
+        'threads': summarize(threads),
+        'io_kb_per_sec': summarize(io_rates),
+        'io_read_mb': round((samples[-1][3] - samples[0][3]) / (1024 * 1024), 1),
+        'io_write_mb': round((samples[-1][4] - samples[0][4]) / (1024 * 1024), 1)
+    }
+
+def _compact_stats():
+    """Keep only the newest MAX_STATS_LINES summaries (lock held)"""
+    try:
+        with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            lines = f.readlines()[-MAX_STATS_LINES:]
+        temp_file = STATS_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(temp_file, STATS_FILE)
+        TELEMETRY_STATE['lines'] = len(lines)
+    except OSError:
+        pass
+
+def record_session_telemetry(session):
+    """Supervisor exit callback: append the session's summary to the stats file"""
+    summary = summarize_session(session)
+    session.pop('telemetry', None)
+    if not summary:
+        return
+    with TELEMETRY_LOCK:
+        try:
+            os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+            if TELEMETRY_STATE['lines'] is None:
+                try:
+                    with open(STATS_FILE, 'r', encoding='utf-8') as f:
+                        TELEMETRY_STATE['lines'] = sum(1 for _ in f)
+                except OSError:
+                    TELEMETRY_STATE['lines'] = 0
+            with open(STATS_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(summary, separators=(',', ':')) + "\n")
+            TELEMETRY_STATE['lines'] += 1
+        except OSError:
+            return
+        if TELEMETRY_STATE['lines'] > MAX_STATS_LINES * 2:
+            _compact_stats()
+
+def load_session_stats(game_path=None):
+    """Return the stored summaries, oldest first, optionally only for one game"""
+    summaries = []
+    try:
+        with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    summary = json.loads(line)
+                except ValueError:
+                    continue
+                if game_path is None or summary.get('game_path') == str(game_path):
+                    summaries.append(summary)
+    except OSError:
+        pass
+    return summaries
+
+def aggregate_by_emulator(summaries):
+    """
+    Group summaries by (system, emulator) and return the heaviest observed values per group:
+    {(system, emulator): {'sessions', 'cpu_p95', 'rss_max_mb', 'threads_max'}}
+    """
+    groups = {}
+    for summary in summaries:
+        key = (summary.get('system') or 'Unknown System', summary.get('emulator_name') or 'Unknown')
+        group = groups.setdefault(key, {'sessions': 0, 'cpu_p95': 0, 'rss_max_mb': 0, 'threads_max': 0})
+        group['sessions'] += 1
+        group['cpu_p95'] = max(group['cpu_p95'], summary['cpu_percent']['p95'])
+        group['rss_max_mb'] = max(group['rss_max_mb'], summary['rss_mb']['max'])
+        group['threads_max'] = max(group['threads_max'], summary['threads']['max'])
+    return groups
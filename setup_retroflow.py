@@ -53,7 +53,9 @@ def install_dependencies():
         "prompt-toolkit",
         "psutil", 
         "google-generativeai",
-        "playsound"
+        "playsound",
+        "py7zr",  # Optional: ROMs inside .7z archives are only listed with it
+        "numpy"  # Optional: 'similar' scores the library vectorized with it
     ]
     
     print("Installing Python dependencies...")
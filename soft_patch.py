@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Soft Patching
+Pairs IPS/BPS/UPS patches (translations, hacks) with the ROM next to them, lists each
+pair as a game of its own and applies the patch at launch with mmap. Patched images are
+cached by (base hash, patch hash) within a byte budget with least-recently-used eviction,
+so the library only stores the small patch files.
+
+A patched game is addressed by the patch's name with the ROM's extension:
+Games/Mother (Japan) [T-En].ips + Games/Mother (Japan).nes -> Games/Mother (Japan) [T-En].nes
+"""
+
+import os
+import json
+import mmap
+import shutil
+import zlib
+import threading
+
+from archive_cache import ARCHIVE_EXTENSIONS, SHEET_EXTENSIONS, split_archive_path
+from process_supervisor import running_sessions
+from rom_cache import sync_save_files, cached_rom_path
+from rom_hashing import get_rom_hashes
+
+SOFT_PATCH_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config", "soft_patch.json")
+DEFAULT_PATCH_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache", "Patched")
+PATCH_EXTENSIONS = ('.ips', '.bps', '.ups')
+STEM_SEPARATORS = ' _-.([{'  # A patch named "<ROM stem><separator>..." pairs with that ROM
+SAME_NAME_SUFFIX = " [Patched]"  # Added when the patch and the ROM share a stem
+
+DEFAULT_SOFT_PATCH_CONFIG = {
+    'enabled': True,
+    'directory': None,
+    'max_mb': 1024
+}
+
+CONFIG_CACHE = {'mtime': None, 'config': None}
+PATCHED_GAMES = {}  # patched game path -> {'base', 'patch'}
+PATCH_INFO_CACHE = {}  # patch path -> (size, mtime, {'format', 'source_size', 'target_size', 'source_crc'})
+CACHE_STATE = {'directory': None, 'entries': {}, 'hits': 0, 'builds': 0, 'evictions': 0}
+SOFT_PATCH_LOCK = threading.RLock()
+
+def get_soft_patch_config():
+    """Return the soft patching settings, merged with Config/soft_patch.json if present"""
+    try:
+        mtime = os.path.getmtime(SOFT_PATCH_CONFIG_FILE)
+    except OSError:
+        mtime = None
+
+    if CONFIG_CACHE['config'] is not None and CONFIG_CACHE['mtime'] == mtime:
+        return CONFIG_CACHE['config']
+
+    config = dict(DEFAULT_SOFT_PATCH_CONFIG)
+    if mtime is not None:
+        try:
+            with open(SOFT_PATCH_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            config.update({key: value for key, value in overrides.items() if key in DEFAULT_SOFT_PATCH_CONFIG})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    CONFIG_CACHE['mtime'] = mtime
+    CONFIG_CACHE['config'] = config
+    return config
+
+# --- Patch formats ---
+
+def _read_varint(data, position, end=None):
+    """Decode a BPS/UPS variable-length number ending before end; returns (value, new position)"""
+    end = len(data) if end is None else end
+    value, shift = 0, 1
+    while True:
+        if position >= end:
+            raise ValueError("truncated patch")
+        byte = data[position]
+        position += 1
+        value += (byte & 0x7F) * shift
+        if byte & 0x80:
+            return value, position
+        shift <<= 7
+        value += shift
+
+def _ips_records(patch):
+    """Parse IPS records: [(offset, data slice or None, rle length, rle byte)], truncate size or None"""
+    if patch[:5] != b'PATCH':
+        raise ValueError("not an IPS patch")
+    records = []
+    position = 5
+    while True:
+        if position + 3 > len(patch):
+            raise ValueError("truncated patch")
+        if patch[position:position + 3] == b'EOF':
+            position += 3
+            truncate = int.from_bytes(patch[position:position + 3], 'big') if position + 3 <= len(patch) else None
+            return records, truncate
+        if position + 5 > len(patch):
+            raise ValueError("truncated patch")
+        offset = int.from_bytes(patch[position:position + 3], 'big')
+        size = int.from_bytes(patch[position + 3:position + 5], 'big')
+        position += 5
+        if size:
+            if position + size > len(patch):
+                raise ValueError("truncated patch")
+            records.append((offset, patch[position:position + size], 0, 0))
+            position += size
+        else:
+            if position + 3 > len(patch):
+                raise ValueError("truncated patch")
+            records.append((offset, None, int.from_bytes(patch[position:position + 2], 'big'), patch[position + 2]))
+            position += 3
+
+def _patch_header(patch, magic):
+    """Read the BPS/UPS header: (source size, target size, position after it)"""
+    if patch[:4] != magic or len(patch) < 16:
+        raise ValueError(f"not a {magic[:3].decode()} patch")
+    source_size, position = _read_varint(patch, 4)
+    target_size, position = _read_varint(patch, position)
+    return source_size, target_size, position
+
+def read_patch_info(patch_path):
+    """Return {'format', 'source_size', 'target_size', 'source_crc'} for a patch (sizes/CRC None if unknown)"""
+    patch_path = str(patch_path)
+    stat = os.stat(patch_path)
+    with SOFT_PATCH_LOCK:
+        cached = PATCH_INFO_CACHE.get(patch_path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            return cached[2]
+
+    patch_format = os.path.splitext(patch_path)[1].lower()[1:]
+    with open(patch_path, 'rb') as f:
+        patch = f.read()
+    info = {'format': patch_format, 'source_size': None, 'target_size': None, 'source_crc': None}
+    if patch_format == 'ips':
+        records, truncate = _ips_records(patch)
+        ends = [offset + (len(data) if data is not None else length) for offset, data, length, _ in records]
+        info['min_target_size'] = max(ends, default=0)
+        info['target_size'] = truncate
+    else:
+        info['source_size'], info['target_size'], _ = _patch_header(patch, b'BPS1' if patch_format == 'bps' else b'UPS1')
+        info['source_crc'] = int.from_bytes(patch[-12:-8], 'little')
+    with SOFT_PATCH_LOCK:
+        PATCH_INFO_CACHE[patch_path] = (stat.st_size, stat.st_mtime, info)
+    return info
+
+def _apply_ips(source, patch, target_path):
+    records, truncate = _ips_records(patch)
+    ends = [offset + (len(data) if data is not None else length) for offset, data, length, _ in records]
+    target_size = truncate if truncate is not None else max([len(source)] + ends)
+    with open(target_path, 'w+b') as f:
+        f.write(source[:target_size])
+        f.truncate(target_size)
+        if not target_size:
+            return
+        with mmap.mmap(f.fileno(), target_size) as target:
+            for offset, data, length, value in records:
+                if offset >= target_size:
+                    continue
+                if data is not None:
+                    end = min(offset + len(data), target_size)
+                    target[offset:end] = data[:end - offset]
+                else:
+                    end = min(offset + length, target_size)
+                    target[offset:end] = bytes([value]) * (end - offset)
+
+def _apply_ups(source, patch, target_path):
+    source_size, target_size, position = _patch_header(patch, b'UPS1')
+    if len(source) != source_size or zlib.crc32(source) != int.from_bytes(patch[-12:-8], 'little'):
+        raise ValueError("the ROM is not the one this UPS patch was made for")
+    end_of_hunks = len(patch) - 12
+    with open(target_path, 'w+b') as f:
+        f.write(source[:target_size])
+        f.truncate(target_size)
+        if not target_size:
+            return
+        with mmap.mmap(f.fileno(), target_size) as target:
+            offset = 0
+            while position < end_of_hunks:
+                skip, position = _read_varint(patch, position, end_of_hunks)
+                offset += skip
+                # XOR bytes up to the next zero, which ends the hunk (and skips one byte)
+                hunk_end = patch.find(b'\0', position, end_of_hunks)
+                if hunk_end < 0:
+                    raise ValueError("truncated patch")
+                length = min(hunk_end - position, target_size - offset)
+                if length > 0:
+                    current = int.from_bytes(target[offset:offset + length], 'little')
+                    xor = int.from_bytes(patch[position:position + length], 'little')
+                    target[offset:offset + length] = (current ^ xor).to_bytes(length, 'little')
+                offset += hunk_end - position + 1
+                position = hunk_end + 1
+            if zlib.crc32(target) != int.from_bytes(patch[-8:-4], 'little'):
+                raise ValueError("UPS patch produced an image with the wrong checksum")
+
+def _apply_bps(source, patch, target_path):
+    source_size, target_size, position = _patch_header(patch, b'BPS1')
+    if len(source) != source_size or zlib.crc32(source) != int.from_bytes(patch[-12:-8], 'little'):
+        raise ValueError("the ROM is not the one this BPS patch was made for")
+    end_of_actions = len(patch) - 12
+    metadata_size, position = _read_varint(patch, position, end_of_actions)
+    position += metadata_size
+    if position > end_of_actions:
+        raise ValueError("truncated patch")
+    with open(target_path, 'w+b') as f:
+        f.truncate(target_size)
+        if not target_size:
+            return
+        with mmap.mmap(f.fileno(), target_size) as target:
+            output_offset = source_relative = target_relative = 0
+            while position < end_of_actions:
+                data, position = _read_varint(patch, position, end_of_actions)
+                command, length = data & 3, (data >> 2) + 1
+                if output_offset + length > target_size:
+                    raise ValueError("BPS patch writes past the end of the image")
+                if command == 0:  # SourceRead
+                    if output_offset + length > len(source):
+                        raise ValueError("BPS patch reads past the end of the ROM")
+                    target[output_offset:output_offset + length] = source[output_offset:output_offset + length]
+                elif command == 1:  # TargetRead
+                    if position + length > end_of_actions:
+                        raise ValueError("truncated patch")
+                    target[output_offset:output_offset + length] = patch[position:position + length]
+                    position += length
+                elif command == 2:  # SourceCopy
+                    delta, position = _read_varint(patch, position, end_of_actions)
+                    source_relative += -(delta >> 1) if delta & 1 else delta >> 1
+                    if source_relative < 0 or source_relative + length > len(source):
+                        raise ValueError("BPS patch reads past the end of the ROM")
+                    target[output_offset:output_offset + length] = source[source_relative:source_relative + length]
+                    source_relative += length
+                else:  # TargetCopy: may overlap the bytes being written, so copy in non-overlapping runs
+                    delta, position = _read_varint(patch, position, end_of_actions)
+                    target_relative += -(delta >> 1) if delta & 1 else delta >> 1
+                    distance = output_offset - target_relative
+                    if distance <= 0 or target_relative < 0:
+                        raise ValueError("invalid BPS TargetCopy")
+                    remaining, write_at = length, output_offset
+                    while remaining:
+                        run = min(remaining, distance)
+                        target[write_at:write_at + run] = target[target_relative:target_relative + run]
+                        target_relative += run
+                        write_at += run
+                        remaining -= run
+                output_offset += length
+            if zlib.crc32(target) != int.from_bytes(patch[-8:-4], 'little'):
+                raise ValueError("BPS patch produced an image with the wrong checksum")
+
+PATCHERS = {'.ips': _apply_ips, '.bps': _apply_bps, '.ups': _apply_ups}
+
+def apply_patch(base_path, patch_path, target_path):
+    """Write base_path patched with patch_path to target_path (ValueError for a bad or mismatched patch)"""
+    patcher = PATCHERS[os.path.splitext(str(patch_path))[1].lower()]
+    with open(base_path, 'rb') as base_file, open(patch_path, 'rb') as patch_file:
+        # Empty files cannot be mapped
+        source = mmap.mmap(base_file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(base_file.fileno()).st_size else b''
+        patch = mmap.mmap(patch_file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(patch_file.fileno()).st_size else b''
+        try:
+            patcher(source, patch, target_path)
+        except (IndexError, OverflowError) as e:
+            raise ValueError(f"malformed patch: {e}") from e
+        finally:
+            for mapping in (source, patch):
+                if isinstance(mapping, mmap.mmap):
+                    mapping.close()
+
+# --- Discovery ---
+
+def _pick_base(patch_filename, rom_filenames, directory):
+    """Pick the ROM a patch belongs to: the longest ROM stem the patch name starts with"""
+    patch_stem = os.path.splitext(patch_filename)[0]
+    candidates = []
+    for rom_filename in rom_filenames:
+        rom_stem = os.path.splitext(rom_filename)[0]
+        if patch_stem == rom_stem or (patch_stem.startswith(rom_stem) and patch_stem[len(rom_stem)] in STEM_SEPARATORS):
+            candidates.append(rom_filename)
+    if len(candidates) > 1:
+        # BPS/UPS record the size of their source ROM; use it to tell same-named dumps apart
+        try:
+            source_size = read_patch_info(os.path.join(directory, patch_filename))['source_size']
+        except (OSError, ValueError):
+            source_size = None
+        if source_size is not None:
+            sized = [name for name in candidates if os.path.getsize(os.path.join(directory, name)) == source_size]
+            candidates = sized or candidates
+    return max(candidates, key=lambda name: len(os.path.splitext(name)[0]), default=None)
+
+def find_patched_games(directory, filenames, is_supported_extension):
+    """
+    Pair the patches among filenames (one directory's files) with their ROMs and return the
+    paths of the patched games; the pairs are remembered for launching
+    """
+    if not get_soft_patch_config()['enabled']:
+        return []
+    directory = str(directory)
+    patch_filenames = [name for name in filenames if os.path.splitext(name)[1].lower() in PATCH_EXTENSIONS]
+    if not patch_filenames:
+        return []
+    # Archives and cue sheets are containers, not images a patch can apply to
+    rom_filenames = [name for name in filenames
+                     if is_supported_extension(os.path.splitext(name)[1].lower())
+                     and os.path.splitext(name)[1].lower() not in ARCHIVE_EXTENSIONS + SHEET_EXTENSIONS]
+
+    patched_games = []
+    for patch_filename in sorted(patch_filenames):
+        base_filename = _pick_base(patch_filename, rom_filenames, directory)
+        if not base_filename:
+            continue
+        patch_stem = os.path.splitext(patch_filename)[0]
+        base_stem, extension = os.path.splitext(base_filename)
+        game_filename = (patch_stem + SAME_NAME_SUFFIX if patch_stem == base_stem else patch_stem) + extension
+        if game_filename in filenames:
+            continue  # Already patched by hand
+        game_path = os.path.join(directory, game_filename)
+        with SOFT_PATCH_LOCK:
+            PATCHED_GAMES[game_path] = {'base': os.path.join(directory, base_filename),
+                                        'patch': os.path.join(directory, patch_filename)}
+        patched_games.append(game_path)
+    return patched_games
+
+def get_patched_game(path):
+    """Return {'base', 'patch'} for a patched game path, or None for any other ROM"""
+    with SOFT_PATCH_LOCK:
+        return PATCHED_GAMES.get(str(path))
+
+def game_source_files(path):
+    """
+    The files a game is read from when it launches: a patched game's base ROM and patch, the
+    archive of an archived ROM, or the local copy of a cached cartridge ROM (for prefetching)
+    """
+    patched_game = get_patched_game(path)
+    if patched_game:
+        return game_source_files(patched_game['base']) + [patched_game['patch']]
+    archive_path = split_archive_path(path)[0]
+    if archive_path:
+        return [archive_path]
+    return [cached_rom_path(path) or str(path)]
+
+def patched_rom_size(path):
+    """Size of a patched game's image, or None if path is not a patched game"""
+    patched_game = get_patched_game(path)
+    if not patched_game:
+        return None
+    base_size = os.path.getsize(patched_game['base'])
+    try:
+        info = read_patch_info(patched_game['patch'])
+    except ValueError:
+        return base_size  # Reported when the game is launched
+    if info['target_size'] is not None:
+        return info['target_size']
+    return max(base_size, info.get('min_target_size', 0))
+
+# --- Patched image cache ---
+
+def file_sha1(path):
+    """SHA-1 of a file, from the shared ROM hash cache"""
+    hashes = get_rom_hashes(path)
+    if hashes is None:
+        raise FileNotFoundError(f"cannot read {path}")
+    return hashes['sha1']
+
+def _cache_directory():
+    """Return the patched image cache directory, picking up earlier entries on first use (lock held)"""
+    directory = get_soft_patch_config()['directory'] or DEFAULT_PATCH_CACHE_DIRECTORY
+    if CACHE_STATE['directory'] != directory:
+        os.makedirs(directory, exist_ok=True)
+        CACHE_STATE['directory'] = directory
+        entries = CACHE_STATE['entries'] = {}
+        for name in os.listdir(directory):
+            entry_path = os.path.join(directory, name)
+            if name.endswith('.partial'):
+                shutil.rmtree(entry_path, ignore_errors=True)
+            elif os.path.isdir(entry_path):
+                entries[name] = sum(os.path.getsize(os.path.join(entry_path, filename)) for filename in os.listdir(entry_path))
+    return directory
+
+def _evict_until_fits(directory, needed_bytes, keep_key):
+    """Delete least recently used images until needed_bytes fits, keeping ones in use (lock held)"""
+    entries = CACHE_STATE['entries']
+    budget = get_soft_patch_config()['max_mb'] * 1024 * 1024
+    if sum(entries.values()) + needed_bytes <= budget:
+        return
+    in_use = {keep_key}
+    for session in running_sessions():
+        local_path = session.get('patched_image')
+        if local_path:
+            in_use.add(os.path.basename(os.path.dirname(local_path)))
+
+    def last_used(key):
+        try:
+            return os.path.getmtime(os.path.join(directory, key))
+        except OSError:
+            return 0
+
+    for key in sorted(entries, key=last_used):
+        if sum(entries.values()) + needed_bytes <= budget:
+            break
+        if key in in_use:
+            continue
+        shutil.rmtree(os.path.join(directory, key), ignore_errors=True)
+        if not os.path.exists(os.path.join(directory, key)):
+            del entries[key]
+            CACHE_STATE['evictions'] += 1
+
+def build_patched_rom(path):
+    """
+    Return the patched image of a patched game, building it on the first launch.
+    Raises OSError if a file is missing and ValueError if the patch is bad or made for another ROM.
+    """
+    patched_game = get_patched_game(path)
+    if not patched_game:
+        return str(path)
+    key = f"{file_sha1(patched_game['base'])[:16]}-{file_sha1(patched_game['patch'])[:16]}"
+    game_filename = os.path.basename(str(path))
+    with SOFT_PATCH_LOCK:
+        directory = _cache_directory()
+        entry_path = os.path.join(directory, key)
+        image_path = os.path.join(entry_path, game_filename)
+        cached = key in CACHE_STATE['entries'] and os.path.isfile(image_path)
+        if cached:
+            os.utime(entry_path)  # Mark as most recently used
+            CACHE_STATE['hits'] += 1
+
+    if not cached:
+        # Patch outside the lock so listing and other launches are not held up; each build
+        # writes to its own partial directory and only registering the image is locked
+        partial_path = f"{entry_path}.{os.getpid()}-{threading.get_ident()}.partial"
+        shutil.rmtree(partial_path, ignore_errors=True)
+        os.makedirs(partial_path)
+        try:
+            apply_patch(patched_game['base'], patched_game['patch'], os.path.join(partial_path, game_filename))
+            with SOFT_PATCH_LOCK:
+                if key in CACHE_STATE['entries'] and os.path.isfile(image_path):
+                    CACHE_STATE['hits'] += 1  # Built by another launch meanwhile
+                else:
+                    _evict_until_fits(directory, os.path.getsize(os.path.join(partial_path, game_filename)), key)
+                    shutil.rmtree(entry_path, ignore_errors=True)
+                    os.replace(partial_path, entry_path)
+                    CACHE_STATE['entries'][key] = os.path.getsize(image_path)
+                    CACHE_STATE['builds'] += 1
+        finally:
+            shutil.rmtree(partial_path, ignore_errors=True)
+    # Saves are kept next to the patch; bring them to the image before the emulator starts
+    sync_save_files(os.path.dirname(patched_game['patch']), entry_path, os.path.splitext(game_filename)[0], game_filename,
+                    PATCH_EXTENSIONS)
+    return image_path
+
+def mark_patched_session(session, image_path):
+    """Remember on a session which patched image it runs, so its saves are written back on exit"""
+    if get_patched_game(session.get('game_path')):
+        session['patched_image'] = image_path
+
+def record_session_patch_saves(session):
+    """Supervisor exit callback: copy saves made next to a patched image back next to its patch"""
+    image_path = session.get('patched_image')
+    patched_game = get_patched_game(session.get('game_path'))
+    if not image_path or not patched_game:
+        return
+    game_filename = os.path.basename(image_path)
+    sync_save_files(os.path.dirname(image_path), os.path.dirname(patched_game['patch']),
+                    os.path.splitext(game_filename)[0], game_filename, PATCH_EXTENSIONS)
+
+def get_patch_cache_stats():
+    """Return the cache directory, its size and budget, and the hit/build/eviction counters"""
+    config = get_soft_patch_config()
+    with SOFT_PATCH_LOCK:
+        directory = _cache_directory()
+        return {
+            'enabled': config['enabled'],
+            'directory': directory,
+            'patched_games': len(PATCHED_GAMES),
+            'entries': len(CACHE_STATE['entries']),
+            'bytes': sum(CACHE_STATE['entries'].values()),
+            'budget_bytes': config['max_mb'] * 1024 * 1024,
+            'hits': CACHE_STATE['hits'],
+            'builds': CACHE_STATE['builds'],
+            'evictions': CACHE_STATE['evictions']
+        }
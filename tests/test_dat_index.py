@@ -0,0 +1,113 @@
+"""Tests for the Logiqx XML and ClrMamePro DAT parsers and the binary index in dat_index.py"""
+
+import os
+
+import pytest
+
+import dat_index
+
+XML_DAT = """<?xml version="1.0"?>
+<!DOCTYPE datafile PUBLIC "-//Logiqx//DTD ROM Management Datafile//EN" "http://www.logiqx.com/dtds/datafile.dtd">
+<datafile>
+    <header>
+        <name>Nintendo - Game Boy (Parent-Clone)</name>
+    </header>
+    <game name="Tetris (World) (Rev 1)">
+        <description>Tetris (World) (Rev 1)</description>
+        <rom name="Tetris (World) (Rev 1).gb" size="32768" crc="46df91ad" sha1="74591cc9501af93873f9a5d3eb12da12c0723bbc"/>
+    </game>
+    <game name="Legend of Zelda, The - Link's Awakening (USA, Europe)">
+        <rom name="Legend of Zelda, The - Link's Awakening (USA, Europe).gb" size="524288" crc="D5ECF6D5"/>
+    </game>
+    <game name="No Hashes (USA)">
+        <rom name="No Hashes (USA).gb" size="1024"/>
+    </game>
+</datafile>
+"""
+
+CLRMAMEPRO_DAT = """clrmamepro (
+\tname "Sega - Mega Drive - Genesis"
+\tdescription "Sega - Mega Drive - Genesis"
+)
+
+game (
+\tname "Sonic The Hedgehog (USA, Europe)"
+\tdescription "Sonic The Hedgehog (USA, Europe)"
+\trom ( name "Sonic The Hedgehog (USA, Europe).md" size 524288 crc F9394E97 sha1 6DDB7DE1E17E7F6CDB88927BD906352030DAA194 )
+)
+
+game (
+\tname "Streets of Rage 2 (USA)"
+\trom ( name "Streets of Rage 2 (USA).md" size 2097152 crc E01FA526 )
+)
+"""
+
+@pytest.fixture
+def dat_directory(tmp_path, monkeypatch):
+    """An empty Config/DATs and index location, with a fresh index state"""
+    directory = tmp_path / "DATs"
+    directory.mkdir()
+    monkeypatch.setattr(dat_index, 'DAT_DIRECTORY', str(directory))
+    monkeypatch.setattr(dat_index, 'DAT_INDEX_FILE', str(tmp_path / "Cache" / "dat_index.bin"))
+    monkeypatch.setattr(dat_index, 'INDEX_STATE', {'index': None, 'checked_at': 0.0, 'version': 0})
+    yield directory
+    with dat_index.DAT_INDEX_LOCK:
+        dat_index._close_index()
+
+def test_parse_logiqx_xml(tmp_path):
+    path = tmp_path / "gb.dat"
+    path.write_text(XML_DAT, encoding='utf-8')
+    records = list(dat_index.parse_dat_file(str(path)))
+    assert [record['name'] for record in records] == ["Tetris (World) (Rev 1)",
+                                                     "Legend of Zelda, The - Link's Awakening (USA, Europe)"]
+    assert records[0] == {'name': "Tetris (World) (Rev 1)", 'system': "Nintendo - Game Boy", 'size': 32768,
+                          'crc': 0x46DF91AD, 'sha1': "74591cc9501af93873f9a5d3eb12da12c0723bbc"}
+    assert records[1]['sha1'] is None
+
+def test_parse_clrmamepro(tmp_path):
+    path = tmp_path / "md.dat"
+    path.write_text(CLRMAMEPRO_DAT, encoding='utf-8')
+    records = list(dat_index.parse_dat_file(str(path)))
+    assert [record['name'] for record in records] == ["Sonic The Hedgehog (USA, Europe)", "Streets of Rage 2 (USA)"]
+    assert records[0]['system'] == "Sega - Mega Drive - Genesis"
+    assert records[0]['size'] == 524288 and records[0]['crc'] == 0xF9394E97
+    assert records[0]['sha1'] == "6ddb7de1e17e7f6cdb88927bd906352030daa194"
+
+def test_malformed_xml_raises_value_error(tmp_path):
+    path = tmp_path / "broken.dat"
+    path.write_text(XML_DAT[:XML_DAT.index("<rom")], encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(dat_index.parse_dat_file(str(path)))
+
+def test_index_lookups(dat_directory):
+    (dat_directory / "gb.dat").write_text(XML_DAT, encoding='utf-8')
+    (dat_directory / "md.dat").write_text(CLRMAMEPRO_DAT, encoding='utf-8')
+    entries, errors = dat_index.build_dat_index()
+    assert (entries, errors) == (4, {})
+
+    tetris = dat_index.lookup_sha1("74591cc9501af93873f9a5d3eb12da12c0723bbc")
+    assert tetris['title'] == "Tetris" and tetris['region'] == "World"
+    assert tetris['system'] == "Game Boy" and tetris['dat_system'] == "Nintendo - Game Boy"
+
+    zelda = dat_index.lookup_crc("d5ecf6d5", 524288)
+    assert zelda['title'] == "The Legend of Zelda - Link's Awakening" and zelda['region'] == "USA, Europe"
+    assert dat_index.lookup_crc(0xD5ECF6D5, 1) is None  # Same CRC, other size
+
+    sonic = dat_index.lookup_crc(0xF9394E97)
+    assert sonic['system'] == "Sega Genesis"
+    assert dat_index.lookup_sha1("0" * 40) is None
+    assert dat_index.get_dat_index_stats()['sources'] == ["gb.dat", "md.dat"]
+
+def test_dat_overwritten_in_place_is_reindexed(dat_directory, monkeypatch):
+    dat_path = dat_directory / "md.dat"
+    dat_path.write_text(CLRMAMEPRO_DAT, encoding='utf-8')
+    assert dat_index.lookup_crc(0xF9394E97)['title'] == "Sonic The Hedgehog"
+
+    dat_path.write_text(CLRMAMEPRO_DAT.replace("Sonic The Hedgehog", "Sonic 1"), encoding='utf-8')
+    os.utime(dat_path, (1, 1))  # A new mtime even on filesystems with coarse timestamps
+    monkeypatch.setitem(dat_index.INDEX_STATE, 'checked_at', 0.0)
+    assert dat_index.lookup_crc(0xF9394E97)['title'] == "Sonic 1"
+
+def test_unknown_dat_system_loses_maker_prefix():
+    assert dat_index.dat_system_name("Bandai - WonderSwan Color") == "WonderSwan Color"
+    assert dat_index.dat_system_name("Nintendo - Super Nintendo Entertainment System") == "Super Nintendo"
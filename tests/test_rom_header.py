@@ -0,0 +1,91 @@
+"""Tests for the NES, SNES, Game Boy and GBA header parsers in rom_header.py"""
+
+import struct
+import zipfile
+
+import pytest
+
+import rom_header
+
+def ines_image(nes2=False):
+    flags7 = 0x1A if nes2 else 0x10  # Mapper high nibble 1; NES 2.0 marker and PlayChoice-10
+    return b'NES\x1a' + bytes([2, 1, 0x42, flags7, 0x01 if nes2 else 0]) + bytes(7) + bytes(0x8000)
+
+def snes_image(copier_header=False):
+    image = bytearray(0x8000)
+    header = bytearray(b'SUPER METROID'.ljust(0x15, b' '))
+    header += bytes([0x20, 0x02, 0x0C, 0x00, 0x01, 0x33, 0x00])  # LoROM, ROM+RAM+battery, 4 MB, USA
+    checksum = 0x1234
+    header += struct.pack('<HH', checksum ^ 0xFFFF, checksum)
+    image[0x7FC0:0x7FE0] = header
+    return (bytes(0x200) if copier_header else b'') + bytes(image)
+
+def gb_image(cgb_flag=0x00):
+    image = bytearray(0x8000)
+    image[0x104:0x10C] = rom_header.NINTENDO_LOGO_START
+    image[0x134:0x13F] = b'POKEMON CRY'
+    image[0x143] = cgb_flag
+    image[0x146] = 0x03
+    image[0x147] = 0x10  # MBC3+TIMER+RAM+BATTERY
+    image[0x148] = 0x06
+    checksum = 0
+    for byte in image[0x134:0x14D]:
+        checksum = (checksum - byte - 1) & 0xFF
+    image[0x14D] = checksum
+    return bytes(image)
+
+def gba_image():
+    image = bytearray(0x200)
+    image[0x04:0x0C] = rom_header.GBA_LOGO_START
+    image[0xA0:0xAC] = b'POKEMON EMER'
+    image[0xAC:0xB0] = b'BPEE'
+    image[0xB0:0xB2] = b'01'
+    image[0xB2] = 0x96
+    image[0xBD] = (-sum(image[0xA0:0xBD]) - 0x19) & 0xFF
+    return bytes(image)
+
+def test_ines():
+    header = rom_header.parse_header_bytes(ines_image(), 0x8010, '.nes')
+    assert header['format'] == 'iNES' and header['mapper'] == 0x14
+    assert header['prg_rom_kb'] == 32 and header['chr_rom_kb'] == 8 and header['battery']
+
+def test_nes2_console_type():
+    header = rom_header.parse_header_bytes(ines_image(nes2=True), 0x8010, '.nes')
+    assert header['format'] == 'NES 2.0' and header['variant'] == 'PlayChoice-10'
+    assert header['mapper'] == 0x114  # Mapper bits 8-11 from byte 8
+
+@pytest.mark.parametrize("copier_header", [False, True])
+def test_snes_lorom(copier_header):
+    image = snes_image(copier_header)
+    header = rom_header.parse_header_bytes(image, len(image), '.sfc')
+    assert header['title'] == 'SUPER METROID' and header['mapper'] == rom_header.SNES_MAP_MODES[0x20]
+    assert header['checksum_valid'] and header['copier_header'] == copier_header
+
+@pytest.mark.parametrize("cgb_flag, system", [(0x00, 'Game Boy'), (0x80, 'Game Boy Color'), (0xC0, 'Game Boy Color')])
+def test_game_boy_system_from_cgb_flag(cgb_flag, system):
+    header = rom_header.parse_header_bytes(gb_image(cgb_flag), 0x8000, '.gb')
+    assert header['system'] == system and header['checksum_valid']
+    assert 'Super Game Boy' in header['variant']
+
+def test_gba():
+    header = rom_header.parse_header_bytes(gba_image(), 0x200, '.gba')
+    assert header['title'] == 'POKEMON EMER' and header['game_code'] == 'BPEE' and header['checksum_valid']
+
+def test_signature_parsers_for_unknown_extension():
+    assert rom_header.parse_header_bytes(gba_image(), 0x200, '.bin')['system'] == 'Game Boy Advance'
+
+@pytest.mark.parametrize("image, extension", [
+    (ines_image()[:15], '.nes'), (snes_image()[:0x7FD0], '.sfc'), (gb_image()[:0x14F], '.gb'),
+    (gba_image()[:0xBF], '.gba'), (bytes(64), '.gb')
+])
+def test_truncated_or_missing_headers_return_none(image, extension):
+    assert rom_header.parse_header_bytes(image, len(image), extension) is None
+
+def test_read_rom_header_from_file_and_zip(tmp_path):
+    (tmp_path / "game.gbc").write_bytes(gb_image(0xC0))
+    assert rom_header.read_rom_header(tmp_path / "game.gbc")['system'] == 'Game Boy Color'
+    with zipfile.ZipFile(tmp_path / "games.zip", 'w') as archive:
+        archive.writestr("game.gba", gba_image())
+    assert rom_header.read_rom_header(f"{tmp_path / 'games.zip'}/game.gba")['format'] == 'Game Boy Advance'
+    (tmp_path / "empty.nes").write_bytes(b'')
+    assert rom_header.read_rom_header(tmp_path / "empty.nes") is None
@@ -0,0 +1,65 @@
+"""Tests for ROM name tag parsing, filtering and sorting in rom_tags.py"""
+
+import pytest
+
+import rom_tags
+
+def test_parse_no_intro_name():
+    tags = rom_tags.parse_rom_name("Tetris (USA, Europe) (En,Fr) (Rev 1) [!]")
+    assert tags['title'] == "Tetris"
+    assert tags['regions'] == ['USA', 'Europe']
+    assert tags['languages'] == ['En', 'Fr']
+    assert tags['revision'] == '1'
+    assert tags['flags'] == ['verified']
+
+def test_parse_goodtools_name():
+    tags = rom_tags.parse_rom_name("Sonic (UE) [b1]")
+    assert tags['regions'] == ['USA', 'Europe']
+    assert tags['flags'] == ['bad dump']
+
+def test_single_language_tag_is_a_language():
+    tags = rom_tags.parse_rom_name("Asterix (Europe) (Fr)")
+    assert tags['regions'] == ['Europe']
+    assert tags['languages'] == ['Fr']
+    assert rom_tags.parse_rom_name("Tetris (Fr)")['regions'] == []
+    assert rom_tags.rom_matches(tags, language='fr')
+
+def test_numbered_revisions_sort_before_lettered_ones():
+    ranks = sorted(['A', '2', None, '1', 'B'], key=rom_tags._revision_rank)
+    assert ranks == ['2', '1', 'B', 'A', None]
+
+def test_longer_version_sorts_first():
+    assert rom_tags._revision_rank('v1.1') < rom_tags._revision_rank('v1') < rom_tags._revision_rank(None)
+
+def test_sort_key_prefers_region_good_dump_and_revision():
+    names = [
+        "Zelda (Japan).gb",
+        "Zelda (USA) [b1].gb",
+        "Zelda (USA).gb",
+        "Zelda (USA) (Rev 2).gb",
+        "Zelda (USA) (Rev A).gb",
+        "Aladdin (Europe).gb",
+    ]
+    assert sorted(names, key=rom_tags.rom_sort_key) == [
+        "Aladdin (Europe).gb",
+        "Zelda (USA) (Rev 2).gb",
+        "Zelda (USA) (Rev A).gb",
+        "Zelda (USA).gb",
+        "Zelda (USA) [b1].gb",
+        "Zelda (Japan).gb",
+    ]
+
+def test_rom_matches_filters():
+    tags = rom_tags.get_rom_tags("Tetris (USA, Europe) (En,Fr) [h1C].gb")
+    assert rom_tags.rom_matches(tags, region='europe', language='FR')
+    assert not rom_tags.rom_matches(tags, region='Japan')
+    assert not rom_tags.rom_matches(tags, good_only=True)
+
+def test_split_tag_filters():
+    text, filters = rom_tags.split_tag_filters("super mario --region usa --good world")
+    assert text == "super mario world"
+    assert filters == {'region': 'usa', 'language': None, 'good_only': True}
+
+def test_split_tag_filters_needs_values():
+    with pytest.raises(ValueError):
+        rom_tags.split_tag_filters("mario --language")
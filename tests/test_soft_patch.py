@@ -0,0 +1,120 @@
+"""Regression tests for the IPS/UPS/BPS readers and appliers in soft_patch.py"""
+
+import zlib
+
+import pytest
+
+pytest.importorskip("psutil")  # soft_patch reaches psutil through the launch modules
+
+import soft_patch
+
+SOURCE = bytes(range(32))
+
+def varint(number):
+    """Encode a BPS/UPS variable-length number"""
+    encoded = bytearray()
+    while True:
+        low = number & 0x7F
+        number >>= 7
+        if not number:
+            encoded.append(0x80 | low)
+            return bytes(encoded)
+        encoded.append(low)
+        number -= 1
+
+def with_checksums(body, source, target):
+    body += zlib.crc32(source).to_bytes(4, 'little') + zlib.crc32(target).to_bytes(4, 'little')
+    return body + zlib.crc32(body).to_bytes(4, 'little')
+
+def ips_patch():
+    # Write b'\xaa\xbb' at 2, an RLE run of four 0xff at 8, and grow the image to 40 bytes
+    return (b'PATCH' + (2).to_bytes(3, 'big') + (2).to_bytes(2, 'big') + b'\xaa\xbb'
+            + (8).to_bytes(3, 'big') + b'\0\0' + (4).to_bytes(2, 'big') + b'\xff'
+            + (36).to_bytes(3, 'big') + (4).to_bytes(2, 'big') + b'WXYZ' + b'EOF')
+
+def ips_target():
+    target = bytearray(SOURCE) + bytearray(8)
+    target[2:4] = b'\xaa\xbb'
+    target[8:12] = b'\xff' * 4
+    target[36:40] = b'WXYZ'
+    return bytes(target)
+
+def ups_patch(source, target):
+    # One hunk: skip 4 bytes, then XOR three bytes
+    xor = bytes(a ^ b for a, b in zip(source[4:7], target[4:7]))
+    body = b'UPS1' + varint(len(source)) + varint(len(target)) + varint(4) + xor + b'\0'
+    return with_checksums(body, source, target)
+
+def bps_patch(source, target):
+    # SourceRead 4 bytes, TargetRead 4 bytes, SourceCopy the rest from offset 8
+    actions = varint((4 - 1) << 2 | 0) + varint((4 - 1) << 2 | 1) + target[4:8]
+    actions += varint((len(target) - 8 - 1) << 2 | 2) + varint(8 << 1)
+    body = b'BPS1' + varint(len(source)) + varint(len(target)) + varint(0) + actions
+    return with_checksums(body, source, target)
+
+def patched_target():
+    return SOURCE[:4] + b'\x10\x20\x30' + SOURCE[7:]
+
+def apply(tmp_path, name, patch):
+    base_path = tmp_path / "game.nes"
+    base_path.write_bytes(SOURCE)
+    patch_path = tmp_path / name
+    patch_path.write_bytes(patch)
+    target_path = tmp_path / "patched.nes"
+    soft_patch.apply_patch(base_path, patch_path, target_path)
+    return target_path.read_bytes()
+
+def test_ips_applies_data_and_rle_records(tmp_path):
+    assert apply(tmp_path, "game.ips", ips_patch()) == ips_target()
+
+def test_ips_truncate_extension(tmp_path):
+    assert apply(tmp_path, "game.ips", b'PATCH' + b'EOF' + (16).to_bytes(3, 'big')) == SOURCE[:16]
+
+def test_ups_applies_xor_hunks(tmp_path):
+    assert apply(tmp_path, "game.ups", ups_patch(SOURCE, patched_target())) == patched_target()
+
+def test_bps_applies_actions(tmp_path):
+    target = SOURCE[:4] + b'BPS!' + SOURCE[8:]
+    assert apply(tmp_path, "game.bps", bps_patch(SOURCE, target)) == target
+
+def test_read_patch_info(tmp_path):
+    (tmp_path / "game.ips").write_bytes(ips_patch())
+    (tmp_path / "game.bps").write_bytes(bps_patch(SOURCE, SOURCE))
+    ips_info = soft_patch.read_patch_info(tmp_path / "game.ips")
+    assert ips_info['min_target_size'] == 40 and ips_info['target_size'] is None
+    bps_info = soft_patch.read_patch_info(tmp_path / "game.bps")
+    assert bps_info['source_size'] == len(SOURCE) and bps_info['source_crc'] == zlib.crc32(SOURCE)
+
+@pytest.mark.parametrize("name, patch", [
+    ("game.ips", ips_patch()[:-3]),  # No EOF marker
+    ("game.ips", ips_patch()[:11]),  # Cut inside a data record
+    ("game.ips", ips_patch()[:14]),  # Cut inside a record header
+    ("game.ips", ips_patch()[:19]),  # Cut inside an RLE record
+    ("game.ups", ups_patch(SOURCE, patched_target())[:-14]),
+    ("game.bps", bps_patch(SOURCE, SOURCE[:4] + b'BPS!' + SOURCE[8:])[:-14]),
+])
+def test_truncated_patches_raise_value_error(tmp_path, name, patch):
+    with pytest.raises(ValueError):
+        apply(tmp_path, name, patch)
+
+@pytest.mark.parametrize("length", [11, 14, 19])
+def test_truncated_ips_info_raises_value_error(tmp_path, length):
+    (tmp_path / "game.ips").write_bytes(ips_patch()[:length])
+    with pytest.raises(ValueError, match="truncated patch"):
+        soft_patch.read_patch_info(tmp_path / "game.ips")
+
+def test_patch_for_another_rom_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        apply(tmp_path, "game.bps", bps_patch(SOURCE[::-1], SOURCE))
+
+def test_truncated_ips_does_not_break_listing(tmp_path):
+    (tmp_path / "game.nes").write_bytes(SOURCE)
+    (tmp_path / "game.ips").write_bytes(ips_patch()[:19])  # Cut inside an RLE record
+    games = soft_patch.find_patched_games(tmp_path, ["game.nes", "game.ips"], lambda extension: extension == '.nes')
+    assert games == [str(tmp_path / "game [Patched].nes")]
+    assert soft_patch.patched_rom_size(games[0]) == len(SOURCE)
+
+def test_archives_and_sheets_are_not_patch_bases(tmp_path):
+    filenames = ["game.zip", "game.cue", "game.ips"]
+    supported = lambda extension: extension in ('.zip', '.cue')
+    assert soft_patch.find_patched_games(tmp_path, filenames, supported) == []
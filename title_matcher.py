@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Title Matcher
+Finds which of many known titles occur in a game name with an Aho-Corasick automaton:
+compiled once from the keys, then a single pass over the name finds the longest key it
+contains, however many keys there are.
+"""
+
+def compile_title_matcher(keys):
+    """
+    Compile keys (any iterable of strings, e.g. a dict of titles) into a matcher.
+    Keys are matched case-insensitively; if two keys differ only in case the first wins.
+    """
+    matcher = {'keys': [], 'goto': [{}], 'fail': [0], 'output': [-1]}
+    goto, output = matcher['goto'], matcher['output']
+    for key in keys:
+        pattern = key.lower()
+        if not pattern:
+            continue
+        node = 0
+        for char in pattern:
+            child = goto[node].get(char)
+            if child is None:
+                child = len(goto)
+                goto[node][char] = child
+                goto.append({})
+                output.append(-1)
+            node = child
+        if output[node] == -1:
+            output[node] = len(matcher['keys'])
+        matcher['keys'].append(key)
+
+    # Failure links in breadth-first order; each node also inherits the longest key ending
+    # at its failure target, since a key ending at a node's own depth is always longer
+    fail = matcher['fail'] = [0] * len(goto)
+    queue = list(goto[0].values())
+    for node in queue:
+        for char, child in goto[node].items():
+            target = fail[node]
+            while target and char not in goto[target]:
+                target = fail[target]
+            fail[child] = goto[target].get(char, 0) if node else 0
+            if output[child] == -1:
+                output[child] = output[fail[child]]
+            queue.append(child)
+    return matcher
+
+def find_longest_title(matcher, text):
+    """Return the longest key contained in text (the first one found on a tie), or None"""
+    goto, fail, output, keys = matcher['goto'], matcher['fail'], matcher['output'], matcher['keys']
+    node = 0
+    best = -1
+    for char in text.lower():
+        while node and char not in goto[node]:
+            node = fail[node]
+        node = goto[node].get(char, 0)
+        found = output[node]
+        if found != -1 and (best == -1 or len(keys[found]) > len(keys[best])):
+            best = found
+    return keys[best] if best != -1 else None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Title Search
+Finds games by approximate title with a trigram index: each cleaned title is split into
+overlapping three-character grams, and each gram maps to the games containing it. A query
+only visits the games sharing a gram with it, so typos ("zelad", "mraio kart") still match
+and a search stays fast however large the library grows. The index is kept up to date
+incrementally: only games that were added, renamed or removed are re-indexed.
+"""
+
+import re
+import math
+import heapq
+import threading
+
+SEARCH_MIN_SCORE = 0.35  # Matches scoring below this are not worth showing
+SEARCH_MIN_COVERAGE = 0.4  # Share of the query's trigrams a title must contain to be considered
+SEARCH_LIMIT = 10
+
+SEARCH_INDEX = {'titles': {}, 'grams': {}}  # key -> (title, normalized title, grams); gram -> set of keys
+SEARCH_LOCK = threading.Lock()
+
+def normalize_title(text):
+    """Lowercase words of letters and digits only: 'Super Mario Bros. 3' -> 'super mario bros 3'"""
+    return ' '.join(re.findall(r'[^\W_]+', text.lower()))
+
+def title_trigrams(text):
+    """Trigrams of each word, padded so word starts and ends count: 'ab' -> {'  a', ' ab', 'ab '}"""
+    grams = set()
+    for word in normalize_title(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+def _unindex(key):
+    """Remove a key's grams from the postings (lock held)"""
+    grams = SEARCH_INDEX['titles'].pop(key)[2]
+    postings = SEARCH_INDEX['grams']
+    for gram in grams:
+        keys = postings[gram]
+        keys.discard(key)
+        if not keys:
+            del postings[gram]
+
+def set_title(key, title):
+    """Index (or re-index) one game's title under key, e.g. its path"""
+    with SEARCH_LOCK:
+        current = SEARCH_INDEX['titles'].get(key)
+        if current and current[0] == title:
+            return
+        if current:
+            _unindex(key)
+        grams = title_trigrams(title)
+        SEARCH_INDEX['titles'][key] = (title, normalize_title(title), grams)
+        for gram in grams:
+            SEARCH_INDEX['grams'].setdefault(gram, set()).add(key)
+
+def remove_title(key):
+    """Drop a game from the index"""
+    with SEARCH_LOCK:
+        if key in SEARCH_INDEX['titles']:
+            _unindex(key)
+
+def sync_titles(titles):
+    """
+    Bring the index in line with {key: title} for the whole library, touching only the
+    entries that were added, renamed or removed. Returns (added or renamed, removed) counts.
+    """
+    with SEARCH_LOCK:
+        indexed = SEARCH_INDEX['titles']
+        removed = [key for key in indexed if key not in titles]
+        changed = [key for key, title in titles.items() if key not in indexed or indexed[key][0] != title]
+    for key in removed:
+        remove_title(key)
+    for key in changed:
+        set_title(key, titles[key])
+    return len(changed), len(removed)
+
+def search_titles(query, limit=SEARCH_LIMIT, min_score=SEARCH_MIN_SCORE, match=None):
+    """
+    Return up to limit (key, title, score) matches for query, best first. The score (0-1+)
+    weighs how much of the query a title contains over how similar the two are overall;
+    titles containing the query as written score above 1. match, if given, keeps only the
+    keys it returns True for.
+    """
+    query_grams = title_trigrams(query)
+    if not query_grams:
+        return []
+    normalized_query = normalize_title(query)
+    needed = max(1, math.ceil(len(query_grams) * SEARCH_MIN_COVERAGE))
+    with SEARCH_LOCK:
+        postings = SEARCH_INDEX['grams']
+        titles = SEARCH_INDEX['titles']
+        # A title sharing at least `needed` grams must contain one of the rarest
+        # len - needed + 1 of them, so only those postings are read for candidates
+        rarest = sorted(query_grams, key=lambda gram: len(postings.get(gram, ())))
+        candidates = set().union(*(postings.get(gram, ()) for gram in rarest[:len(rarest) - needed + 1]))
+        candidates = [(key, titles[key]) for key in candidates]
+
+    matches = []
+    for key, (title, normalized_title, grams) in candidates:
+        shared = len(grams & query_grams)
+        if shared < needed or (match and not match(key)):
+            continue
+        coverage = shared / len(query_grams)
+        similarity = shared / (len(query_grams) + len(grams) - shared)
+        score = 0.7 * coverage + 0.3 * similarity
+        if score < min_score:
+            continue
+        if normalized_query in normalized_title:
+            score += 1.0
+        matches.append((key, title, round(score, 3)))
+    return heapq.nsmallest(limit, matches, key=lambda match: (-match[2], match[1].lower()))
+
+def best_title_match(query):
+    """
+    The one game a 'play <name>' query means: an exact title, or a top match clearly ahead
+    of the runner-up. Returns (key or None, matches) so callers can list the candidates.
+    """
+    matches = search_titles(query)
+    if not matches:
+        return None, matches
+    normalized_query = normalize_title(query)
+    exact = [match for match in matches if normalize_title(match[1]) == normalized_query]
+    if len(exact) == 1:
+        return exact[0][0], matches
+    if len(matches) == 1 or matches[0][2] - matches[1][2] >= 0.15:
+        return matches[0][0], matches
+    return None, matches
+
+def get_title_index_stats():
+    """Return how many titles and distinct trigrams are indexed"""
+    with SEARCH_LOCK:
+        return {'titles': len(SEARCH_INDEX['titles']), 'trigrams': len(SEARCH_INDEX['grams'])}
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Warm Host
+Keeps one RetroArch instance pre-spawned and idle, and loads games into it through
+RetroArch's network command interface instead of starting a new process per launch.
+warm_host_stub.py can stand in for RetroArch when testing.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import threading
+
+from process_supervisor import launch_session, terminate_session, register_session, finish_session
+
+CONFIG_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Config")
+WARM_HOST_FILE = os.path.join(CONFIG_DIRECTORY, "warm_host.json")
+RETROARCH_APPEND_CONFIG = os.path.join(CONFIG_DIRECTORY, "warm_host_retroarch.cfg")
+STUB_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_host_stub.py")
+
+# stub: run warm_host_stub.py instead of RetroArch
+# load_commands: sent in order to load a game; a command whose placeholders did not
+#   change since the last load (e.g. the same core) is skipped
+DEFAULT_WARM_HOST_CONFIG = {
+    'enabled': False,
+    'prestart': True,
+    'stub': False,
+    'address': '127.0.0.1',
+    'port': 55355,
+    'load_commands': ['LOAD_CORE {core_path}', 'LOAD_CONTENT {game_path}'],
+    'ready_timeout': 10,  # Seconds to wait for a new host to answer VERSION
+    'load_timeout': 5  # Seconds to wait for GET_STATUS to report the game as playing
+}
+REPLY_TIMEOUT = 0.5
+POLL_INTERVAL = 1.0  # Seconds between GET_STATUS checks while a game is loaded
+
+CONFIG_CACHE = {'mtime': None, 'config': None}
+# session: supervisor session of the ready host process; starting: host session still waiting to
+# answer VERSION; loading: a game is being loaded; content: supervisor session of the loaded game.
+# The lock is never held while waiting on the host, so status checks do not block.
+HOST_STATE = {'session': None, 'starting': None, 'loading': False, 'emulator_path': None, 'loaded': {},
+              'content': None, 'generation': 0}
+WARM_HOST_LOCK = threading.RLock()
+
+def get_warm_host_config():
+    """Return the warm host settings, merged with Config/warm_host.json if present"""
+    try:
+        mtime = os.path.getmtime(WARM_HOST_FILE)
+    except OSError:
+        mtime = None
+
+    if CONFIG_CACHE['config'] is not None and CONFIG_CACHE['mtime'] == mtime:
+        return CONFIG_CACHE['config']
+
+    config = dict(DEFAULT_WARM_HOST_CONFIG)
+    if mtime is not None:
+        try:
+            with open(WARM_HOST_FILE, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            config.update({key: value for key, value in overrides.items() if key in DEFAULT_WARM_HOST_CONFIG})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    CONFIG_CACHE['mtime'] = mtime
+    CONFIG_CACHE['config'] = config
+    return config
+
+def send_command(command, expect_reply=False, timeout=REPLY_TIMEOUT):
+    """Send one network command to the host; returns the reply text, or None"""
+    config = get_warm_host_config()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.sendto(command.encode('utf-8'), (config['address'], int(config['port'])))
+            if not expect_reply:
+                return None
+            reply, _ = sock.recvfrom(4096)
+        except OSError:
+            return None
+    return reply.decode('utf-8', errors='replace').strip()
+
+def query_status():
+    """Return (state, content name) from GET_STATUS, e.g. ('PLAYING', 'Tetris'), or (None, None)"""
+    reply = send_command("GET_STATUS", expect_reply=True)
+    if not reply or not reply.startswith("GET_STATUS "):
+        return None, None
+    state, _, details = reply[len("GET_STATUS "):].partition(' ')
+    # details: "<core/system>,<content name>,crc32=<crc>"
+    fields = details.split(',')
+    content = ','.join(fields[1:-1]) if len(fields) >= 3 else None
+    return state, content
+
+def _content_matches(content, game_path):
+    """Check whether a GET_STATUS content name refers to game_path"""
+    if not content:
+        return False
+    filename = os.path.basename(game_path)
+    return content in (filename, os.path.splitext(filename)[0])
+
+def _host_argv(emulator_path, config):
+    """Build the argv for an idle host with the command interface enabled"""
+    if config['stub']:
+        return [sys.executable, STUB_SCRIPT, '--host', config['address'], '--port', str(config['port'])]
+
+    os.makedirs(CONFIG_DIRECTORY, exist_ok=True)
+    with open(RETROARCH_APPEND_CONFIG, 'w', encoding='utf-8') as f:
+        f.write('network_cmd_enable = "true"\n')
+        f.write(f'network_cmd_port = "{int(config["port"])}"\n')
+    return [emulator_path, '--appendconfig', RETROARCH_APPEND_CONFIG]
+
+def is_warm_host_running():
+    """Check whether the host process is up"""
+    with WARM_HOST_LOCK:
+        session = HOST_STATE['session']
+        return session is not None and session['ended_at'] is None
+
+def start_warm_host(emulator_path):
+    """
+    Start the idle host and wait until it answers VERSION.
+    Returns the host's supervisor session, or None if it could not be started or another
+    thread is still starting it.
+    """
+    config = get_warm_host_config()
+    with WARM_HOST_LOCK:
+        if is_warm_host_running():
+            return HOST_STATE['session']
+        if HOST_STATE['starting'] is not None:
+            return None
+        try:
+            argv = _host_argv(emulator_path, config)
+            session = launch_session(argv, cwd=os.path.dirname(argv[0]) or None, game_name="Warm host (idle)",
+                                     emulator_name="RetroArch host" if not config['stub'] else "Warm host stub")
+        except OSError:
+            return None
+        session['warm_host'] = True
+        HOST_STATE['starting'] = session
+
+    ready = False
+    deadline = time.time() + config['ready_timeout']
+    while time.time() < deadline and session['ended_at'] is None:
+        if send_command("VERSION", expect_reply=True):
+            ready = True
+            break
+        time.sleep(0.1)
+
+    with WARM_HOST_LOCK:
+        if HOST_STATE['starting'] is session:
+            HOST_STATE['starting'] = None
+            if ready and session['ended_at'] is None:
+                HOST_STATE.update(session=session, emulator_path=emulator_path, loaded={}, content=None)
+                return session
+    terminate_session(session['id'])
+    return None
+
+def prestart_warm_host(emulator_path):
+    """Start the host in the background so the first launch is warm too"""
+    config = get_warm_host_config()
+    if not config['enabled'] or not config['prestart'] or not emulator_path:
+        return
+    threading.Thread(target=start_warm_host, args=(emulator_path,), daemon=True).start()
+
+def can_launch_warm(launch_plan):
+    """Check whether a launch plan can be loaded into the warm host (RetroArch plans only)"""
+    config = get_warm_host_config()
+    if not config['enabled'] or not launch_plan or not launch_plan.get('core_path'):
+        return False
+    with WARM_HOST_LOCK:
+        if HOST_STATE['starting'] is not None or HOST_STATE['loading']:
+            return False  # Launch cold rather than wait for the host
+        host_emulator = HOST_STATE['emulator_path'] if is_warm_host_running() else None
+    return config['stub'] or host_emulator in (None, launch_plan['emulator_path'])
+
+def _end_content(ended_at=None):
+    """Finish the loaded game's session and run the exit callbacks for it (lock held)"""
+    content = HOST_STATE['content']
+    if content is None:
+        return
+    HOST_STATE['content'] = None
+    HOST_STATE['generation'] += 1
+    finish_session(content, ended_at=ended_at)
+
+def _close_content(generation):
+    """Close the loaded game without stopping the host (the content session's stop function)"""
+    with WARM_HOST_LOCK:
+        if HOST_STATE['generation'] != generation or HOST_STATE['content'] is None:
+            return
+        send_command("CLOSE_CONTENT")
+        _end_content()
+
+def _watch_content(generation, game_path):
+    """Poll the host until the loaded game is closed, replaced or the host exits"""
+    while True:
+        time.sleep(POLL_INTERVAL)
+        with WARM_HOST_LOCK:
+            if HOST_STATE['generation'] != generation:
+                return
+            host_running = is_warm_host_running()
+        state, content = query_status() if host_running else (None, None)
+        with WARM_HOST_LOCK:
+            if HOST_STATE['generation'] != generation:
+                return
+            if not host_running:
+                _end_content()
+                HOST_STATE['loaded'] = {}
+                return
+            if state is not None and (state not in ('PLAYING', 'PAUSED') or not _content_matches(content, game_path)):
+                _end_content()
+                return
+
+def launch_warm(launch_plan, game_name=None, system=None):
+    """
+    Load a game into the warm host, starting the host first if needed.
+    Returns the game's own supervisor session, or None if the host could not load it,
+    in which case the caller should launch it cold.
+    """
+    config = get_warm_host_config()
+    values = {key: os.fspath(value) for key, value in launch_plan.items()
+              if key in ('game_path', 'core_path', 'emulator_path') and value}
+
+    host_session = start_warm_host(launch_plan['emulator_path'])
+    if host_session is None:
+        return None
+
+    with WARM_HOST_LOCK:
+        if HOST_STATE['loading'] or HOST_STATE['session'] is not host_session or not is_warm_host_running():
+            return None
+        HOST_STATE['loading'] = True
+        _end_content()
+        try:
+            for template in config['load_commands']:
+                command = template.format(**values)
+                # Skip commands that would reload what is already loaded (typically the core)
+                if '{game_path}' not in template and HOST_STATE['loaded'].get(template) == command:
+                    continue
+                send_command(command)
+                HOST_STATE['loaded'][template] = command
+        except (KeyError, IndexError, ValueError):
+            HOST_STATE['loading'] = False
+            return None
+
+    loaded = False
+    deadline = time.time() + config['load_timeout']
+    while host_session['ended_at'] is None:
+        state, content = query_status()
+        if state in ('PLAYING', 'PAUSED') and _content_matches(content, values['game_path']):
+            loaded = True
+            break
+        if time.time() >= deadline:
+            break
+        time.sleep(0.05)
+
+    with WARM_HOST_LOCK:
+        HOST_STATE['loading'] = False
+        if not loaded or HOST_STATE['session'] is not host_session or not is_warm_host_running():
+            # The host is in an unknown state: make the next warm launch reload everything
+            HOST_STATE['loaded'] = {}
+            return None
+
+        generation = HOST_STATE['generation']
+        content_session = register_session(host_session, game_path=values['game_path'], game_name=game_name,
+                                           emulator_name=launch_plan['emulator_name'], system=system,
+                                           stop=lambda: _close_content(generation))
+        content_session['warm'] = True
+        HOST_STATE['content'] = content_session
+
+    threading.Thread(target=_watch_content, args=(generation, values['game_path']), daemon=True).start()
+    return content_session
+
+def stop_warm_host():
+    """Ask the host to quit, and terminate it if it does not"""
+    with WARM_HOST_LOCK:
+        starting = HOST_STATE['starting']
+        HOST_STATE['starting'] = None
+    if starting is not None:
+        terminate_session(starting['id'])
+    with WARM_HOST_LOCK:
+        session = HOST_STATE['session']
+        if session is None:
+            return
+        _end_content()
+        if session['ended_at'] is None:
+            send_command("QUIT")
+            try:
+                session['process'].wait(timeout=2)
+            except Exception:
+                terminate_session(session['id'])
+        HOST_STATE.update(session=None, emulator_path=None, loaded={})
+
+def get_warm_host_status():
+    """Return a short description of the warm host for settings screens"""
+    config = get_warm_host_config()
+    if not config['enabled']:
+        return "Disabled"
+    with WARM_HOST_LOCK:
+        if HOST_STATE['starting'] is not None:
+            return f"Starting, PID {HOST_STATE['starting']['pid']}{' (stub)' if config['stub'] else ''}"
+        if not is_warm_host_running():
+            return "Enabled (not running)"
+        content = HOST_STATE['content']
+        host = f"PID {HOST_STATE['session']['pid']}{' (stub)' if config['stub'] else ''}"
+        if HOST_STATE['loading']:
+            return f"Loading a game, {host}"
+        return f"Running, {host}, playing {content['game_name']}" if content else f"Idle, {host}"
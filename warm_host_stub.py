@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+RetroFlow Warm Host Stub
+Stands in for RetroArch's network command interface so the warm host mode can be
+exercised without a real emulator. Answers VERSION, GET_STATUS, LOAD_CORE,
+LOAD_CONTENT, CLOSE_CONTENT, PAUSE_TOGGLE and QUIT over UDP.
+
+Usage: python warm_host_stub.py [--port 55355] [--core-load-delay 0.5]
+"""
+
+import os
+import sys
+import time
+import socket
+import zlib
+import argparse
+
+def crc32_of(path):
+    """CRC32 of a file as 8 hex digits, like RetroArch reports it"""
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            crc = zlib.crc32(chunk, crc)
+    return f"{crc & 0xFFFFFFFF:08x}"
+
+def log(message):
+    """Print a timestamped line (captured by the process supervisor)"""
+    print(f"[stub {time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+def serve(host, port, core_load_delay):
+    """Answer commands until QUIT"""
+    state = {'core': None, 'content': None, 'crc32': None, 'paused': False}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    log(f"listening on {host}:{port}")
+
+    while True:
+        data, address = sock.recvfrom(4096)
+        command, _, argument = data.decode('utf-8', errors='replace').strip().partition(' ')
+        command = command.upper()
+        reply = None
+
+        if command == 'VERSION':
+            reply = "1.0.0-retroflow-stub"
+        elif command == 'GET_STATUS':
+            if state['content'] is None:
+                reply = "GET_STATUS CONTENTLESS"
+            else:
+                status = 'PAUSED' if state['paused'] else 'PLAYING'
+                core_name = os.path.splitext(os.path.basename(state['core'] or 'stub'))[0]
+                reply = f"GET_STATUS {status} {core_name},{state['content']},crc32={state['crc32']}"
+        elif command == 'LOAD_CORE':
+            if argument != state['core']:
+                # Simulate the one-time cost of initializing a different core
+                time.sleep(core_load_delay)
+                state['core'] = argument
+                log(f"core loaded: {argument}")
+        elif command == 'LOAD_CONTENT':
+            try:
+                state['crc32'] = crc32_of(argument)
+                state['content'] = os.path.splitext(os.path.basename(argument))[0]
+                state['paused'] = False
+                log(f"content loaded: {argument}")
+            except OSError as e:
+                state['content'] = None
+                log(f"failed to load content: {e}")
+        elif command == 'CLOSE_CONTENT':
+            state['content'] = None
+            log("content closed")
+        elif command == 'PAUSE_TOGGLE':
+            state['paused'] = not state['paused']
+        elif command == 'QUIT':
+            log("quitting")
+            break
+        else:
+            log(f"unknown command: {command}")
+
+        if reply is not None:
+            sock.sendto(f"{reply}\n".encode('utf-8'), address)
+
+    sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="RetroArch network command stub for RetroFlow's warm host mode")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=55355)
+    parser.add_argument('--core-load-delay', type=float, default=0.5,
+                        help="seconds to sleep when a different core is loaded")
+    args = parser.parse_args()
+    try:
+        serve(args.host, args.port, args.core_load_delay)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())